@@ -1,8 +1,12 @@
 from flask import Flask, request
 from parsers.apple_health_export_parser import AppleHealthExportParser
+from handlers import health_record_handler as health_record_handler
+from handlers import workout_record_handler as workout_record_handler
 from utils.file_utils import create_health_export_directories
-from utils.response_utils import UploadResponse, RequestedWorkoutResponse, WorkoutDetailsResponse, ExportStatusResponse
+from utils.response_utils import (UploadResponse, RequestedWorkoutResponse, WorkoutDetailsResponse,
+                                  ExportStatusResponse, RequestValidationError)
 import time
+import config
 from flask_caching import Cache
 
 FLASK_CONFIG = {
@@ -81,7 +85,16 @@ def send_requested_workout():
     response_builder = RequestedWorkoutResponse()
     try:
         post_data = request.get_json()
-        response_builder.generate_response(post_data['workoutStartDate'])
+        response_builder.generate_response(
+            post_data['workoutStartDate'],
+            post_data.get('timeFormat', health_record_handler.EXPORT_DATE_TIME_FORMAT),
+            post_data.get('maxPoints'),
+            post_data.get('routeDetail', config.FULL_ROUTE_DETAIL),
+            post_data.get('routeEncoding', workout_record_handler.LISTS_ROUTE_ENCODING),
+            post_data.get('includeTimings', False))
+    except RequestValidationError as rve:
+        response_builder.set_status_code(400)
+        response_builder.add_error(400, str(rve))
     except KeyError as ke:
         response_builder.set_status_code(500)
         response_builder.add_error(500, f"Internal Server Error: {str(ke)} is not a valid key.")
@@ -0,0 +1,73 @@
+"""
+Benchmarks parsing a workout route gpx file with `WorkoutRouteParser` against `StreamingWorkoutRouteParser`.
+
+Both parsers start from the gpx bytes and end with the typed DataFrame written at ingest,
+so the tree-based parser is followed by the type conversion the stored route gets.
+
+Run from the backend directory:
+    python -m benchmarks.gpx_route_parser_benchmark
+"""
+
+import io
+import timeit
+import xml.etree.cElementTree as ET
+import pandas as pd
+
+from parsers.workout_record_parser import WorkoutRouteParser, StreamingWorkoutRouteParser
+from utils import schema_utils as schema_utils
+from utils import storage_utils as storage_utils
+
+POINT_COUNTS = [1_000, 10_000, 50_000]
+REPEAT = 3
+
+GPX_HEADER = ('<?xml version="1.0" encoding="UTF-8"?>\n'
+              '<gpx version="1.1" creator="Apple Health Export" xmlns="http://www.topografix.com/GPX/1/1">\n'
+              ' <trk>\n  <name>Route</name>\n  <trkseg>\n')
+GPX_FOOTER = '  </trkseg>\n </trk>\n</gpx>\n'
+
+
+def build_gpx(point_count: int) -> bytes:
+    """Builds a gpx file of `point_count` track points like the ones found in an export."""
+    points = []
+    for index in range(point_count):
+        points.append(
+            f'   <trkpt lon="{-73.985700 + index * 0.00001:.6f}" lat="{40.748400 + index * 0.00001:.6f}">'
+            f'<ele>{10 + index % 50 * 0.1:.6f}</ele>'
+            f'<time>2024-08-21T{13 + index // 3600 % 10:02d}:{index // 60 % 60:02d}:{index % 60:02d}Z</time>'
+            f'<extensions><speed>{3 + index % 10 * 0.05:.6f}</speed><course>{index % 360:.2f}</course>'
+            f'<hAcc>2.0</hAcc><vAcc>1.5</vAcc></extensions></trkpt>\n')
+    return (GPX_HEADER + "".join(points) + GPX_FOOTER).encode()
+
+
+def run_workout_route_parser(gpx: bytes) -> None:
+    ns = {"gpx": "http://www.topografix.com/GPX/1/1"}
+    tracks = ET.parse(io.BytesIO(gpx)).getroot().findall('gpx:trk', ns)
+    df = WorkoutRouteParser(tracks).to_dataframe()
+    df["time"] = pd.to_datetime(df["time"], utc=True, format="ISO8601")
+    storage_utils.apply_dtypes(df, schema_utils.ROUTE_DTYPES)
+
+
+def run_streaming_workout_route_parser(gpx: bytes) -> None:
+    StreamingWorkoutRouteParser(io.BytesIO(gpx)).to_dataframe()
+
+
+def main() -> None:
+    for point_count in POINT_COUNTS:
+        gpx = build_gpx(point_count)
+        print(f"{point_count:,} track points, {len(gpx) / 1024 / 1024:.1f} MB")
+
+        benchmarks = [
+            ("WorkoutRouteParser", lambda: run_workout_route_parser(gpx)),
+            ("StreamingWorkoutRouteParser", lambda: run_streaming_workout_route_parser(gpx)),
+        ]
+
+        baseline = None
+        for name, benchmark in benchmarks:
+            seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+            baseline = baseline or seconds
+            print(f"  {name:<30} {seconds:8.3f}s  {point_count / seconds:12,.0f} points/s  "
+                  f"{len(gpx) / 1024 / 1024 / seconds:7.1f} MB/s  {baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
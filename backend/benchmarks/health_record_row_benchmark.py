@@ -0,0 +1,74 @@
+"""
+Benchmarks building health record rows with `HealthRecordParser` against `health_record_row`.
+
+Run from the backend directory:
+    python -m benchmarks.health_record_row_benchmark
+"""
+
+import xml.etree.cElementTree as ET
+import timeit
+
+from parsers.health_record_parser import HealthRecordParser, health_record_row, element_metadata
+
+DEVICE = ("&lt;&lt;HKDevice: 0x2825cf520&gt;, name:Apple Watch, manufacturer:Apple Inc., "
+          "model:Watch, hardware:Watch6,14, software:10.2&gt;")
+RECORD_COUNT = 100_000
+REPEAT = 7
+
+
+def build_records(record_count: int) -> list:
+    """Builds a mix of HeartRate and StepCount record elements like the ones found in an export."""
+    records = []
+    for index in range(record_count):
+        timestamp = f"2024-08-21 09:{index % 60:02d}:00 -0400"
+        if index % 2:
+            record = ET.fromstring(
+                f'<Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Apple Watch" '
+                f'sourceVersion="10.2" device="{DEVICE}" unit="count/min" creationDate="{timestamp}" '
+                f'startDate="{timestamp}" endDate="{timestamp}" value="{60 + index % 50}">'
+                f'<MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="{index % 3}"/></Record>')
+        else:
+            record = ET.fromstring(
+                f'<Record type="HKQuantityTypeIdentifierStepCount" sourceName="Apple Watch" '
+                f'sourceVersion="10.2" device="{DEVICE}" unit="count" creationDate="{timestamp}" '
+                f'startDate="{timestamp}" endDate="{timestamp}" value="{index % 200}"/>')
+        records.append(record)
+    return records
+
+
+def run_health_record_parser(records: list) -> None:
+    for record in records:
+        HealthRecordParser(record).csv_row_structure()
+
+
+def run_health_record_row(records: list) -> None:
+    for record in records:
+        health_record_row(record.attrib, element_metadata(record))
+
+
+def run_health_record_row_from_attributes(attribute_records: list) -> None:
+    for attributes, metadata in attribute_records:
+        health_record_row(attributes, metadata)
+
+
+def main() -> None:
+    records = build_records(RECORD_COUNT)
+    attribute_records = [(record.attrib, element_metadata(record)) for record in records]
+
+    benchmarks = [
+        ("HealthRecordParser", lambda: run_health_record_parser(records)),
+        ("health_record_row (elements)", lambda: run_health_record_row(records)),
+        ("health_record_row (attributes)",
+         lambda: run_health_record_row_from_attributes(attribute_records)),
+    ]
+
+    baseline = None
+    for name, benchmark in benchmarks:
+        seconds = min(timeit.repeat(benchmark, number=1, repeat=REPEAT))
+        baseline = baseline or seconds
+        print(f"{name:<32} {seconds:8.3f}s  {RECORD_COUNT / seconds:12,.0f} records/s  "
+              f"{baseline / seconds:5.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+"""
+Benchmarks the serial tail of a sharded export parse, merging the shards' record files.
+
+Every shard's records are written as a sorted run by a `HealthRecordElementHandler` with
+`sorted_runs`, as a worker does, then the main process's handler either moves the runs in
+with `append_record_run` and merges them on close, or appends every shard file again chunk
+by chunk before sorting it on close. Only the shard writes run in parallel during an export,
+the time to close the main handler is added to the parse on one core.
+
+Run from the backend directory:
+    python -m benchmarks.sharded_record_merge_benchmark
+"""
+
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime, timedelta
+from unittest.mock import patch
+
+import config
+from parsers.export_element_handlers import HealthRecordElementHandler
+from utils import storage_utils as storage_utils
+
+DEVICE = ("<<HKDevice: 0x2825cf520>, name:Apple Watch, manufacturer:Apple Inc., "
+          "model:Watch, hardware:Watch6,14, software:10.2>")
+START_DATE = datetime(2024, 8, 21)
+SHARD_COUNT = 8
+SHARD_RECORD_COUNT = 100_000
+STORAGE_FORMATS = ["parquet", "csv"]
+
+
+def heart_rate_attributes(shard: int, index: int) -> dict:
+    """Returns the attributes of a HeartRate record, shards overlap by half of their time range."""
+    timestamp = (START_DATE + timedelta(seconds=(shard * SHARD_RECORD_COUNT // 2 + index) * 5)).strftime(
+        "%Y-%m-%d %H:%M:%S -0400")
+    return {"type": "HKQuantityTypeIdentifierHeartRate", "sourceName": "Apple Watch", "sourceVersion": "10.2",
+            "device": DEVICE, "unit": "count/min", "creationDate": timestamp, "startDate": timestamp,
+            "endDate": timestamp, "value": str(60 + index % 50)}
+
+
+def write_shard_runs(directory: str) -> list:
+    """Writes the HeartRate run of every shard, returning their paths and row counts."""
+    shard_runs = []
+    for shard in range(SHARD_COUNT):
+        shard_directory = os.path.join(directory, f"shard-{shard}")
+        os.makedirs(shard_directory)
+        handler = HealthRecordElementHandler(output_directory=shard_directory, series_records=[], sorted_runs=True)
+        for index in range(SHARD_RECORD_COUNT):
+            handler.handle_attributes(heart_rate_attributes(shard, index), {})
+        handler.close()
+        record_writer = handler.record_writers["HeartRate"]
+        shard_runs.append((record_writer.output_path, record_writer.rows_written))
+    return shard_runs
+
+
+def merge_sorted_runs(output_directory: str, shard_runs: list) -> None:
+    handler = HealthRecordElementHandler(output_directory=output_directory, series_records=[])
+    for record_path, row_count in shard_runs:
+        handler.append_record_run("HeartRate", record_path, row_count)
+    handler.close()
+
+
+def append_shard_files(output_directory: str, shard_runs: list) -> None:
+    handler = HealthRecordElementHandler(output_directory=output_directory, series_records=[])
+    record_writer = handler._get_record_writer("HeartRate")
+    for record_path, _ in shard_runs:
+        for chunk in storage_utils.iter_dataframe_chunks(
+                record_path, record_writer.max_buffered_rows, record_writer.dtypes):
+            record_writer.append_dataframe(chunk)
+    handler.close()
+
+
+def main() -> None:
+    print(f"{SHARD_COUNT} shards of {SHARD_RECORD_COUNT:,} HeartRate records")
+    for storage_format in STORAGE_FORMATS:
+        with tempfile.TemporaryDirectory() as directory, \
+                patch.object(config, "STORAGE_FORMAT", storage_format):
+            started = time.perf_counter()
+            shard_runs = write_shard_runs(os.path.join(directory, "shards"))
+            shard_seconds = (time.perf_counter() - started) / SHARD_COUNT
+
+            benchmarks = [
+                ("append_record_run", merge_sorted_runs),
+                ("append shard files again", append_shard_files),
+            ]
+            for name, benchmark in benchmarks:
+                runs_directory = os.path.join(directory, "runs")
+                shutil.copytree(os.path.join(directory, "shards"), runs_directory)
+                output_directory = os.path.join(directory, "output")
+                os.makedirs(output_directory)
+                runs = [(record_path.replace(os.path.join(directory, "shards"), runs_directory), row_count)
+                        for record_path, row_count in shard_runs]
+
+                started = time.perf_counter()
+                benchmark(output_directory, runs)
+                seconds = time.perf_counter() - started
+                print(f"{storage_format:<8} {name:<26} {seconds:8.3f}s serial tail  "
+                      f"{shard_seconds:8.3f}s per shard")
+                shutil.rmtree(runs_directory)
+                shutil.rmtree(output_directory)
+
+
+if __name__ == "__main__":
+    main()
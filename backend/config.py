@@ -45,6 +45,89 @@ HEALTH_EXPORT_DIRECTORIES = [
 
 ACTIVITY_SUMMARY_FILE_NAME = 'ActivitySummaries.csv'
 WORKOUTS_SUMMARY_FILE_NAME = 'Workouts.csv'
+WORKOUT_STATISTICS_FILE_NAME = 'WorkoutStatistics.csv'
+WORKOUT_SAMPLE_OFFSETS_FILE_NAME = 'WorkoutSampleOffsets.csv'
+WORKOUT_DATE_INDEX_FILE_NAME = 'WorkoutDateIndex.csv'
+WORKOUT_DETAILS_FILE_NAME = 'WorkoutDetails.json'
+
+# Format of every file written under DATA_DIRECTORY, either "parquet", "feather" or "csv".
+# The file names above are stored with the extension of this format, except for the JSON details file.
+STORAGE_FORMAT = "parquet"
+
+# Maximum number of distinct values memoized by each name normalizer in utils.name_utils
+NAME_NORMALIZATION_CACHE_SIZE = 4096
+
+# Health records are flushed to disk per record type once either threshold is reached
+RECORD_WRITER_MAX_BUFFERED_ROWS = 100_000
+RECORD_WRITER_MAX_BUFFERED_BYTES = 32 * 1024 * 1024
+
+# Maximum number of sorted runs of a record file merged at once when its records were not appended in order
+RECORD_WRITER_MERGE_FAN_IN = 8
+
+# Detach each top-level element from the export root once it has been parsed so memory stays bounded
+XML_PRUNE_PROCESSED_ELEMENTS = True
+
+# XML backend used to stream export.xml, either "expat" or the reference "elementtree"
+XML_PARSER_BACKEND = "expat"
+
+# Number of processes used to parse workout route gpx files, 1 parses them serially
+GPX_PARSER_MAX_WORKERS = os.cpu_count() or 1
+
+# Levels of detail written at ingest next to every workout route file, keyed by level with the
+# Ramer-Douglas-Peucker tolerance in meters they are simplified with. FULL_ROUTE_DETAIL serves the route file itself
+ROUTE_DETAIL_TOLERANCES = {
+    "low": 10.0,
+    "medium": 3.0,
+    "high": 1.0,
+}
+FULL_ROUTE_DETAIL = "full"
+
+# Decimals kept of the coordinates of compactly encoded routes, 5 is about a meter
+ROUTE_POLYLINE_PRECISION = 5
+
+# Decimals kept of the elevation, speed, course and accuracies of compactly encoded routes
+ROUTE_VALUE_DECIMALS = 2
+
+# Number of track points on either side of every point its route pace and grade are measured over
+ROUTE_METRICS_SMOOTHING_POINTS = 5
+
+# Split tables written at ingest next to every workout route file, keyed by unit with the split length in meters
+ROUTE_SPLIT_LENGTHS = {
+    "km": 1000.0,
+    "mi": 1609.344,
+}
+
+# Record types only read as (timestamp, value) series for charts. They are also written at ingest
+# as memory-mapped .npy arrays next to their record file, an empty list disables the arrays
+MMAP_SERIES_RECORDS = [
+    "HeartRate",
+    "RunningGroundContactTime",
+    "RunningPower",
+    "RunningSpeed",
+    "RunningStrideLength",
+    "RunningVerticalOscillation",
+]
+
+# Record types charted for every workout. At ingest each workout is joined to the rows of these
+# record files recorded during it, so serving a workout only reads its own samples
+WORKOUT_SAMPLE_RECORDS = [
+    "HeartRate",
+    "RunningGroundContactTime",
+    "RunningPower",
+    "RunningVerticalOscillation",
+    "RunningSpeed",
+    "RunningStrideLength",
+]
+
+# Memory budget of the DataFrames the handlers keep loaded between requests, least recently used first out
+DATAFRAME_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# Number of threads loading the charts and routes of a requested workout date, 1 loads them serially
+WORKOUT_RESPONSE_MAX_WORKERS = 8
+
+# Large exports are split into byte-range shards of at least this size whose records are parsed in parallel
+RECORD_PARSER_MAX_WORKERS = os.cpu_count() or 1
+RECORD_PARSER_MIN_SHARD_BYTES = 64 * 1024 * 1024
 
 
 HEALTH_RECORDS = [
@@ -180,6 +263,43 @@ SYMPTOM_RECORDS = [
     "ECGOtherSymptom",
 ]
 
+ALL_RECORDS = (
+    HEALTH_RECORDS +
+    VITAL_SIGN_RECORDS +
+    ACTIVITY_RECORDS +
+    AUDIO_RECORDS +
+    MOBILITY_RECORDS +
+    ENVIRONMENTAL_RECORDS +
+    SLEEP_RECORDS +
+    SYMPTOM_RECORDS
+)
+
+# Record types whose value is an HKCategoryValue name rather than a measured quantity,
+# their values are stored as categoricals
+CATEGORY_VALUE_RECORDS = [
+    "HandwashingEvent",
+    "ToothbrushingEvent",
+    "MindfulSession",
+    "HighHeartRateEvent",
+    "IrregularHeartRhythmEvent",
+    "LowHeartRateEvent",
+    "AppleStandHour",
+    "AudioExposureEvent",
+    "HeadphoneAudioExposureEvent",
+    "AppleWalkingSteadinessEvent",
+    "SleepAnalysis",
+] + SYMPTOM_RECORDS
+
+# Quantity record types counting whole events, whose values float32 stores exactly up to 2**24.
+# Every other quantity record type, including measured rates such as HeartRate that third-party
+# sources and averaged samples write with fractions, stores its values as float64
+FLOAT32_VALUE_RECORDS = [
+    "StepCount",
+    "FlightsClimbed",
+    "PushCount",
+    "SwimmingStrokeCount",
+]
+
 
 class AppleHealthPrefix(Enum):
     """Enum of all the Apple Health prefixes"""
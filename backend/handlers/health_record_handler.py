@@ -1,60 +1,182 @@
 import pandas as pd
 import os
+from collections import defaultdict
+from typing import Callable, Dict, List, Tuple
 
 from utils import file_utils as file_utils
+from utils import storage_utils as storage_utils
+from utils import schema_utils as schema_utils
+from utils import date_utils as date_utils
+from utils import series_utils as series_utils
+from utils import workout_sample_utils as workout_sample_utils
+from utils import downsample_utils as downsample_utils
+from utils.cache_utils import DATAFRAME_CACHE
+import config
+
+CHART_COLUMNS = series_utils.SERIES_COLUMNS
+
+# Chart times are either export date strings in their original offsets or integer epoch milliseconds
+EXPORT_DATE_TIME_FORMAT = "exportDate"
+EPOCH_MS_TIME_FORMAT = "epochMs"
+CHART_TIME_FORMATS = [EXPORT_DATE_TIME_FORMAT, EPOCH_MS_TIME_FORMAT]
+
+def get_health_record_path(record_name: str) -> str:
+    return file_utils.format_record_type_into_path(record_name)
+
+
+def load_health_record_into_dataframe(record_name: str, columns: list = None) -> pd.DataFrame:
+    record_path = get_health_record_path(record_name)
 
-def load_heart_rate_health_record_into_dataframe(record_path) -> pd.DataFrame:
     if file_utils.file_exists(record_path):
-        return pd.read_csv(record_path, dtype={
-            "type": "string",
-            "unit": "string",
-            "value": "float64",
-            "sourceName": "string",
-            "sourceVersion": "string",
-            "device": "string",
-            "creationDate": "string",
-            "startDate": "string",
-            "endDate": "string",
-            "heartRateMotionContext": "string"
-        })
+        return DATAFRAME_CACHE.get_or_load(record_path, lambda: storage_utils.read_dataframe(
+            record_path, columns=columns, dtype=schema_utils.get_record_dtypes(record_name)), columns)
     return pd.DataFrame()
 
 
-def load_health_record_into_dataframe(record_name: str) -> pd.DataFrame:
-    record_path = os.path.join(
-        file_utils.match_record_type_to_directory(record_name), f'{record_name}.csv')
+def slice_between_timestamps(df: pd.DataFrame, start_time: str, end_time: str,
+                             rows: slice = None) -> pd.DataFrame:
+    """Returns the records of a series sorted by 'startDate' that lie within a time window.
 
-    if record_name == "HeartRate":
-        return load_heart_rate_health_record_into_dataframe(record_path)
+    The window bounds are found with a binary search on 'startDate', so only the rows
+    inside the window are compared against 'endDate'.
 
-    return pd.read_csv(record_path) if file_utils.file_exists(record_path) else pd.DataFrame()
+    Args:
+        df: A record series as stored at ingest, sorted by 'startDate'.
+        start_time: The earliest start of a returned record.
+        end_time: The latest end of a returned record.
+        rows: The rows starting within the window when already known, skips the binary search.
+    """
+    end_time = pd.Timestamp(end_time)
+    if rows is None:
+        start_dates = df["startDate"]
+        rows = slice(start_dates.searchsorted(pd.Timestamp(start_time), side="left"),
+                     start_dates.searchsorted(end_time, side="right"))
+    window = df.iloc[rows]
+    return window[window["endDate"] <= end_time]
 
 
-def load_record_between_timestamps(record_name: str, start_time: str, end_time: str) -> pd.DataFrame:
-    df = load_health_record_into_dataframe(record_name)
+def load_record_between_timestamps(record_name: str, start_time: str, end_time: str,
+                                   columns: list = None) -> pd.DataFrame:
+    df = load_health_record_into_dataframe(record_name, columns)
 
     if not df.empty:
-        df["startDate"] = pd.to_datetime(df["startDate"])
-        df["endDate"] = pd.to_datetime(df["endDate"])
-
-        return df[
-            (df["startDate"] >= start_time) &
-            (df["endDate"] <= end_time)
-        ]
+        return slice_between_timestamps(df, start_time, end_time)
 
     return pd.DataFrame()
 
 
-def load_health_record_into_chart_format(record_name: str, start_date: str, end_date: str) -> dict[str, list]:
-    df = load_record_between_timestamps(record_name, start_date, end_date)
+def _load_series_slicer(record_name: str) -> Callable[[str, str, slice], pd.DataFrame]:
+    """Loads the chart columns of a record type once and returns a function slicing time windows out of them.
+
+    Record types listed in `config.MMAP_SERIES_RECORDS` are sliced out of their
+    memory-mapped series arrays, other record types out of their record file.
+    """
+    if record_name in config.MMAP_SERIES_RECORDS:
+        arrays = series_utils.load_series_arrays(get_health_record_path(record_name))
+        if arrays is not None:
+            return lambda start_time, end_time, rows=None: series_utils.series_window(
+                arrays, start_time, end_time, rows)
+
+    df = load_health_record_into_dataframe(record_name, CHART_COLUMNS)
+    if df.empty:
+        return lambda start_time, end_time, rows=None: pd.DataFrame()
+    return lambda start_time, end_time, rows=None: slice_between_timestamps(df, start_time, end_time, rows)
+
+
+def load_workout_sample_ranges(record_name: str) -> Dict[int, slice]:
+    """Loads the rows of a record type's samples recorded during every workout, joined at ingest.
+
+    Returns:
+        The rows keyed by workout id, empty when the export has not been joined.
+    """
+    offsets_path = storage_utils.storage_file_path(os.path.join(
+        config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_SAMPLE_OFFSETS_FILE_NAME))
+    if not file_utils.file_exists(offsets_path):
+        return {}
+
+    offsets = DATAFRAME_CACHE.get_or_load(offsets_path, lambda: storage_utils.read_dataframe(
+        offsets_path, dtype=schema_utils.WORKOUT_SAMPLE_OFFSET_DTYPES))
+    return workout_sample_utils.get_workout_sample_ranges(offsets, record_name)
+
+
+def load_series_between_timestamps(record_name: str, start_time: str, end_time: str) -> pd.DataFrame:
+    """Loads the chart columns of the records within a time window."""
+    return _load_series_slicer(record_name)(start_time, end_time)
+
 
+def load_series_windows(windows: List[Tuple[str, str, str]], workout_ids: List[int] = None) -> List[pd.DataFrame]:
+    """Loads the chart columns of the records within many time windows.
+
+    Every record type is loaded once, however many of the windows it appears in.
+
+    Args:
+        windows: (record type, start time, end time) tuples.
+        workout_ids: The workout every window belongs to. Windows of workouts joined to
+            their samples at ingest are read from their stored rows without a search.
+
+    Returns:
+        The records of every window, in the order of `windows`.
+    """
+    window_indexes_by_record = defaultdict(list)
+    for index, (record_name, _, _) in enumerate(windows):
+        window_indexes_by_record[record_name].append(index)
+
+    series_windows = [None] * len(windows)
+    for record_name, window_indexes in window_indexes_by_record.items():
+        slice_series = _load_series_slicer(record_name)
+        sample_ranges = load_workout_sample_ranges(record_name) if workout_ids is not None else {}
+        for index in window_indexes:
+            _, start_time, end_time = windows[index]
+            rows = sample_ranges.get(workout_ids[index]) if sample_ranges else None
+            series_windows[index] = slice_series(start_time, end_time, rows)
+    return series_windows
+
+
+def format_chart_times(df: pd.DataFrame, time_format: str = EXPORT_DATE_TIME_FORMAT) -> list:
+    """Formats the 'startDate' column of a series as chart times in one of `CHART_TIME_FORMATS`."""
+    if time_format == EPOCH_MS_TIME_FORMAT:
+        return df['startDate'].dt.as_unit("ms").array.asi8.tolist()
+    return date_utils.format_export_dates(df['startDate'], df['startDateTzOffset']).to_list()
+
+
+def downsample_series(df: pd.DataFrame, max_points: int) -> pd.DataFrame:
+    """Reduces a series to at most `max_points` records with `downsample_utils.lttb_indexes`.
+
+    Series of non-numeric values are returned unchanged.
+    """
+    if len(df) <= max_points or not pd.api.types.is_numeric_dtype(df['value']):
+        return df
+
+    return df.iloc[downsample_utils.lttb_indexes(
+        df['startDate'].dt.as_unit("ns").array.asi8, df['value'].to_numpy(), max_points)]
+
+
+def format_series_into_chart(df: pd.DataFrame, time_format: str = EXPORT_DATE_TIME_FORMAT,
+                             max_points: int = None) -> dict[str, list]:
     if df.empty:
         return {}
 
-    df['startDate'] = df['startDate'].apply(
-        lambda x: x.strftime('%Y-%m-%d %H:%M:%S %z'))
+    if max_points is not None:
+        df = downsample_series(df, max_points)
 
     return {
-        "time": df['startDate'].to_list(),
+        "time": format_chart_times(df, time_format),
         "value": df['value'].to_list()
     }
+
+
+def load_health_record_into_chart_format(record_name: str, start_date: str, end_date: str,
+                                         time_format: str = EXPORT_DATE_TIME_FORMAT,
+                                         max_points: int = None) -> dict[str, list]:
+    return format_series_into_chart(
+        load_series_between_timestamps(record_name, start_date, end_date), time_format, max_points)
+
+
+def load_health_record_windows_into_chart_format(windows: List[Tuple[str, str, str]], workout_ids: List[int] = None,
+                                                 time_format: str = EXPORT_DATE_TIME_FORMAT,
+                                                 max_points: int = None) -> List[dict]:
+    """Loads the chart of every (record type, start time, end time) window, loading each record type once.
+
+    Charts of more than `max_points` samples are downsampled, see `downsample_series`.
+    """
+    return [format_series_into_chart(df, time_format, max_points) for df in load_series_windows(windows, workout_ids)]
@@ -1,23 +1,79 @@
 import pandas as pd
 import numpy as np
 from utils import file_utils as file_utils
+from utils import storage_utils as storage_utils
+from utils import schema_utils as schema_utils
+from utils import date_utils as date_utils
+from utils import workout_index_utils as workout_index_utils
+from utils import route_utils as route_utils
+from utils import route_metrics_utils as route_metrics_utils
+from utils import encoding_utils as encoding_utils
+from utils.cache_utils import DATAFRAME_CACHE
 import config
 import os
-from typing import List
+from typing import List, Optional
+
+# distance, pace and grade are the metrics added at ingest by `route_metrics_utils.add_route_metrics`
+ROUTE_COLUMNS = ['lon', 'lat', 'elevation', 'time', 'speed', 'course', 'hAcc', 'vAcc', 'distance', 'pace', 'grade']
+ROUTE_SPLIT_COLUMNS = list(schema_utils.ROUTE_SPLIT_DTYPES)
+# Route times are stored as UTC timestamps and sent in the format of the gpx files
+ROUTE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%SZ"
+
+# Routes are sent either as one JSON list per column or compactly encoded, see `format_route_into_compact_encoding`
+LISTS_ROUTE_ENCODING = "lists"
+COMPACT_ROUTE_ENCODING = "compact"
+ROUTE_ENCODINGS = [LISTS_ROUTE_ENCODING, COMPACT_ROUTE_ENCODING]
 
 
 def load_workout_records_into_dataframe() -> pd.DataFrame:
-    workout_csv_path = os.path.join(config.WORKOUT_ELEMENTS_DIRECTORY,
-                                    config.WORKOUTS_SUMMARY_FILE_NAME)
-    if file_utils.file_exists(workout_csv_path):
-        return pd.read_csv(workout_csv_path)
+    workout_path = storage_utils.storage_file_path(os.path.join(
+        config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUTS_SUMMARY_FILE_NAME))
+    if file_utils.file_exists(workout_path):
+        return DATAFRAME_CACHE.get_or_load(workout_path, lambda: storage_utils.read_dataframe(
+            workout_path, dtype=schema_utils.WORKOUT_DATE_DTYPES))
+    return pd.DataFrame()
+
+
+def load_workout_date_index() -> pd.DataFrame:
+    date_index_path = storage_utils.storage_file_path(os.path.join(
+        config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_DATE_INDEX_FILE_NAME))
+    if file_utils.file_exists(date_index_path):
+        return DATAFRAME_CACHE.get_or_load(date_index_path, lambda: storage_utils.read_dataframe(
+            date_index_path, dtype=schema_utils.WORKOUT_DATE_INDEX_DTYPES))
     return pd.DataFrame()
 
 
+def load_workout_details() -> Optional[dict]:
+    """Loads the total number of workouts and their sorted unique dates written at ingest, if any."""
+    details_path = os.path.join(config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_DETAILS_FILE_NAME)
+    if file_utils.file_exists(details_path):
+        return workout_index_utils.load_workout_details(details_path)
+    return None
+
+
+def _local_workout_start_times(dataframe: pd.DataFrame) -> pd.Series:
+    return date_utils.local_datetimes(
+        dataframe["startDate"], dataframe[date_utils.tz_offset_column("startDate")])
+
+
+def _format_workout_dates(dataframe: pd.DataFrame) -> pd.DataFrame:
+    """Replaces the UTC date columns of workouts with export date strings in their original offsets."""
+    dataframe = dataframe.copy()
+    for column in schema_utils.WORKOUT_DATE_COLUMNS:
+        offset_column = date_utils.tz_offset_column(column)
+        dataframe[column] = date_utils.format_export_dates(
+            dataframe[column], dataframe[offset_column])
+        del dataframe[offset_column]
+    return dataframe
+
+
 def load_workout_records_from_date(dataframe: pd.DataFrame, workout_start_date: str) -> List:
     """
     Retrieve workout data based on workout type and start date.
 
+    The workouts are looked up in the date index written at ingest, the whole
+    DataFrame is only scanned for exports ingested without one.
+
     Args:
         dataframe (pd.DataFrame): DataFrame containing workout data.
         workout_start_date (str): Start date of the workout.
@@ -25,55 +81,124 @@ def load_workout_records_from_date(dataframe: pd.DataFrame, workout_start_date:
     Returns:
         dict or None: A dictionary containing the first matching workout data row
                       if a matching workout is found, otherwise returns None.
+                      Every row holds its position in the workouts summary as 'workoutId'.
     """
-    if not dataframe.empty:
-        dataframe = dataframe.replace(np.nan, "", regex=True)
-
-    dataframe["date"] = pd.to_datetime(dataframe["startDate"]).dt.date
-    workout_start_date = pd.to_datetime(workout_start_date)
+    date_index = load_workout_date_index()
+    if date_index.empty:
+        match: pd.DataFrame = dataframe[
+            _local_workout_start_times(dataframe).dt.date == pd.to_datetime(workout_start_date).date()
+        ]
+    else:
+        match = dataframe.iloc[workout_index_utils.get_workout_ids_on_date(date_index, workout_start_date)]
+    if match.empty:
+        return None
 
-    match: pd.DataFrame = dataframe[
-        (dataframe["date"] == pd.to_datetime(workout_start_date).date())
-    ]
-    del match['date']
-
-    return None if match.empty else match.to_dict(orient='records')
+    match = _format_workout_dates(match).replace(np.nan, "", regex=True)
+    match.insert(0, "workoutId", match.index)
+    return match.to_dict(orient='records')
 
 
 def load_unique_workout_dates(dataframe: pd.DataFrame) -> List:
-    if not dataframe.empty:
-        dataframe = dataframe.replace(np.nan, "", regex=True)
+    return _local_workout_start_times(dataframe).dt.strftime('%Y-%m-%d').unique().tolist()
 
-    dataframe["date"] = pd.to_datetime(
-        dataframe["startDate"]).dt.strftime('%Y-%m-%d')
 
-    return dataframe["date"].unique().tolist()
+def get_workout_route_path(workout_file_reference: str, route_detail: str = config.FULL_ROUTE_DETAIL) -> str:
+    """Returns the path of a level of detail of a workout route, the full route when the level was not written."""
+    gpx_file_path = file_utils.format_workout_reference_into_path(workout_file_reference)
+    if route_detail != config.FULL_ROUTE_DETAIL:
+        route_detail_path = route_utils.route_detail_path(gpx_file_path, route_detail)
+        if file_utils.file_exists(route_detail_path):
+            return route_detail_path
+    return gpx_file_path
 
 
-def load_workout_record_gpx_data(workout_file_reference: str):
-    gpx_file_path = file_utils.format_workout_reference_into_path(
-        workout_file_reference)
+def load_workout_route_into_dataframe(workout_file_reference: str,
+                                     route_detail: str = config.FULL_ROUTE_DETAIL) -> pd.DataFrame:
+    gpx_file_path = get_workout_route_path(workout_file_reference, route_detail)
 
     # TODO Add better method to ensure file is not a directory
     if file_utils.file_exists(gpx_file_path) and not os.path.isdir(gpx_file_path):
-        df = pd.read_csv(gpx_file_path)
-        return {
-            'longitude': df['lon'].to_list(),
-            'latitude': df['lat'].to_list(),
-            'elevation': df['elevation'].to_list(),
-            'time': df['time'].to_list(),
-            'speed': df['speed'].to_list(),
-            'course': df['course'].to_list(),
-            'hAcc': df['hAcc'].to_list(),
-            'vAcc': df['vAcc'].to_list()
-        }
+        return DATAFRAME_CACHE.get_or_load(gpx_file_path, lambda: storage_utils.read_dataframe(
+            gpx_file_path, columns=ROUTE_COLUMNS, dtype=schema_utils.ROUTE_DTYPES), ROUTE_COLUMNS)
+    return storage_utils.apply_dtypes(pd.DataFrame(columns=ROUTE_COLUMNS), schema_utils.ROUTE_DTYPES)
+
+
+def load_workout_route_splits(workout_file_reference: str) -> dict:
+    """Loads the split tables written at ingest next to a workout route.
+
+    Returns:
+        The splits of every unit of `config.ROUTE_SPLIT_LENGTHS` as lists of dicts, missing values as None.
+    """
+    splits_path = route_metrics_utils.route_splits_path(
+        file_utils.format_workout_reference_into_path(workout_file_reference))
+    if file_utils.file_exists(splits_path):
+        df = DATAFRAME_CACHE.get_or_load(splits_path, lambda: storage_utils.read_dataframe(
+            splits_path, columns=ROUTE_SPLIT_COLUMNS, dtype=schema_utils.ROUTE_SPLIT_DTYPES), ROUTE_SPLIT_COLUMNS)
+    else:
+        df = pd.DataFrame(columns=ROUTE_SPLIT_COLUMNS)
+
+    df = df.astype(object).where(df.notna(), None)
+    return {
+        unit: df[df["unit"] == unit].drop(columns="unit").to_dict(orient="records")
+        for unit in config.ROUTE_SPLIT_LENGTHS
+    }
+
+
+def _to_json_list(series: pd.Series) -> list:
+    """Returns the values of a series as a list with missing values as None."""
+    return series.astype(object).where(series.notna(), None).to_list()
+
+
+def format_route_into_lists(df: pd.DataFrame) -> dict:
+    return {
+        'longitude': df['lon'].to_list(),
+        'latitude': df['lat'].to_list(),
+        'elevation': df['elevation'].to_list(),
+        'time': df['time'].dt.strftime(ROUTE_TIME_FORMAT).to_list(),
+        'speed': df['speed'].to_list(),
+        'course': df['course'].to_list(),
+        'hAcc': df['hAcc'].to_list(),
+        'vAcc': df['vAcc'].to_list(),
+        'distance': _to_json_list(df['distance']),
+        'pace': _to_json_list(df['pace']),
+        'grade': _to_json_list(df['grade'])
+    }
+
+
+def format_route_into_compact_encoding(df: pd.DataFrame) -> dict:
+    """Encodes a route with `encoding_utils` instead of sending one JSON list per column.
+
+    'path' holds the latitudes and longitudes as a Google encoded polyline and 'time' the
+    epoch milliseconds of the points as base64 zigzag varint deltas. Every other column is
+    encoded with `encoding_utils.encode_quantized` to `config.ROUTE_VALUE_DECIMALS` decimals.
+    Points missing their latitude, longitude or time are dropped, as neither encoding of the
+    path or the times can hold them, and 'pointCount' counts the points that are kept.
+    """
+    df = df[df[['lat', 'lon']].notna().all(axis=1) & df['time'].notna()]
+
+    def numeric(column: str) -> np.ndarray:
+        return df[column].to_numpy(dtype=np.float64)
+
+    times = df['time'].dt.as_unit("ms")
     return {
-        'longitude': [],
-        'latitude': [],
-        'elevation': [],
-        'time': [],
-        'speed': [],
-        'course': [],
-        'hAcc': [],
-        'vAcc': []
+        'encoding': COMPACT_ROUTE_ENCODING,
+        'pointCount': len(df),
+        'path': encoding_utils.encode_polyline(numeric('lat'), numeric('lon'), config.ROUTE_POLYLINE_PRECISION),
+        'time': encoding_utils.encode_varint_deltas(times.array.asi8),
+        **{
+            column: encoding_utils.encode_quantized(numeric(column), config.ROUTE_VALUE_DECIMALS)
+            for column in ('elevation', 'speed', 'course', 'hAcc', 'vAcc', 'distance', 'pace', 'grade')
+        }
     }
+
+
+def load_workout_record_gpx_data(workout_file_reference: str, route_detail: str = config.FULL_ROUTE_DETAIL,
+                                 route_encoding: str = LISTS_ROUTE_ENCODING):
+    """Loads a workout route in `route_encoding` along with its split tables under 'splits'."""
+    df = load_workout_route_into_dataframe(workout_file_reference, route_detail)
+    if route_encoding == COMPACT_ROUTE_ENCODING:
+        route = format_route_into_compact_encoding(df)
+    else:
+        route = format_route_into_lists(df)
+    route['splits'] = load_workout_route_splits(workout_file_reference)
+    return route
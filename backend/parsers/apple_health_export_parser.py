@@ -1,16 +1,69 @@
 import xml.etree.cElementTree as ET
 from werkzeug.datastructures import FileStorage
 from zipfile import ZipFile
+from concurrent.futures import ProcessPoolExecutor
 import os
-import pandas as pd
+import shutil
+import tempfile
 import config
 
-from utils import name_utils as name_utils
+from utils import xml_utils as xml_utils
+from utils import storage_utils as storage_utils
+from utils import schema_utils as schema_utils
 from utils import file_utils as file_utils
+from utils import workout_sample_utils as workout_sample_utils
+from utils import workout_index_utils as workout_index_utils
+from utils import route_utils as route_utils
+from utils import route_metrics_utils as route_metrics_utils
 
-from parsers.activity_summary_parser import ActivitySummaryParser
-from parsers.workout_record_parser import WorkoutRouteParser, WorkoutRecordParser
-from parsers.health_record_parser import HealthRecordParser
+from parsers import sharded_record_parser as sharded_record_parser
+from parsers.workout_record_parser import StreamingWorkoutRouteParser
+from parsers.export_element_handlers import (
+    ExportElementHandler,
+    HealthRecordElementHandler,
+    WorkoutElementHandler,
+    ActivitySummaryElementHandler
+)
+
+
+_worker_zip_file = None
+_worker_output_directory = None
+
+
+def write_workout_route_file(zip_file: ZipFile, gpx_file_path: str, output_directory: str) -> str:
+    """Parses a single gpx member of the export archive and writes its track points to a route file.
+
+    Args:
+        zip_file: The open export archive.
+        gpx_file_path: The name of the gpx member within the archive.
+        output_directory: The directory the route file is written to.
+
+    The track points are written with the metrics of `route_metrics_utils.add_route_metrics`, and every
+    level of detail of `config.ROUTE_DETAIL_TOLERANCES` and the split tables are written next to the route file.
+
+    Returns:
+        The path of the written route file, named after the gpx file.
+    """
+    with zip_file.open(gpx_file_path) as gpx_file:
+        df = route_metrics_utils.add_route_metrics(StreamingWorkoutRouteParser(gpx_file).to_dataframe())
+
+    output_path = storage_utils.storage_file_path(
+        os.path.join(output_directory, os.path.basename(gpx_file_path)))
+    storage_utils.write_dataframe(df, output_path)
+    route_utils.write_route_details(output_path, df)
+    route_metrics_utils.write_route_splits(output_path, df)
+    return output_path
+
+
+def _initialize_gpx_worker(archive_path: str, output_directory: str) -> None:
+    """Opens the export archive once per worker process of the gpx process pool."""
+    global _worker_zip_file, _worker_output_directory
+    _worker_zip_file = ZipFile(archive_path, "r")
+    _worker_output_directory = output_directory
+
+
+def _parse_gpx_member(gpx_file_path: str) -> str:
+    return write_workout_route_file(_worker_zip_file, gpx_file_path, _worker_output_directory)
 
 
 class AppleHealthExportParser:
@@ -27,8 +80,15 @@ class AppleHealthExportParser:
         self.electrocardiograms_directory_path = os.path.join(
             self.export_file_path, "electrocardiograms")
         
+        self.spooled_export_path = None
+
         self._validate_apple_health_export()
 
+        self.element_handlers = {}
+        self.register_element_handler(HealthRecordElementHandler())
+        self.register_element_handler(WorkoutElementHandler())
+        self.register_element_handler(ActivitySummaryElementHandler())
+
     def _validate_apple_health_export(self):
         """Validates whether the provided file is a valid Apple Health export.
 
@@ -57,112 +117,189 @@ class AppleHealthExportParser:
             raise ValueError(
                 f"Invalid Apple Health export: '{self.export_file_path}' not found in the archive.") from e
 
-    def _parse_activity_summary_elements(self) -> None:
-        """Parses activity summary elements from the Apple Health export XML and writes them to a CSV file.
+    def register_element_handler(self, handler: ExportElementHandler) -> None:
+        """Registers a handler to receive every element matching its tag during the export pass.
 
-        This method opens the Apple Health export XML file within the ZIP archive, then iteratively parses
-        the XML to find and process each 'ActivitySummary' element. Each parsed element is converted into
-        a CSV-compatible row structure using the ActivitySummaryParser. The method accumulates these
-        row structures into a list and, once all elements have been processed, writes the list to a CSV
-        file at the specified path.
+        Only one handler can be registered per tag; registering another handler for the
+        same tag replaces the previous one. Handlers should target top-level elements of
+        the export since matched elements are cleared once they have been handled.
+
+        Args:
+            handler: The ExportElementHandler to dispatch matching elements to.
         """
+        self.element_handlers[handler.TAG] = handler
+
+    def _parse_export_elements(self) -> None:
+        """Parses the Apple Health export XML in a single pass, dispatching elements to their handlers.
 
-        activity_summary_path = os.path.join(
-            config.HEALTH_ELEMENTS_ACTIVITY_DIRECTORY, config.ACTIVITY_SUMMARY_FILE_NAME)
-        parsed_activity_summaries = []
-
-        with self.zipFile.open(self.health_export_file_path) as xml_file:
-            for _, elem in ET.iterparse(xml_file, events=("end",)):
-                if elem.tag == "ActivitySummary":
-                    parsed_activity_summaries.append(
-                        ActivitySummaryParser(elem).csv_row_structure()
-                    )
-                    elem.clear()
-
-        df = pd.DataFrame(parsed_activity_summaries,
-                          columns=ActivitySummaryParser.ACTIVITY_SUMMARY_COLUMNS)
-        df.to_csv(activity_summary_path, index=False, header=True)
-
-    def _parse_workout_elements(self) -> None:
-        """Parses workout elements from the Apple Health export XML and writes them to a CSV file.
-
-        This method opens the Apple Health export XML file within the ZIP archive, then iteratively parses
-        the XML to find and process each 'Workout' element. Each parsed element is converted into
-        a CSV-compatible row structure using the WorkoutRecordParser. The method accumulates these
-        row structures into a list and, once all elements have been processed, writes the list to a CSV
-        file at the specified path.
+        This method opens the Apple Health export XML file within the ZIP archive once, then iteratively
+        parses the XML with the configured XML backend (as parallel byte-range shards for large exports) and
+        hands every element whose tag has a registered handler to that handler. Processed
+        subtrees are pruned from the document as the pass goes so memory stays bounded. Once all elements
+        have been processed each handler is closed so it can write out its results.
         """
-        parsed_workout_path = os.path.join(
-            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUTS_SUMMARY_FILE_NAME)
-        parsed_workouts = []
-
-        with self.zipFile.open(self.health_export_file_path) as xml_file:
-            for event, elem in ET.iterparse(xml_file, events=("end",)):
-                if elem.tag == 'Workout':
-                    parsed_workouts.append(
-                        list(WorkoutRecordParser(elem).csv_row_structure())
-                    )
-                    elem.clear()
-
-        df = pd.DataFrame(
-            parsed_workouts, columns=WorkoutRecordParser.MASTER_WORKOUT_COLUMNS)
-        df.to_csv(parsed_workout_path, index=False, header=True)
-
-    def _parse_health_record_elements(self) -> None:
-        """Parses health record elements from the Apple Health export XML and writes them to a CSV file.
-
-        This method opens the Apple Health export XML file within the ZIP archive, then iteratively parses
-        the XML to find and process each 'Record' element. Each parsed element is converted into
-        a CSV-compatible row structure using the HealthRecordParser. The method accumulates these
-        row structures into a list and, once all elements have been processed, writes the list to a CSV
-        file at the specified path.
+        shard_count = self._get_record_shard_count()
+        if shard_count > 1:
+            self._parse_export_elements_in_shards(shard_count)
+        else:
+            with self.zipFile.open(self.health_export_file_path) as xml_file:
+                xml_utils.get_xml_backend().parse(xml_file, self.element_handlers)
+
+        for handler in self.element_handlers.values():
+            handler.close()
+
+    def _join_workout_samples(self) -> None:
+        """Writes the rows of every workout's samples in the record files of `config.WORKOUT_SAMPLE_RECORDS`.
+
+        Runs once the record and workout files have been written, see `workout_sample_utils`.
         """
-        records_data = {}
-
-        with self.zipFile.open(self.health_export_file_path) as xml_file:
-            for event, elem in ET.iterparse(xml_file, events=("end",)):
-                if elem.tag == 'Record':
-                    if elem.get('sourceName') != "Health":
-                        record_type = name_utils.remove_record_type_prefix(
-                            elem.get("type")
-                        )
-                        if record_type not in records_data:
-                            records_data[record_type] = []
-
-                        current_record = HealthRecordParser(elem)
-                        records_data[record_type].append(
-                            current_record.csv_row_structure()
-                        )
-                    elem.clear()
-
-        for record_type, record_list in records_data.items():
-            df = pd.DataFrame(
-                record_list, columns=HealthRecordParser.get_column_type(record_type))
-            df.to_csv(os.path.join(file_utils.match_record_type_to_directory(record_type),
-                      f"{record_type}.csv"), index=False, header=True)
+        workouts_path = storage_utils.storage_file_path(os.path.join(
+            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUTS_SUMMARY_FILE_NAME))
+        if not file_utils.file_exists(workouts_path):
+            return
+
+        workouts = storage_utils.read_dataframe(
+            workouts_path, columns=["startDate", "endDate"], dtype=schema_utils.WORKOUT_DATE_DTYPES)
+        record_paths = {record_name: file_utils.format_record_type_into_path(record_name)
+                        for record_name in config.WORKOUT_SAMPLE_RECORDS}
+        workout_sample_utils.write_workout_sample_offsets(
+            workouts, record_paths, storage_utils.storage_file_path(os.path.join(
+                config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_SAMPLE_OFFSETS_FILE_NAME)))
+
+    def _index_workouts(self) -> None:
+        """Writes the workouts date index and details once the workouts summary has been written.
+
+        See `workout_index_utils`.
+        """
+        workouts_path = storage_utils.storage_file_path(os.path.join(
+            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUTS_SUMMARY_FILE_NAME))
+        if not file_utils.file_exists(workouts_path):
+            return
+
+        workouts = storage_utils.read_dataframe(
+            workouts_path, columns=["startDate", "startDateTzOffset"], dtype=schema_utils.WORKOUT_DATE_DTYPES)
+        workout_index_utils.write_workout_indexes(
+            workouts,
+            storage_utils.storage_file_path(os.path.join(
+                config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_DATE_INDEX_FILE_NAME)),
+            os.path.join(config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_DETAILS_FILE_NAME))
+
+    def _get_record_shard_count(self) -> int:
+        """Determines how many byte-range shards the export XML should be split into.
+
+        Sharding needs a HealthRecordElementHandler registered for 'Record' elements and at least
+        `config.RECORD_PARSER_MIN_SHARD_BYTES` of XML per shard, capped by the number of workers.
+        """
+        record_handler = self.element_handlers.get(HealthRecordElementHandler.TAG)
+        if not isinstance(record_handler, HealthRecordElementHandler):
+            return 1
+
+        export_size = self.zipFile.getinfo(self.health_export_file_path).file_size
+        return min(config.RECORD_PARSER_MAX_WORKERS or 1,
+                   export_size // config.RECORD_PARSER_MIN_SHARD_BYTES)
+
+    def _parse_export_elements_in_shards(self, shard_count: int) -> None:
+        """Parses the export XML as byte-range shards across a process pool.
+
+        The export XML is extracted once to a temporary file and split into byte ranges aligned on
+        top-level 'Record' elements. Each worker writes its records to per-shard record files, each
+        sorted by 'startDate', and returns the other registered elements it found as serialized XML.
+        Shards are then merged in order: their elements are dispatched to the registered handlers
+        and their record files are moved in as runs of the record handler's writers, which merge
+        them when the handler is closed, keeping document order among records starting together.
+
+        The merge of every record type is the serial tail of a sharded parse. It reads each run
+        once in small record batches, without parsing or sorting any row again, but runs on one
+        core, `config.RECORD_WRITER_MERGE_FAN_IN` runs at a time.
+        """
+        record_handler = self.element_handlers[HealthRecordElementHandler.TAG]
+        other_tags = set(self.element_handlers.keys()) - {HealthRecordElementHandler.TAG}
+
+        with tempfile.TemporaryDirectory() as shard_root_directory:
+            xml_path = os.path.join(shard_root_directory, "export.xml")
+            with self.zipFile.open(self.health_export_file_path) as xml_file, open(xml_path, "wb") as extracted_file:
+                shutil.copyfileobj(xml_file, extracted_file)
+
+            shards = sharded_record_parser.find_record_shard_boundaries(
+                xml_path, shard_count)
+            shard_directories = [os.path.join(shard_root_directory, f"shard-{index}")
+                                 for index in range(len(shards))]
+            for shard_directory in shard_directories:
+                os.makedirs(shard_directory)
+
+            with ProcessPoolExecutor(max_workers=len(shards)) as executor:
+                shard_results = executor.map(
+                    sharded_record_parser.parse_record_shard,
+                    [xml_path] * len(shards),
+                    [start for start, _ in shards],
+                    [end for _, end in shards],
+                    shard_directories,
+                    [other_tags] * len(shards)
+                )
+
+                for record_runs, other_elements in shard_results:
+                    for serialized_element in other_elements:
+                        elem = ET.fromstring(serialized_element)
+                        self.element_handlers[elem.tag].handle(elem)
+                    for record_type, (record_path, row_count) in record_runs.items():
+                        record_handler.append_record_run(record_type, record_path, row_count)
+
+    def _get_export_archive_path(self) -> str:
+        """Returns a filesystem path to the export archive so worker processes can open it by name.
+
+        Uploaded exports only exist as a stream, so they are spooled to a temporary file the
+        first time a path is needed. The temporary file is removed once parsing has finished.
+        """
+        if isinstance(self.export_file, (str, os.PathLike)):
+            return os.fspath(self.export_file)
+
+        if self.spooled_export_path is None:
+            self.export_file.seek(0)
+            with tempfile.NamedTemporaryFile(suffix=".zip", delete=False) as spooled_export:
+                shutil.copyfileobj(self.export_file, spooled_export)
+            self.spooled_export_path = spooled_export.name
+        return self.spooled_export_path
+
+    def _remove_spooled_export(self) -> None:
+        if self.spooled_export_path is not None:
+            os.remove(self.spooled_export_path)
+            self.spooled_export_path = None
 
     def _parse_gpx_files(self) -> None:
-        """Parses gpx files from the Apple Health export zip and writes them to a CSV file.
+        """Parses gpx files from the Apple Health export zip and writes each one to a CSV file.
+
+        When `config.GPX_PARSER_MAX_WORKERS` allows more than one worker, the route files are
+        fanned out to a process pool where each worker opens the archive once and parses the
+        members it is given by name. Output file names only depend on the route file name, so
+        the serial and parallel paths write the same files.
         """
         gpx_file_paths = [
             file.filename
             for file in self.zipFile.infolist()
             if file.filename.startswith(self.workout_routes_directory_path)
+            and file.filename.endswith(".gpx")
         ]
+        max_workers = min(config.GPX_PARSER_MAX_WORKERS or 1, len(gpx_file_paths))
 
-        for gpx_file_path in gpx_file_paths:
-            ns = {"gpx": "http://www.topografix.com/GPX/1/1"}
-            with self.zipFile.open(gpx_file_path) as gpx_file:
-                tracks = ET.parse(gpx_file).getroot().findall('gpx:trk', ns)
-                df = WorkoutRouteParser(tracks).to_dataframe()
+        if max_workers <= 1:
+            for gpx_file_path in gpx_file_paths:
+                write_workout_route_file(
+                    self.zipFile, gpx_file_path, config.WORKOUT_ROUTE_ELEMENTS_DIRECTORY)
+            return
 
-            filename_without_extension, _ = os.path.splitext(
-                os.path.basename(gpx_file_path))
-            df.to_csv(os.path.join(config.WORKOUT_ROUTE_ELEMENTS_DIRECTORY,
-                      f"{filename_without_extension}.csv"), index=False, header=True)
+        with ProcessPoolExecutor(
+                max_workers=max_workers,
+                initializer=_initialize_gpx_worker,
+                initargs=(self._get_export_archive_path(), config.WORKOUT_ROUTE_ELEMENTS_DIRECTORY)) as executor:
+            chunksize = max(1, len(gpx_file_paths) // (max_workers * 4))
+            for _ in executor.map(_parse_gpx_member, gpx_file_paths, chunksize=chunksize):
+                pass
 
     def parse_health_elements(self):
-        self._parse_gpx_files()
-        self._parse_health_record_elements()
-        self._parse_activity_summary_elements()
-        self._parse_workout_elements()
+        try:
+            self._parse_gpx_files()
+            self._parse_export_elements()
+            self._join_workout_samples()
+            self._index_workouts()
+        finally:
+            self._remove_spooled_export()
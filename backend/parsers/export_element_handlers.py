@@ -0,0 +1,223 @@
+"""
+Handlers that consume elements dispatched from a single pass over the Apple Health export XML.
+
+This module provides the `ExportElementHandler` base class along with the handlers
+used by `AppleHealthExportParser` for the `Record`, `Workout` and `ActivitySummary`
+elements. Each handler receives the matching elements as the export is streamed and
+writes its output once the pass has finished.
+
+Usage example:
+    handler = WorkoutElementHandler()
+    handler.handle(workout_element)
+    handler.close()
+"""
+
+import xml.etree.cElementTree as ET
+import os
+import pandas as pd
+import config
+
+from utils import file_utils as file_utils
+from utils import storage_utils as storage_utils
+from utils import schema_utils as schema_utils
+from utils import series_utils as series_utils
+from utils import writer_utils as writer_utils
+from utils.writer_utils import ChunkedRecordWriter
+
+from parsers.activity_summary_parser import ActivitySummaryParser
+from parsers.workout_record_parser import WorkoutRecordParser
+from parsers.health_record_parser import HealthRecordParser, health_record_row, element_metadata
+
+
+class ExportElementHandler:
+    """Base class for the handlers registered on the export XML pass.
+
+    Subclasses set `TAG` to the element tag they consume, implement `handle`
+    to process a single element and `close` to write out their results.
+
+    Handlers that only need an element's attributes and the key/value pairs of its
+    'MetadataEntry' children set `ATTRIBUTES_ONLY` and implement `handle_attributes`,
+    which lets XML backends skip building an element tree for them.
+    """
+
+    TAG = None
+    ATTRIBUTES_ONLY = False
+
+    def handle(self, element: ET.Element) -> None:
+        """Processes a single element matching the handler's tag.
+
+        Args:
+            element: An XML Element whose tag matches `TAG`.
+        """
+        raise NotImplementedError
+
+    def handle_attributes(self, attributes: dict, metadata: dict) -> None:
+        """Processes a single element matching the handler's tag from its attributes.
+
+        Args:
+            attributes: The attributes of the element.
+            metadata: The values of the element's 'MetadataEntry' children keyed by
+                their key, keeping the first entry when a key is repeated.
+        """
+        raise NotImplementedError
+
+    def close(self) -> None:
+        """Writes out the handler's results once every element has been handled."""
+        raise NotImplementedError
+
+
+class HealthRecordElementHandler(ExportElementHandler):
+    """Streams 'Record' elements into one chunked writer per record type.
+
+    Every record file is sorted by 'startDate' so readers can slice time windows out
+    of it with a binary search.
+    """
+
+    TAG = "Record"
+    ATTRIBUTES_ONLY = True
+
+    def __init__(self, max_buffered_rows: int = None, max_buffered_bytes: int = None,
+                 output_directory: str = None, series_records: list = None, sorted_runs: bool = False):
+        """Initializes the handler.
+
+        Args:
+            max_buffered_rows: Row threshold passed to each record type's writer.
+            max_buffered_bytes: Byte threshold passed to each record type's writer.
+            output_directory: Writes every record file to this directory instead of
+                the directory matching its record type.
+            series_records: Record types whose series are also written as memory-mapped
+                arrays once their file is complete, defaults to `config.MMAP_SERIES_RECORDS`.
+            sorted_runs: Writes every record file as a run for another handler to merge with
+                `append_record_run`, in `writer_utils.RUN_STORAGE_FORMAT` and its record batches.
+        """
+        self.max_buffered_rows = max_buffered_rows
+        self.max_buffered_bytes = max_buffered_bytes
+        self.output_directory = output_directory
+        self.series_records = config.MMAP_SERIES_RECORDS if series_records is None else series_records
+        self.sorted_runs = sorted_runs
+        self.record_writers = {}
+
+    def _get_record_path(self, record_type: str) -> str:
+        directory = self.output_directory or file_utils.match_record_type_to_directory(
+            record_type)
+        return storage_utils.storage_file_path(os.path.join(directory, record_type),
+                                               writer_utils.RUN_STORAGE_FORMAT if self.sorted_runs else None)
+
+    def _get_record_writer(self, record_type: str) -> ChunkedRecordWriter:
+        if record_type not in self.record_writers:
+            self.record_writers[record_type] = ChunkedRecordWriter(
+                self._get_record_path(record_type),
+                HealthRecordParser.get_column_type(record_type),
+                self.max_buffered_rows,
+                self.max_buffered_bytes,
+                schema_utils.get_record_dtypes(record_type),
+                sort_column="startDate",
+                max_batch_rows=writer_utils.run_batch_rows(self.max_buffered_rows) if self.sorted_runs else None
+            )
+        return self.record_writers[record_type]
+
+    def handle(self, element: ET.Element) -> None:
+        self.handle_attributes(element.attrib, element_metadata(element))
+
+    def handle_attributes(self, attributes: dict, metadata: dict) -> None:
+        if attributes.get('sourceName') == "Health":
+            return
+
+        row = health_record_row(attributes, metadata)
+        self._get_record_writer(row[0]).append(row)
+
+    def append_record_run(self, record_type: str, record_path: str, row_count: int) -> None:
+        """Moves in a record file written by a handler with `sorted_runs`, such as a parsed shard.
+
+        The file is merged into the record type's file when the handler is closed, after the
+        records handled or appended before it, see `ChunkedRecordWriter.append_sorted_run`.
+
+        Args:
+            record_type: The record type the file holds.
+            record_path: The path of the record file.
+            row_count: The number of records of the file.
+        """
+        self._get_record_writer(record_type).append_sorted_run(record_path, row_count)
+
+    def close(self) -> None:
+        for record_type, record_writer in self.record_writers.items():
+            record_writer.close()
+            if record_type in self.series_records:
+                series_utils.write_series_arrays(
+                    record_writer.output_path,
+                    storage_utils.iter_dataframe_chunks(
+                        record_writer.output_path, record_writer.max_buffered_rows, record_writer.dtypes),
+                    record_writer.rows_written,
+                    record_writer.dtypes)
+
+
+class WorkoutElementHandler(ExportElementHandler):
+    """Collects 'Workout' elements and writes them to the workouts summary file.
+
+    Every statistic of every workout is also written in long format to the workout
+    statistics file, keyed by the workout's row in the workouts summary.
+    """
+
+    TAG = "Workout"
+
+    def __init__(self):
+        self.parsed_workouts = []
+        self.parsed_workout_statistics = []
+
+    def handle(self, element: ET.Element) -> None:
+        workout_id = len(self.parsed_workouts)
+        workout = WorkoutRecordParser(element)
+        self.parsed_workouts.append(list(workout.csv_row_structure()))
+        self.parsed_workout_statistics.extend(
+            (workout_id,) + statistic for statistic in workout.statistics_rows()
+        )
+
+    def close(self) -> None:
+        parsed_workout_path = storage_utils.storage_file_path(os.path.join(
+            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUTS_SUMMARY_FILE_NAME))
+        df = pd.DataFrame(
+            self.parsed_workouts, columns=WorkoutRecordParser.MASTER_WORKOUT_COLUMNS)
+        df = storage_utils.apply_dtypes(df, schema_utils.WORKOUT_DATE_DTYPES)
+        storage_utils.write_dataframe(df, parsed_workout_path)
+
+        workout_statistics_path = storage_utils.storage_file_path(os.path.join(
+            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_STATISTICS_FILE_NAME))
+        df = pd.DataFrame(self.parsed_workout_statistics,
+                          columns=["workoutId"] + WorkoutRecordParser.WORKOUT_STATISTICS_LONG_COLUMNS)
+        df = storage_utils.apply_dtypes(df, schema_utils.WORKOUT_STATISTICS_DATE_DTYPES)
+        storage_utils.write_dataframe(df, workout_statistics_path)
+
+
+class SerializedElementCollector(ExportElementHandler):
+    """Collects elements of a tag as serialized XML so they can be handled in another process."""
+
+    def __init__(self, tag: str, serialized_elements: list):
+        self.TAG = tag
+        self.serialized_elements = serialized_elements
+
+    def handle(self, element: ET.Element) -> None:
+        self.serialized_elements.append(ET.tostring(element))
+
+    def close(self) -> None:
+        pass
+
+
+class ActivitySummaryElementHandler(ExportElementHandler):
+    """Collects 'ActivitySummary' elements and writes them to the activity summary file."""
+
+    TAG = "ActivitySummary"
+
+    def __init__(self):
+        self.parsed_activity_summaries = []
+
+    def handle(self, element: ET.Element) -> None:
+        self.parsed_activity_summaries.append(
+            ActivitySummaryParser(element).csv_row_structure()
+        )
+
+    def close(self) -> None:
+        activity_summary_path = storage_utils.storage_file_path(os.path.join(
+            config.HEALTH_ELEMENTS_ACTIVITY_DIRECTORY, config.ACTIVITY_SUMMARY_FILE_NAME))
+        df = pd.DataFrame(self.parsed_activity_summaries,
+                          columns=ActivitySummaryParser.ACTIVITY_SUMMARY_COLUMNS)
+        storage_utils.write_dataframe(df, activity_summary_path)
@@ -5,13 +5,19 @@ This module provides the `HealthRecordParser` class, which is used to parse
 health records stored in XML format and convert them into tuples that can be
 exported to CSV files.
 
+The module also provides `health_record_row`, the ingestion fast path, which builds
+the same row structure directly from a record's attributes and metadata without
+creating a parser object per record.
+
 Usage example:
     parser = HealthRecordParser(record)
     csv_row = parser.csv_row_structure()
+    csv_row = health_record_row(attributes, metadata)
 """
 
 import xml.etree.cElementTree as ET
-from config import HeartRateMotionContext, VO2MaxTestType
+import config
+from config import AppleHealthPrefix, HeartRateMotionContext, VO2MaxTestType
 from utils import name_utils as name_utils
 
 
@@ -172,3 +178,88 @@ class HealthRecordParser:
                 return self._format_VO2_max_record()
             case _:
                 return self._get_default_record_data()
+
+
+def _build_record_type_names() -> dict:
+    """Maps every prefixed HealthKit identifier of the known record types to its record type."""
+    prefixes = [
+        AppleHealthPrefix.QUANTITY_TYPE_IDENTIFIER.value,
+        AppleHealthPrefix.CATEGORY_TYPE_IDENTIFIER.value,
+        AppleHealthPrefix.HEALTH_KIT_DATA_TYPE.value,
+    ]
+    return {prefix + record_type: record_type
+            for prefix in prefixes for record_type in config.ALL_RECORDS}
+
+
+def _build_enum_value_names(enum) -> dict:
+    """Maps the raw metadata value of every enum member to its formatted name."""
+    return {str(member.value): enum.from_value(member.value) for member in enum}
+
+
+RECORD_TYPE_NAMES = _build_record_type_names()
+HEART_RATE_MOTION_CONTEXT_NAMES = _build_enum_value_names(HeartRateMotionContext)
+VO2_MAX_TEST_TYPE_NAMES = _build_enum_value_names(VO2MaxTestType)
+
+
+def _get_record_type_name(raw_record_type: str) -> str:
+    record_type = RECORD_TYPE_NAMES.get(raw_record_type)
+    if record_type is None:
+        # Identifiers missing from the table go through the memoized normalizer
+        record_type = name_utils.remove_record_type_prefix(raw_record_type)
+    return record_type
+
+
+def _get_metadata_value_name(metadata: dict, key: str, value_names: dict, enum) -> str:
+    value = metadata.get(key)
+    if value is None:
+        return 'NOT FOUND'
+    name = value_names.get(value)
+    return name if name is not None else enum.from_value(int(value))
+
+
+def health_record_row(attributes: dict, metadata: dict) -> tuple:
+    """Builds the CSV row structure of a health record straight from its attributes.
+
+    Produces the same row as `HealthRecordParser.csv_row_structure` without creating a
+    parser object. Record types are looked up in a precomputed table and device strings
+    are parsed once per distinct value, so the only allocation per record is the row.
+
+    Args:
+        attributes: The attributes of the 'Record' element.
+        metadata: The values of the record's 'MetadataEntry' children keyed by their key.
+
+    Returns:
+        A tuple representing the CSV row structure for the record.
+    """
+    get = attributes.get
+    record_type = _get_record_type_name(get("type"))
+
+    if record_type == 'HeartRate':
+        return (
+            record_type, get("unit"), get("value"), get("sourceName"), get("sourceVersion"),
+            name_utils.extract_device_name(get("device")), get("creationDate"), get("startDate"), get("endDate"),
+            _get_metadata_value_name(metadata, "HKMetadataKeyHeartRateMotionContext",
+                                     HEART_RATE_MOTION_CONTEXT_NAMES, HeartRateMotionContext),
+        )
+    if record_type == 'VO2Max':
+        return (
+            record_type, get("unit"), get("value"), get("sourceName"), get("sourceVersion"),
+            name_utils.extract_device_name(get("device")), get("creationDate"), get("startDate"), get("endDate"),
+            _get_metadata_value_name(metadata, "HKVO2MaxTestType",
+                                     VO2_MAX_TEST_TYPE_NAMES, VO2MaxTestType),
+        )
+    return (
+        record_type, get("unit"), get("value"), get("sourceName"), get("sourceVersion"),
+        name_utils.extract_device_name(get("device")), get("creationDate"), get("startDate"), get("endDate"),
+    )
+
+
+def element_metadata(record: ET.Element) -> dict:
+    """Returns the values of a record element's 'MetadataEntry' children keyed by their key.
+
+    The first entry is kept when a key is repeated, matching `HealthRecordParser`.
+    """
+    metadata = {}
+    for metadata_entry in record.iterfind('MetadataEntry'):
+        metadata.setdefault(metadata_entry.get("key"), metadata_entry.get("value"))
+    return metadata
@@ -0,0 +1,134 @@
+"""
+Parses byte-range shards of an extracted Apple Health export XML in parallel.
+
+This module splits the body of an extracted `export.xml` into byte ranges that start
+on top-level `<Record` elements so each range can be parsed on its own by a worker
+process. Workers stream their `Record` elements into per-shard record files, sorted runs
+the main process's record writers merge directly, and hand every other registered element
+back as serialized XML, so the main process can merge the shards in document order.
+
+Usage example:
+    shards = find_record_shard_boundaries(xml_path, 4)
+    record_runs, elements = parse_record_shard(xml_path, *shards[0], shard_directory, {"Workout"})
+"""
+
+import mmap
+from typing import Dict, List, Tuple
+
+from utils import xml_utils as xml_utils
+from parsers.export_element_handlers import HealthRecordElementHandler, SerializedElementCollector
+
+# Apple indents every top-level element of the export with a single space, nested
+# Record elements (inside a Correlation for example) are indented further.
+TOP_LEVEL_RECORD_MARKER = b"\n <Record "
+SHARD_ROOT_START_TAG = b"<HealthData>"
+SHARD_ROOT_END_TAG = b"</HealthData>"
+
+
+class ByteRangeReader:
+    """A read-only binary file object exposing a byte range of a file wrapped in a root element."""
+
+    def __init__(self, file_path: str, start: int, end: int,
+                 prefix: bytes = SHARD_ROOT_START_TAG, suffix: bytes = SHARD_ROOT_END_TAG):
+        self.file = open(file_path, "rb")
+        self.file.seek(start)
+        self.remaining = end - start
+        self.prefix = prefix
+        self.suffix = suffix
+
+    def read(self, size: int = -1) -> bytes:
+        if size is None or size < 0:
+            size = len(self.prefix) + self.remaining + len(self.suffix)
+
+        data = self.prefix[:size]
+        self.prefix = self.prefix[len(data):]
+
+        if len(data) < size and self.remaining:
+            chunk = self.file.read(min(size - len(data), self.remaining))
+            self.remaining -= len(chunk)
+            data += chunk
+
+        if len(data) < size and not self.remaining:
+            suffix = self.suffix[:size - len(data)]
+            self.suffix = self.suffix[len(suffix):]
+            data += suffix
+
+        return data
+
+    def close(self) -> None:
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def find_record_shard_boundaries(xml_path: str, shard_count: int) -> List[Tuple[int, int]]:
+    """Splits the body of the export XML into byte ranges aligned on top-level `<Record` elements.
+
+    The body is divided into `shard_count` roughly equal ranges, then every boundary is
+    moved forward to the start of the next top-level `<Record` element. Boundaries that
+    would land past the last record are dropped, so fewer shards may be returned.
+
+    Args:
+        xml_path: The path of the extracted export XML.
+        shard_count: The number of shards to aim for.
+
+    Returns:
+        A list of (start, end) byte offsets covering the body of the root element.
+    """
+    with open(xml_path, "rb") as xml_file, \
+            mmap.mmap(xml_file.fileno(), 0, access=mmap.ACCESS_READ) as xml_map:
+        body_start = xml_map.find(b">", xml_map.find(b"<HealthData")) + 1
+        body_end = xml_map.rfind(b"</HealthData>")
+
+        boundaries = [body_start]
+        for shard_index in range(1, shard_count):
+            target = body_start + (body_end - body_start) * shard_index // shard_count
+            marker = xml_map.find(TOP_LEVEL_RECORD_MARKER,
+                                  max(target, boundaries[-1]), body_end)
+            if marker == -1:
+                break
+            boundary = marker + 1
+            if boundary > boundaries[-1]:
+                boundaries.append(boundary)
+        boundaries.append(body_end)
+
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
+def parse_record_shard(xml_path: str, start: int, end: int, shard_directory: str,
+                       other_tags: set) -> Tuple[Dict[str, Tuple[str, int]], List[bytes]]:
+    """Parses a byte range of the export XML, writing its records to per-shard sorted runs.
+
+    Args:
+        xml_path: The path of the extracted export XML.
+        start: The offset the shard starts at, on an element boundary.
+        end: The offset the shard ends at, on an element boundary.
+        shard_directory: The directory the shard's record files are written to.
+        other_tags: Tags of other elements to hand back to the caller.
+
+    Returns:
+        A tuple of the path and row count of the record files written to `shard_directory`
+        keyed by record type, see `HealthRecordElementHandler.append_record_run`, and the
+        serialized elements matching `other_tags`, in document order.
+    """
+    record_handler = HealthRecordElementHandler(output_directory=shard_directory, series_records=[],
+                                                sorted_runs=True)
+    other_elements = []
+    element_handlers = {tag: SerializedElementCollector(tag, other_elements)
+                        for tag in other_tags}
+    element_handlers[HealthRecordElementHandler.TAG] = record_handler
+
+    with ByteRangeReader(xml_path, start, end) as shard_file:
+        xml_utils.get_xml_backend().parse(shard_file, element_handlers)
+
+    record_handler.close()
+    record_runs = {
+        record_type: (record_writer.output_path, record_writer.rows_written)
+        for record_type, record_writer in record_handler.record_writers.items()
+    }
+    return record_runs, other_elements
+
@@ -2,7 +2,9 @@
 Parses Apple health workout data and converts it into CSV-compatible row structures.
 
 This module provides the `WorkoutRouteParser` class, which is used to parse
-tracks elements stored in a GPX format and convert them into a dataframe.
+tracks elements stored in a GPX format and convert them into a dataframe, and the
+`StreamingWorkoutRouteParser` class, which streams the track points of a GPX file
+into typed NumPy arrays without building the file's element tree.
 
 This module provides the `WorkoutRecordParser` class, which is used to parse
 Workout elements stored in a xml format and convert them into tuples that can
@@ -12,6 +14,9 @@ Usage example:
     workout_tracks = WorkoutRouteParser(tracks)
     df = workout_tracks.to_dataframe()
 
+Usage example:
+    df = StreamingWorkoutRouteParser(gpx_file).to_dataframe()
+
 Usage example:
     workout = WorkoutRecordParser(workout)
     workout_csv_row = workout.csv_row_structure()
@@ -19,7 +24,9 @@ Usage example:
 
 import xml.etree.cElementTree as ET
 from utils import name_utils as name_utils
-from typing import List
+from utils import date_utils as date_utils
+from typing import IO, Dict, List
+import numpy as np
 import pandas as pd
 import config
 
@@ -132,6 +139,140 @@ class WorkoutRouteParser:
         return pd.DataFrame(self.workout_route_data, columns=self.WORKOUT_ROUTE_COLUMNS)
 
 
+class StreamingWorkoutRouteParser:
+    """Streams the track points of a GPX file into preallocated float64 NumPy buffers.
+
+    Track points are read from their end events and detached from their segment as soon
+    as their values have been copied, so the file's element tree is never built. Every
+    value is converted to a number as it is read, missing values become NaN, and the
+    times are converted to UTC timestamps at once when the file has been read.
+    """
+
+    GPX_NAMESPACE = "{http://www.topografix.com/GPX/1/1}"
+    NUMERIC_COLUMNS = ["lon", "lat", "elevation", "speed", "course", "hAcc", "vAcc"]
+    INITIAL_CAPACITY = 4096
+
+    def __init__(self, gpx_file: IO[bytes], initial_capacity: int = None):
+        """Initializes the parser.
+
+        Args:
+            gpx_file: A binary file-like object containing the GPX document.
+            initial_capacity: The number of track points the buffers are allocated for,
+                they double in size whenever they are full.
+        """
+        self.gpx_file = gpx_file
+        self.capacity = initial_capacity or self.INITIAL_CAPACITY
+        self.point_count = 0
+        self.buffers = {column: np.full(self.capacity, np.nan) for column in self.NUMERIC_COLUMNS}
+        self.times = np.empty(self.capacity, dtype=object)
+
+        # Columns of the numeric child elements of a track point, keyed by their namespaced tag
+        self.value_tags = {
+            f"{self.GPX_NAMESPACE}{tag}": column
+            for tag, column in (("ele", "elevation"), ("speed", "speed"), ("course", "course"),
+                                ("hAcc", "hAcc"), ("vAcc", "vAcc"))
+        }
+        self.track_point_tag = f"{self.GPX_NAMESPACE}trkpt"
+        self.track_segment_tag = f"{self.GPX_NAMESPACE}trkseg"
+        self.time_tag = f"{self.GPX_NAMESPACE}time"
+        self.extensions_tag = f"{self.GPX_NAMESPACE}extensions"
+
+    def _grow_buffers(self) -> None:
+        self.capacity *= 2
+        for column, buffer in self.buffers.items():
+            grown_buffer = np.full(self.capacity, np.nan)
+            grown_buffer[:len(buffer)] = buffer
+            self.buffers[column] = grown_buffer
+        grown_times = np.empty(self.capacity, dtype=object)
+        grown_times[:len(self.times)] = self.times
+        self.times = grown_times
+
+    def _read_value(self, column: str, text: str) -> None:
+        try:
+            self.buffers[column][self.point_count] = float(text)
+        except (TypeError, ValueError):
+            pass
+
+    def _read_track_point(self, track_point: ET.Element) -> None:
+        if self.point_count == self.capacity:
+            self._grow_buffers()
+
+        self._read_value("lon", track_point.get("lon"))
+        self._read_value("lat", track_point.get("lat"))
+        for child in track_point:
+            if child.tag == self.time_tag:
+                self.times[self.point_count] = child.text
+            elif child.tag == self.extensions_tag:
+                for extension in child:
+                    if extension.tag in self.value_tags:
+                        self._read_value(self.value_tags[extension.tag], extension.text)
+            elif child.tag in self.value_tags:
+                self._read_value(self.value_tags[child.tag], child.text)
+        self.point_count += 1
+
+    def to_arrays(self) -> Dict[str, np.ndarray]:
+        """Parses the GPX file into one array per column of `WorkoutRouteParser.WORKOUT_ROUTE_COLUMNS`.
+
+        Returns:
+            The float64 values of every column and the 'time' column as UTC epoch nanoseconds
+            with NaT for missing times, keyed by column.
+        """
+        track_segment = None
+        for event, elem in ET.iterparse(self.gpx_file, events=("start", "end")):
+            if event == "start":
+                if elem.tag == self.track_segment_tag:
+                    track_segment = elem
+            elif elem.tag == self.track_point_tag:
+                self._read_track_point(elem)
+                if track_segment is not None:
+                    del track_segment[:]
+                else:
+                    elem.clear()
+
+        arrays = {column: buffer[:self.point_count] for column, buffer in self.buffers.items()}
+        arrays["time"] = pd.to_datetime(
+            pd.Series(self.times[:self.point_count], dtype=object), utc=True, errors="coerce",
+            format="ISO8601").astype(date_utils.UTC_DATETIME_DTYPE).array.asi8
+        return arrays
+
+    def to_dataframe(self) -> pd.DataFrame:
+        """Parses the GPX file into a DataFrame with the columns of `WorkoutRouteParser.WORKOUT_ROUTE_COLUMNS`.
+
+        Returns:
+            pd.DataFrame: The float64 columns of the track points with the times as UTC timestamps.
+        """
+        arrays = self.to_arrays()
+        arrays["time"] = pd.to_datetime(arrays["time"], utc=True)
+        return pd.DataFrame(arrays)[WorkoutRouteParser.WORKOUT_ROUTE_COLUMNS]
+
+
+def _metadata_text(value: str) -> str:
+    """Keeps a metadata value as text, using an empty string when it is missing."""
+    return "" if value is None else value
+
+
+def _statistic_text(value: str) -> str:
+    """Keeps a statistic attribute as text, None when it is missing like the unit of a unit-less statistic."""
+    return value
+
+
+def _index_statistics_registry(registry: dict, columns: List[str]) -> dict:
+    """Replaces the column names of a statistics registry with their positions in `columns`."""
+    return {
+        statistic_type: [(attribute, columns.index(column), converter)
+                         for attribute, column, converter in statistic_columns]
+        for statistic_type, statistic_columns in registry.items()
+    }
+
+
+def _index_metadata_registry(registry: dict, columns: List[str]) -> dict:
+    """Replaces the column names of a metadata registry with their positions in `columns`."""
+    return {
+        key: (columns.index(column), converter)
+        for key, (column, converter) in registry.items()
+    }
+
+
 class WorkoutRecordParser:
 
     WORKOUT_COLUMNS = [
@@ -209,6 +350,116 @@ class WorkoutRecordParser:
         "FileReference"
     ]
 
+    WORKOUT_STATISTICS_LONG_COLUMNS = [
+        "type",
+        "startDate",
+        "endDate",
+        "average",
+        "minimum",
+        "maximum",
+        "sum",
+        "unit"
+    ]
+
+    # Maps each HealthKit statistic type to the (attribute, column, converter) triples it fills
+    WORKOUT_STATISTICS_REGISTRY = {
+        "HKQuantityTypeIdentifierActiveEnergyBurned": [
+            ("sum", "activeEnergyBurned", float),
+            ("unit", "activeEnergyBurnedUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierDistanceWalkingRunning": [
+            ("sum", "distanceWalkingRunning", float),
+            ("unit", "distanceWalkingRunningUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierBasalEnergyBurned": [
+            ("sum", "basalEnergyBurned", float),
+            ("unit", "basalEnergyBurnedUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierHeartRate": [
+            ("average", "averageHeartRate", float),
+            ("minimum", "minimumHeartRate", float),
+            ("maximum", "maximumHeartRate", float),
+            ("unit", "heartRateUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierStepCount": [
+            ("sum", "stepCount", float),
+            ("unit", "stepCountUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierGroundContactTime": [
+            ("minimum", "minimumGroundContactTime", float),
+            ("maximum", "maximumGroundContactTime", float),
+            ("average", "averageGroundContactTime", float),
+            ("unit", "groundContactTimeUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierRunningGroundContactTime": [
+            ("minimum", "minimumGroundContactTime", float),
+            ("maximum", "maximumGroundContactTime", float),
+            ("average", "averageGroundContactTime", float),
+            ("unit", "groundContactTimeUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierRunningPower": [
+            ("minimum", "minimumRunningPower", float),
+            ("maximum", "maximumRunningPower", float),
+            ("average", "averageRunningPower", float),
+            ("unit", "runningPowerUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierRunningVerticalOscillation": [
+            ("minimum", "minimumRunningVerticalOscillation", float),
+            ("maximum", "maximumRunningVerticalOscillation", float),
+            ("average", "averageRunningVerticalOscillation", float),
+            ("unit", "runningVerticalOscillationUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierRunningSpeed": [
+            ("minimum", "minimumRunningSpeed", float),
+            ("maximum", "maximumRunningSpeed", float),
+            ("average", "averageRunningSpeed", float),
+            ("unit", "runningSpeedUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierRunningStrideLength": [
+            ("minimum", "minimumRunningStrideLength", float),
+            ("maximum", "maximumRunningStrideLength", float),
+            ("average", "averageRunningStrideLength", float),
+            ("unit", "runningStrideLengthUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierDistanceSwimming": [
+            ("sum", "distanceSwimming", float),
+            ("unit", "distanceSwimmingUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierDistanceCycling": [
+            ("sum", "distanceCycling", float),
+            ("unit", "distanceCyclingUnit", _statistic_text),
+        ],
+        "HKQuantityTypeIdentifierSwimmingStrokeCount": [
+            ("sum", "swimmingStrokeCount", float),
+            ("unit", "swimmingStrokeCountUnit", _statistic_text),
+        ],
+    }
+
+    # Maps each workout metadata key to the (column, converter) pair it fills
+    WORKOUT_METADATA_REGISTRY = {
+        "HKIndoorWorkout": ("indoorWorkout", name_utils.determine_workout_location),
+        "HKWeatherTemperature": ("temperature", _metadata_text),
+        "HKWeatherHumidity": ("humidity", _metadata_text),
+        "HKTimeZone": ("timeZone", _metadata_text),
+        "HKAverageMETs": ("averageMETs", _metadata_text),
+        "HKPhysicalEffortEstimationType": (
+            "physicalEffortEstimationType",
+            lambda value: config.PhysicalEffortEstimationType.from_value(int(value)) if value else ""),
+        "HKElevationAscended": ("elevationAscended", _metadata_text),
+        "HKElevationDescended": ("elevationDescended", _metadata_text),
+        "HKAverageSpeed": ("averageSpeed", _metadata_text),
+        "HKMaximumSpeed": ("maximumSpeed", _metadata_text),
+        "HKSwimmingLocationType": (
+            "swimmingLocationType",
+            lambda value: config.SwimmingLocations.from_value(int(value))),
+        "HKSwimmingStrokeStyle": (
+            "swimmingStrokeStyle",
+            lambda value: config.SwimmingStrokeStyles.from_value(int(value))),
+        "HKLapLength": ("lapLength", _metadata_text),
+        "HKSWOLFScore": ("swolfScore", _metadata_text),
+        "HKWaterSalinity": ("waterSalinity", _metadata_text),
+    }
+
     MASTER_WORKOUT_COLUMNS = (
         WORKOUT_COLUMNS +
         WORKOUT_STATISTICS_COLUMNS +
@@ -216,6 +467,12 @@ class WorkoutRecordParser:
         WORKOUT_ROUTE_COLUMNS
     )
 
+    # The registries resolved to column positions so extraction is one lookup per child element
+    WORKOUT_STATISTICS_INDEX = _index_statistics_registry(
+        WORKOUT_STATISTICS_REGISTRY, WORKOUT_STATISTICS_COLUMNS)
+    WORKOUT_METADATA_INDEX = _index_metadata_registry(
+        WORKOUT_METADATA_REGISTRY, WORKOUT_METADATA_COLUMNS)
+
     def __init__(self, workout_record: ET.Element):
         self.workout_record = workout_record
         self.workout_route = self.workout_record.find('WorkoutRoute')
@@ -277,82 +534,20 @@ class WorkoutRecordParser:
         return (file_path,)
 
     def _get_workout_metadata(self, metadata_list: List[ET.Element]) -> tuple:
-        indoorWorkout = ""
-        temperature = ""
-        humidity = ""
-        timeZone = ""
-        averageMETs = ""
-        physicalEffortEstimationType = ""
-        elevationAscended = ""
-        elevationDescended = ""
-        averageSpeed = ""
-        maximumSpeed = ""
-        swimmingLocationType = ""
-        swimmingStrokeStyle = ""
-        lapLength = ""
-        swolfScore = ""
-        waterSalinity = ""
+        """Extracts the metadata recorded for each workout element.
+
+        Each 'MetadataEntry' key is looked up in `WORKOUT_METADATA_REGISTRY`, which
+        names the column the entry's value is converted into. Unregistered keys are
+        ignored and columns without a matching entry are left empty.
+        """
+        metadata_row = [""] * len(self.WORKOUT_METADATA_COLUMNS)
 
         for metadata in metadata_list:
-            match metadata.get("key"):
-                case "HKIndoorWorkout":
-                    indoorWorkout = name_utils.determine_workout_location(
-                        metadata.get("value")
-                    )
-                case "HKWeatherTemperature":
-                    temperature = metadata.get("value", "")
-                case "HKWeatherHumidity":
-                    humidity = metadata.get("value", "")
-                case "HKTimeZone":
-                    timeZone = metadata.get("value", "")
-                case "HKAverageMETs":
-                    averageMETs = metadata.get("value", "")
-                case "HKPhysicalEffortEstimationType":
-                    if value := metadata.get("value"):
-                        physicalEffortEstimationType = (
-                            config.PhysicalEffortEstimationType.from_value(
-                                int(value)
-                            )
-                        )
-                case "HKElevationAscended":
-                    elevationAscended = metadata.get("value", "")
-                case "HKElevationDescended":
-                    elevationDescended = metadata.get("value", "")
-                case "HKAverageSpeed":
-                    averageSpeed = metadata.get("value", "")
-                case "HKMaximumSpeed":
-                    maximumSpeed = metadata.get("value", "")
-                case "HKSwimmingLocationType":
-                    swimmingLocationType = config.SwimmingLocations.from_value(
-                        int(metadata.get("value"))
-                    )
-                case "HKSwimmingStrokeStyle":
-                    swimmingStrokeStyle = config.SwimmingStrokeStyles.from_value(
-                        int(metadata.get("value"))
-                    )
-                case "HKLapLength":
-                    lapLength = metadata.get("value", "")
-                case "HKSWOLFScore":
-                    swolfScore = metadata.get("value", "")
-                case "HKWaterSalinity":
-                    waterSalinity = metadata.get("value", "")
-        return (
-            indoorWorkout,
-            temperature,
-            humidity,
-            timeZone,
-            averageMETs,
-            physicalEffortEstimationType,
-            elevationAscended,
-            elevationDescended,
-            averageSpeed,
-            maximumSpeed,
-            swimmingLocationType,
-            swimmingStrokeStyle,
-            lapLength,
-            swolfScore,
-            waterSalinity
-        )
+            registered = self.WORKOUT_METADATA_INDEX.get(metadata.get("key"))
+            if registered is not None:
+                column_index, converter = registered
+                metadata_row[column_index] = converter(metadata.get("value"))
+        return tuple(metadata_row)
 
     def _get_workout_statistics(self, workout_statistics: List[ET.Element]):
         """Extracts statistics recorded for each workout element.
@@ -370,158 +565,42 @@ class WorkoutRecordParser:
             sum                  CDATA #IMPLIED
             unit                 CDATA #IMPLIED
             >
+
+        Each statistic type is looked up in `WORKOUT_STATISTICS_REGISTRY`, which maps
+        its attributes to the columns they are converted into. Every statistic, including
+        unregistered types, is also available in long format from `statistics_rows`.
         """
-        activeEnergyBurned = ""
-        activeEnergyBurnedUnit = ""
-        distanceWalkingRunning = ""
-        distanceWalkingRunningUnit = ""
-        basalEnergyBurned = ""
-        basalEnergyBurnedUnit = ""
-        minimumHeartRate = ""
-        maximumHeartRate = ""
-        averageHeartRate = ""
-        heartRateUnit = ""
-        stepCount = ""
-        stepCountUnit = ""
-        minimumGroundContactTime = ""
-        maximumGroundContactTime = ""
-        averageGroundContactTime = ""
-        groundContactTimeUnit = ""
-        minimumRunningPower = ""
-        maximumRunningPower = ""
-        averageRunningPower = ""
-        runningPowerUnit = ""
-        minimumRunningVerticalOscillation = ""
-        maximumRunningVerticalOscillation = ""
-        averageRunningVerticalOscillation = ""
-        runningVerticalOscillationUnit = ""
-        minimumRunningSpeed = ""
-        maximumRunningSpeed = ""
-        averageRunningSpeed = ""
-        runningSpeedUnit = ""
-        minimumRunningStrideLength = ""
-        maximumRunningStrideLength = ""
-        averageRunningStrideLength = ""
-        runningStrideLengthUnit = ""
-        distanceSwimming = ""
-        distanceSwimmingUnit = ""
-        distanceCycling = ""
-        distanceCyclingUnit = ""
-        swimmingStrokeCount = ""
-        swimmingStrokeCountUnit = ""
+        statistics_row = [""] * len(self.WORKOUT_STATISTICS_COLUMNS)
 
         for statistic in workout_statistics:
-            match statistic.get("type"):
-                case "HKQuantityTypeIdentifierActiveEnergyBurned":
-                    activeEnergyBurned = float(statistic.get("sum"))
-                    activeEnergyBurnedUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierDistanceWalkingRunning":
-                    distanceWalkingRunning = float(statistic.get("sum"))
-                    distanceWalkingRunningUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierBasalEnergyBurned":
-                    basalEnergyBurned = float(statistic.get("sum"))
-                    basalEnergyBurnedUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierHeartRate":
-                    averageHeartRate = float(statistic.get("average"))
-                    minimumHeartRate = float(statistic.get("minimum"))
-                    maximumHeartRate = float(statistic.get("maximum"))
-                    heartRateUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierStepCount":
-                    stepCount = float(statistic.get("sum"))
-                    stepCountUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierGroundContactTime":
-                    minimumGroundContactTime = float(statistic.get("minimum"))
-                    maximumGroundContactTime = float(statistic.get("maximum"))
-                    averageGroundContactTime = float(statistic.get("average"))
-                    groundContactTimeUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierRunningPower":
-                    minimumRunningPower = float(statistic.get("minimum"))
-                    maximumRunningPower = float(statistic.get("maximum"))
-                    averageRunningPower = float(statistic.get("average"))
-                    runningPowerUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierRunningVerticalOscillation":
-                    minimumRunningVerticalOscillation = float(
-                        statistic.get("minimum"))
-                    maximumRunningVerticalOscillation = float(
-                        statistic.get("maximum"))
-                    averageRunningVerticalOscillation = float(
-                        statistic.get("average"))
-                    runningVerticalOscillationUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierRunningSpeed":
-                    minimumRunningSpeed = float(statistic.get("minimum"))
-                    maximumRunningSpeed = float(statistic.get("maximum"))
-                    averageRunningSpeed = float(statistic.get("average"))
-                    runningSpeedUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierRunningStrideLength":
-                    minimumRunningStrideLength = float(
-                        statistic.get("minimum"))
-                    maximumRunningStrideLength = float(
-                        statistic.get("maximum"))
-                    averageRunningStrideLength = float(
-                        statistic.get("average"))
-                    runningStrideLengthUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierDistanceSwimming":
-                    distanceSwimming = float(statistic.get("sum"))
-                    distanceSwimmingUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierDistanceCycling":
-                    distanceCycling = float(statistic.get("sum"))
-                    distanceCyclingUnit = statistic.get("unit")
-
-                case "HKQuantityTypeIdentifierSwimmingStrokeCount":
-                    swimmingStrokeCount = float(statistic.get("sum"))
-                    swimmingStrokeCountUnit = statistic.get("unit")
+            registered = self.WORKOUT_STATISTICS_INDEX.get(statistic.get("type"))
+            if registered is not None:
+                for attribute, column_index, converter in registered:
+                    statistics_row[column_index] = converter(
+                        statistic.get(attribute))
+        return tuple(statistics_row)
 
-        return (
-            activeEnergyBurned,
-            activeEnergyBurnedUnit,
-            distanceWalkingRunning,
-            distanceWalkingRunningUnit,
-            basalEnergyBurned,
-            basalEnergyBurnedUnit,
-            minimumHeartRate,
-            maximumHeartRate,
-            averageHeartRate,
-            heartRateUnit,
-            stepCount,
-            stepCountUnit,
-            minimumGroundContactTime,
-            maximumGroundContactTime,
-            averageGroundContactTime,
-            groundContactTimeUnit,
-            minimumRunningPower,
-            maximumRunningPower,
-            averageRunningPower,
-            runningPowerUnit,
-            minimumRunningVerticalOscillation,
-            maximumRunningVerticalOscillation,
-            averageRunningVerticalOscillation,
-            runningVerticalOscillationUnit,
-            minimumRunningSpeed,
-            maximumRunningSpeed,
-            averageRunningSpeed,
-            runningSpeedUnit,
-            minimumRunningStrideLength,
-            maximumRunningStrideLength,
-            averageRunningStrideLength,
-            runningStrideLengthUnit,
-            distanceSwimming,
-            distanceSwimmingUnit,
-            distanceCycling,
-            distanceCyclingUnit,
-            swimmingStrokeCount,
-            swimmingStrokeCountUnit
-        )
+    def statistics_rows(self) -> List[tuple]:
+        """Returns every statistic of the workout in long format, including unregistered types.
+
+        Returns:
+            A list of tuples matching `WORKOUT_STATISTICS_LONG_COLUMNS`, one per
+            'WorkoutStatistics' element in document order.
+        """
+        return [
+            (
+                name_utils.remove_quantity_type_identifier_prefix(
+                    statistic.get("type")),
+                statistic.get("startDate"),
+                statistic.get("endDate"),
+                statistic.get("average"),
+                statistic.get("minimum"),
+                statistic.get("maximum"),
+                statistic.get("sum"),
+                statistic.get("unit"),
+            )
+            for statistic in self.workout_statistics
+        ]
 
     def csv_row_structure(self) -> tuple:
         """Returns the combined CSV row structure for the workout. 
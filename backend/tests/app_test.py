@@ -0,0 +1,28 @@
+import unittest
+from unittest.mock import patch
+from app import app
+from utils.response_utils import RequestedWorkoutResponse
+
+
+class TestRequestedWorkoutRoute(unittest.TestCase):
+
+    def setUp(self):
+        self.client = app.test_client()
+
+    def test_invalid_parameters_are_answered_with_a_bad_request(self):
+        response = self.client.post("/api/workout", json={"workoutStartDate": "2024-08-21", "timeFormat": "iso"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("Invalid timeFormat", response.get_json()["workoutContext"]["errors"][0]["errorMessage"])
+
+    def test_internal_value_errors_are_answered_with_a_server_error(self):
+        with patch.object(RequestedWorkoutResponse, "generate_response",
+                          side_effect=ValueError("cannot convert float NaN to integer")):
+            response = self.client.post("/api/workout", json={"workoutStartDate": "2024-08-21"})
+
+        self.assertEqual(response.status_code, 500)
+        self.assertEqual(response.get_json()["workoutContext"]["errors"][0]["errorCode"], 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
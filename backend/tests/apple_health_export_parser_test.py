@@ -0,0 +1,151 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+import pandas as pd
+import config
+from parsers.apple_health_export_parser import AppleHealthExportParser
+from parsers.export_element_handlers import ExportElementHandler
+from utils import storage_utils as storage_utils
+from utils import route_utils as route_utils
+from utils import route_metrics_utils as route_metrics_utils
+from export_test_utils import (write_health_export_zip, patched_export_directories, read_export_output,
+                               GPX_TEMPLATE, route_points)
+
+
+class CountingElementHandler(ExportElementHandler):
+    TAG = "Correlation"
+
+    def __init__(self):
+        self.handled = []
+        self.closed = False
+
+    def handle(self, element):
+        self.handled.append(element.get("type"))
+
+    def close(self):
+        self.closed = True
+
+
+class TestAppleHealthExportParser(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.export_path = write_health_export_zip(
+            os.path.join(self.temp_directory.name, "export.zip"))
+        self.directories = patched_export_directories(
+            os.path.join(self.temp_directory.name, "export_data"))
+        self.directories.__enter__()
+
+    def tearDown(self):
+        self.directories.__exit__(None, None, None)
+        self.temp_directory.cleanup()
+
+    def test_rejects_archive_without_export_xml(self):
+        with tempfile.NamedTemporaryFile(suffix=".zip") as invalid_zip:
+            from zipfile import ZipFile
+            with ZipFile(invalid_zip.name, "w") as zip_file:
+                zip_file.writestr("not_an_export.txt", "")
+            with self.assertRaises(ValueError):
+                AppleHealthExportParser(invalid_zip.name)
+
+    def test_parse_health_elements_writes_every_element_type(self):
+        AppleHealthExportParser(self.export_path).parse_health_elements()
+
+        heart_rate = read_export_output(os.path.join(
+            config.HEALTH_ELEMENTS_VITALS_DIRECTORY, "HeartRate.csv"))
+        self.assertEqual(len(heart_rate), 6)
+        self.assertListEqual(list(heart_rate.columns),
+                             ["type", "unit", "value", "sourceName", "sourceVersion", "device",
+                              "creationDate", "creationDateTzOffset", "startDate", "startDateTzOffset",
+                              "endDate", "endDateTzOffset", "heartRateMotionContext"])
+        self.assertTrue((heart_rate["heartRateMotionContext"] == "ACTIVE").all())
+
+        step_count = read_export_output(os.path.join(
+            config.HEALTH_ELEMENTS_ACTIVITY_DIRECTORY, "StepCount.csv"))
+        self.assertEqual(len(step_count), 3)
+
+        systolic = read_export_output(os.path.join(
+            config.HEALTH_ELEMENTS_VITALS_DIRECTORY, "BloodPressureSystolic.csv"))
+        self.assertEqual(systolic["value"].tolist(), [120])
+
+        workouts = read_export_output(os.path.join(
+            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUTS_SUMMARY_FILE_NAME))
+        self.assertEqual(len(workouts), 1)
+        self.assertEqual(workouts["averageHeartRate"].tolist(), [150])
+        self.assertEqual(workouts["FileReference"].tolist(),
+                         ["/workout-routes/route_2024-08-21_9.00am.gpx"])
+
+        workout_statistics = read_export_output(os.path.join(
+            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_STATISTICS_FILE_NAME))
+        self.assertEqual(workout_statistics["workoutId"].tolist(), [0, 0, 0])
+        self.assertEqual(workout_statistics["type"].tolist(),
+                         ["ActiveEnergyBurned", "DistanceWalkingRunning", "HeartRate"])
+
+        activity_summaries = read_export_output(os.path.join(
+            config.HEALTH_ELEMENTS_ACTIVITY_DIRECTORY, config.ACTIVITY_SUMMARY_FILE_NAME))
+        self.assertEqual(activity_summaries["date"].tolist(), ["2024-08-21"])
+
+        route = read_export_output(os.path.join(
+            config.WORKOUT_ROUTE_ELEMENTS_DIRECTORY, "route_2024-08-21_9.00am.csv"))
+        self.assertEqual(len(route), 5)
+
+    def test_registered_handler_receives_elements_from_the_same_pass(self):
+        parser = AppleHealthExportParser(self.export_path)
+        handler = CountingElementHandler()
+        parser.register_element_handler(handler)
+        parser.parse_health_elements()
+
+        self.assertEqual(handler.handled, ["HKCorrelationTypeIdentifierBloodPressure"])
+        self.assertTrue(handler.closed)
+
+    def test_parallel_gpx_parsing_matches_serial_output(self):
+        routes = {
+            f"route_2024-08-{day:02d}_9.00am.gpx": GPX_TEMPLATE.format(points=route_points(day))
+            for day in range(1, 7)
+        }
+        write_health_export_zip(self.export_path, routes=routes)
+        route_directory = config.WORKOUT_ROUTE_ELEMENTS_DIRECTORY
+
+        outputs = {}
+        for max_workers in (1, 2):
+            with patch.object(config, "GPX_PARSER_MAX_WORKERS", max_workers):
+                AppleHealthExportParser(self.export_path)._parse_gpx_files()
+            outputs[max_workers] = {
+                file_name: read_export_output(os.path.join(route_directory, file_name))
+                for file_name in sorted(os.listdir(route_directory))
+            }
+            for file_name in outputs[max_workers]:
+                os.remove(os.path.join(route_directory, file_name))
+
+        route_file_names = [storage_utils.storage_file_path(f"route_2024-08-{day:02d}_9.00am.gpx")
+                            for day in range(1, 7)]
+        self.assertListEqual(list(outputs[2].keys()), sorted(
+            [route_utils.route_detail_path(file_name, route_detail)
+             for file_name in route_file_names for route_detail in config.ROUTE_DETAIL_TOLERANCES] +
+            [route_metrics_utils.route_splits_path(file_name) for file_name in route_file_names] +
+            route_file_names))
+        for file_name, serial_df in outputs[1].items():
+            pd.testing.assert_frame_equal(outputs[2][file_name], serial_df)
+        for file_name in route_file_names:
+            self.assertEqual(len(outputs[1][file_name]), int(file_name[14:16]))
+
+    def test_uploaded_stream_is_spooled_for_parallel_parsing(self):
+        routes = {
+            f"route_2024-08-{day:02d}_9.00am.gpx": GPX_TEMPLATE.format(points=route_points())
+            for day in (20, 21)
+        }
+        write_health_export_zip(self.export_path, routes=routes)
+
+        with open(self.export_path, "rb") as uploaded_file, \
+                patch.object(config, "GPX_PARSER_MAX_WORKERS", 2):
+            parser = AppleHealthExportParser(uploaded_file)
+            parser.parse_health_elements()
+
+        self.assertIsNone(parser.spooled_export_path)
+        self.assertTrue(os.path.exists(storage_utils.storage_file_path(os.path.join(
+            config.WORKOUT_ROUTE_ELEMENTS_DIRECTORY, "route_2024-08-21_9.00am.gpx"))))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,88 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from utils.cache_utils import DataFrameCache
+
+
+class TestDataFrameCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.loads = []
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def _write(self, file_name: str, rows: int) -> str:
+        path = os.path.join(self.temp_directory.name, file_name)
+        pd.DataFrame({"value": range(rows)}).to_csv(path, index=False)
+        return path
+
+    def _loader(self, path: str):
+        def load():
+            self.loads.append(path)
+            return pd.read_csv(path)
+        return load
+
+    def test_repeated_loads_are_served_from_memory(self):
+        cache = DataFrameCache(max_bytes=1024 * 1024)
+        path = self._write("HeartRate.csv", 10)
+
+        first = cache.get_or_load(path, self._loader(path))
+        second = cache.get_or_load(path, self._loader(path))
+
+        self.assertIs(first, second)
+        self.assertEqual(self.loads, [path])
+        self.assertEqual(cache.get_stats()["hits"], 1)
+        self.assertEqual(cache.get_stats()["misses"], 1)
+
+    def test_changed_file_is_loaded_again(self):
+        cache = DataFrameCache(max_bytes=1024 * 1024)
+        path = self._write("HeartRate.csv", 10)
+        cache.get_or_load(path, self._loader(path))
+
+        self._write("HeartRate.csv", 20)
+        df = cache.get_or_load(path, self._loader(path))
+
+        self.assertEqual(len(df), 20)
+        self.assertEqual(cache.get_stats()["misses"], 2)
+        self.assertEqual(cache.get_stats()["entries"], 1)
+
+    def test_columns_are_part_of_the_key(self):
+        cache = DataFrameCache(max_bytes=1024 * 1024)
+        path = self._write("HeartRate.csv", 10)
+
+        cache.get_or_load(path, self._loader(path), ["value"])
+        cache.get_or_load(path, self._loader(path))
+
+        self.assertEqual(cache.get_stats()["entries"], 2)
+
+    def test_least_recently_used_entries_are_evicted_over_budget(self):
+        paths = [self._write(f"Record{index}.csv", 100) for index in range(3)]
+        entry_size = int(pd.read_csv(paths[0]).memory_usage(index=True, deep=True).sum())
+        cache = DataFrameCache(max_bytes=2 * entry_size)
+
+        cache.get_or_load(paths[0], self._loader(paths[0]))
+        cache.get_or_load(paths[1], self._loader(paths[1]))
+        cache.get_or_load(paths[0], self._loader(paths[0]))
+        cache.get_or_load(paths[2], self._loader(paths[2]))
+
+        stats = cache.get_stats()
+        self.assertEqual(stats["evictions"], 1)
+        self.assertLessEqual(stats["cachedBytes"], stats["maxBytes"])
+        self.assertIn((paths[0], None), cache.entries)
+        self.assertNotIn((paths[1], None), cache.entries)
+
+    def test_frames_larger_than_the_budget_are_not_cached(self):
+        cache = DataFrameCache(max_bytes=1)
+        path = self._write("HeartRate.csv", 10)
+
+        cache.get_or_load(path, self._loader(path))
+
+        self.assertEqual(cache.get_stats()["entries"], 0)
+        self.assertEqual(cache.get_stats()["evictions"], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
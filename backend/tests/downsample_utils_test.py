@@ -0,0 +1,30 @@
+import unittest
+import numpy as np
+from utils import downsample_utils as downsample_utils
+
+
+class TestDownsampleUtils(unittest.TestCase):
+
+    def test_short_series_are_kept_whole(self):
+        self.assertEqual(downsample_utils.lttb_indexes(np.arange(5), np.arange(5), 5).tolist(), [0, 1, 2, 3, 4])
+
+    def test_keeps_the_ends_and_the_peaks(self):
+        x = np.arange(1000) * 5_000_000_000
+        y = np.full(1000, 120.0)
+        y[[250, 600]] = [190.0, 60.0]
+
+        indexes = downsample_utils.lttb_indexes(x, y, 50)
+
+        self.assertEqual(len(indexes), 50)
+        self.assertEqual((indexes[0], indexes[-1]), (0, 999))
+        self.assertTrue(np.all(np.diff(indexes) > 0))
+        self.assertIn(250, indexes)
+        self.assertIn(600, indexes)
+
+    def test_rejects_fewer_than_three_points(self):
+        with self.assertRaises(ValueError):
+            downsample_utils.lttb_indexes(np.arange(10), np.arange(10), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,48 @@
+import unittest
+import numpy as np
+from utils import encoding_utils as encoding_utils
+
+
+class TestEncodingUtils(unittest.TestCase):
+
+    def test_polyline_matches_the_reference_encoding(self):
+        polyline = encoding_utils.encode_polyline([38.5, 40.7, 43.252], [-120.2, -120.95, -126.453])
+
+        self.assertEqual(polyline, "_p~iF~ps|U_ulLnnqC_mqNvxq`@")
+        latitudes, longitudes = encoding_utils.decode_polyline(polyline)
+        np.testing.assert_allclose(latitudes, [38.5, 40.7, 43.252])
+        np.testing.assert_allclose(longitudes, [-120.2, -120.95, -126.453])
+
+    def test_polyline_rejects_missing_coordinates(self):
+        with self.assertRaises(ValueError):
+            encoding_utils.encode_polyline([1.0, np.nan], [2.0, 3.0])
+        with self.assertRaises(ValueError):
+            encoding_utils.encode_polyline([1.0, 2.0], [2.0, np.inf])
+
+    def test_varint_deltas_round_trip(self):
+        values = np.array([1724245200000, 1724245201000, 1724245199000, 0, -5, 2 ** 40])
+
+        self.assertEqual(encoding_utils.decode_varint_deltas(
+            encoding_utils.encode_varint_deltas(values)).tolist(), values.tolist())
+
+    def test_float32_round_trip_keeps_missing_values(self):
+        decoded = encoding_utils.decode_float32(encoding_utils.encode_float32([3.1, np.nan, 12.0]))
+
+        np.testing.assert_allclose(decoded, np.array([3.1, np.nan, 12.0], dtype=np.float32))
+
+    def test_quantized_values_fall_back_to_float32_with_missing_values(self):
+        quantized = encoding_utils.encode_quantized([10.256, 10.5, 9.0], 2)
+        self.assertEqual(quantized["encoding"], "deltaVarint")
+        self.assertEqual((encoding_utils.decode_varint_deltas(quantized["data"]) / quantized["scale"]).tolist(),
+                         [10.26, 10.5, 9.0])
+
+        self.assertEqual(encoding_utils.encode_quantized([1.0, np.nan], 2)["encoding"], "float32")
+
+    def test_empty_arrays_encode_as_empty_strings(self):
+        self.assertEqual(encoding_utils.encode_polyline([], []), "")
+        self.assertEqual(encoding_utils.encode_varint_deltas([]), "")
+        self.assertEqual(encoding_utils.encode_float32([]), "")
+
+
+if __name__ == '__main__':
+    unittest.main()
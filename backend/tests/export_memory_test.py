@@ -0,0 +1,123 @@
+import unittest
+import os
+import tempfile
+import tracemalloc
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from unittest.mock import patch
+import pyarrow as pa
+import config
+from utils import xml_utils as xml_utils
+from parsers.apple_health_export_parser import AppleHealthExportParser
+from export_test_utils import (EXPORT_HEADER, EXPORT_FOOTER, heart_rate_record, blood_pressure_correlation,
+                               write_health_export_zip, patched_export_directories)
+
+
+def synthetic_export_body(record_count: int) -> str:
+    return "".join(
+        heart_rate_record(index % 60, 60 + index % 50) +
+        (blood_pressure_correlation() if index % 10 == 0 else "")
+        for index in range(record_count)
+    )
+
+
+def _resident_set_sizes() -> tuple:
+    """Returns the current and peak resident set size of the process in bytes."""
+    with open("/proc/self/status") as status_file:
+        sizes = dict(line.split(":", 1) for line in status_file)
+    return tuple(int(sizes[name].split()[0]) * 1024 for name in ("VmRSS", "VmHWM"))
+
+
+def measure_ingest_peaks(export_path: str, storage_format: str, buffered_rows: int) -> tuple:
+    """Parses the elements of an export and returns its tracemalloc, pyarrow memory pool and RSS peaks.
+
+    Runs in a fresh process, so the peaks of one measurement do not hide those of the next.
+    The RSS peak is the growth of the resident set size while parsing, from resetting the
+    process's peak resident set size before parsing, as it is inherited from the parent.
+    """
+    with patched_export_directories(os.path.join(os.path.dirname(export_path), "export_data")), \
+            patch.object(config, "STORAGE_FORMAT", storage_format), \
+            patch.object(config, "RECORD_WRITER_MAX_BUFFERED_ROWS", buffered_rows):
+        parser = AppleHealthExportParser(export_path)
+        with open("/proc/self/clear_refs", "w") as clear_refs_file:
+            clear_refs_file.write("5")
+        rss_before = _resident_set_sizes()[0]
+        tracemalloc.start()
+        try:
+            parser._parse_export_elements()
+            traced_peak = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+        return traced_peak, pa.default_memory_pool().max_memory(), _resident_set_sizes()[1] - rss_before
+
+
+class TestExportMemoryBudget(unittest.TestCase):
+    """Fails if parsing a large synthetic export exceeds a fixed memory peak or grows it with the export."""
+
+    ITERPARSE_RECORD_COUNT = 25_000
+    ITERPARSE_PEAK_BUDGET_BYTES = 2 * 1024 * 1024
+
+    # The records are out of startDate order, so the record files are sorted on close
+    INGEST_RECORD_COUNTS = (10_000, 40_000)
+    INGEST_BUFFERED_ROWS = 1_000
+    INGEST_PEAK_BUDGET_BYTES = 8 * 1024 * 1024
+    # Growth of the tracemalloc, pyarrow memory pool and RSS peaks allowed from the smaller to
+    # the larger export, reading a record file back whole exceeds them. RSS varies by a few
+    # megabytes from run to run with the allocators returning memory to the system or not
+    INGEST_PEAK_GROWTH_BYTES = (1024 * 1024, 1024 * 1024, 4 * 1024 * 1024)
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def _iterparse_peak(self, xml_path, prune_processed_elements):
+        tracemalloc.start()
+        try:
+            with open(xml_path, "rb") as xml_file:
+                for _ in xml_utils.iterparse_elements(xml_file, {"Record", "Workout"},
+                                                      prune_processed_elements):
+                    pass
+            return tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    def test_pruned_iterparse_stays_within_budget(self):
+        xml_path = os.path.join(self.temp_directory.name, "export.xml")
+        with open(xml_path, "w") as xml_file:
+            xml_file.write(EXPORT_HEADER)
+            xml_file.write(synthetic_export_body(self.ITERPARSE_RECORD_COUNT))
+            xml_file.write(EXPORT_FOOTER)
+
+        self.assertLess(self._iterparse_peak(xml_path, True),
+                        self.ITERPARSE_PEAK_BUDGET_BYTES)
+        # Without pruning the cleared elements stay attached to the root and exceed the budget
+        self.assertGreater(self._iterparse_peak(xml_path, False),
+                           self.ITERPARSE_PEAK_BUDGET_BYTES)
+
+    def _ingest_peaks(self, record_count, storage_format):
+        export_directory = os.path.join(self.temp_directory.name, f"{storage_format}{record_count}")
+        os.makedirs(export_directory)
+        export_path = write_health_export_zip(
+            os.path.join(export_directory, "export.zip"), body=synthetic_export_body(record_count))
+
+        with ProcessPoolExecutor(max_workers=1, mp_context=multiprocessing.get_context("spawn")) as executor:
+            return executor.submit(measure_ingest_peaks, export_path, storage_format,
+                                   self.INGEST_BUFFERED_ROWS).result()
+
+    @unittest.skipUnless(os.path.exists("/proc/self/clear_refs"), "measures the peak resident set size of Linux")
+    def test_export_ingest_stays_within_budget(self):
+        for storage_format in ("parquet", "csv"):
+            with self.subTest(storage_format=storage_format):
+                small_peaks, large_peaks = (self._ingest_peaks(record_count, storage_format)
+                                            for record_count in self.INGEST_RECORD_COUNTS)
+
+                self.assertLess(large_peaks[0], self.INGEST_PEAK_BUDGET_BYTES)
+                # Peak memory depends on the chunk size, not on the number of records
+                for small_peak, large_peak, growth in zip(small_peaks, large_peaks, self.INGEST_PEAK_GROWTH_BYTES):
+                    self.assertLess(large_peak - small_peak, growth)
+
+
+if __name__ == '__main__':
+    unittest.main()
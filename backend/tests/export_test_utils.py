@@ -0,0 +1,192 @@
+"""Helpers for building small synthetic Apple Health exports in tests."""
+
+import os
+from contextlib import contextmanager
+from unittest.mock import patch
+from zipfile import ZipFile, ZIP_DEFLATED
+import numpy as np
+import pandas as pd
+import config
+from utils import storage_utils as storage_utils
+
+EXPORT_HEADER = """<?xml version="1.0" encoding="UTF-8"?>
+<!DOCTYPE HealthData [
+<!ELEMENT HealthData (ExportDate,Me,(Record|Correlation|Workout|ActivitySummary)*)>
+]>
+<HealthData locale="en_US">
+ <ExportDate value="2024-08-22 08:00:00 -0400"/>
+ <Me HKCharacteristicTypeIdentifierDateOfBirth="1990-01-01" HKCharacteristicTypeIdentifierBiologicalSex="HKBiologicalSexMale"/>
+"""
+
+EXPORT_FOOTER = "</HealthData>\n"
+
+WATCH_DEVICE = "&lt;&lt;HKDevice: 0x2825cf520&gt;, name:Apple Watch, manufacturer:Apple Inc., model:Watch, hardware:Watch6,14, software:10.2&gt;"
+
+GPX_TEMPLATE = """<?xml version="1.0" encoding="UTF-8"?>
+<gpx version="1.1" creator="Apple Health Export" xmlns="http://www.topografix.com/GPX/1/1">
+ <trk>
+  <name>Route</name>
+  <trkseg>
+{points}
+  </trkseg>
+ </trk>
+</gpx>
+"""
+
+GPX_POINT_TEMPLATE = """   <trkpt lon="{lon}" lat="{lat}"><ele>{ele}</ele><time>{time}</time><extensions><speed>{speed}</speed><course>{course}</course><hAcc>{hAcc}</hAcc><vAcc>{vAcc}</vAcc></extensions></trkpt>"""
+
+
+def heart_rate_record(minute: int, value: float, motion_context: int = 2) -> str:
+    """Returns a HeartRate Record element with a motion context metadata entry."""
+    timestamp = f"2024-08-21 09:{minute:02d}:00 -0400"
+    return (
+        f' <Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Apple Watch" sourceVersion="10.2" '
+        f'device="{WATCH_DEVICE}" unit="count/min" creationDate="{timestamp}" startDate="{timestamp}" '
+        f'endDate="{timestamp}" value="{value}">\n'
+        f'  <MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="{motion_context}"/>\n'
+        f' </Record>\n'
+    )
+
+
+def quantity_record(record_type: str, minute: int, value: float, unit: str = "count") -> str:
+    """Returns a Record element without metadata for the given quantity type."""
+    timestamp = f"2024-08-21 09:{minute:02d}:00 -0400"
+    end_timestamp = f"2024-08-21 09:{minute:02d}:30 -0400"
+    return (
+        f' <Record type="HKQuantityTypeIdentifier{record_type}" sourceName="Apple Watch" sourceVersion="10.2" '
+        f'device="{WATCH_DEVICE}" unit="{unit}" creationDate="{end_timestamp}" startDate="{timestamp}" '
+        f'endDate="{end_timestamp}" value="{value}"/>\n'
+    )
+
+
+def blood_pressure_correlation() -> str:
+    """Returns a Correlation element wrapping two nested Record elements."""
+    timestamp = "2024-08-21 07:00:00 -0400"
+    records = "".join(
+        f'  <Record type="HKQuantityTypeIdentifierBloodPressure{kind}" sourceName="Omron" unit="mmHg" '
+        f'creationDate="{timestamp}" startDate="{timestamp}" endDate="{timestamp}" value="{value}"/>\n'
+        for kind, value in (("Systolic", 120), ("Diastolic", 80))
+    )
+    return (
+        f' <Correlation type="HKCorrelationTypeIdentifierBloodPressure" sourceName="Omron" '
+        f'creationDate="{timestamp}" startDate="{timestamp}" endDate="{timestamp}">\n'
+        f'  <MetadataEntry key="HKWasUserEntered" value="1"/>\n'
+        f'{records}'
+        f' </Correlation>\n'
+    )
+
+
+def running_workout(route_file_name: str = "route_2024-08-21_9.00am.gpx") -> str:
+    """Returns an outdoor running Workout element with statistics, metadata and a route."""
+    return f""" <Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="30" durationUnit="min" sourceName="Apple Watch" sourceVersion="10.2" device="{WATCH_DEVICE}" creationDate="2024-08-21 09:31:00 -0400" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 09:30:00 -0400">
+  <MetadataEntry key="HKIndoorWorkout" value="0"/>
+  <MetadataEntry key="HKTimeZone" value="America/New_York"/>
+  <MetadataEntry key="HKWeatherTemperature" value="75 degF"/>
+  <MetadataEntry key="HKElevationAscended" value="1200 cm"/>
+  <WorkoutEvent type="HKWorkoutEventTypeSegment" date="2024-08-21 09:00:00 -0400" duration="10" durationUnit="min"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierActiveEnergyBurned" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 09:30:00 -0400" sum="350.5" unit="Cal"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierDistanceWalkingRunning" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 09:30:00 -0400" sum="5.01" unit="km"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierHeartRate" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 09:30:00 -0400" average="150" minimum="120" maximum="175" unit="count/min"/>
+  <WorkoutRoute sourceName="Apple Watch" sourceVersion="10.2" creationDate="2024-08-21 09:31:00 -0400" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 09:30:00 -0400">
+   <FileReference path="/workout-routes/{route_file_name}"/>
+  </WorkoutRoute>
+ </Workout>
+"""
+
+
+def activity_summary(date: str = "2024-08-21") -> str:
+    """Returns an ActivitySummary element for the given date."""
+    return (
+        f' <ActivitySummary dateComponents="{date}" activeEnergyBurned="512.3" activeEnergyBurnedGoal="600" '
+        f'activeEnergyBurnedUnit="Cal" appleMoveTime="0" appleMoveTimeGoal="0" appleExerciseTime="45" '
+        f'appleExerciseTimeGoal="30" appleStandHours="10" appleStandHoursGoal="12"/>\n'
+    )
+
+
+def sample_export_body() -> str:
+    """Returns the body of a small export containing every element type the parser handles."""
+    return "".join([
+        *(heart_rate_record(minute, 120 + minute) for minute in range(0, 30, 5)),
+        *(quantity_record("StepCount", minute, 100 + minute) for minute in range(0, 30, 10)),
+        quantity_record("HeartRate", 45, 70, unit="count/min").replace(
+            'sourceName="Apple Watch"', 'sourceName="Health"'),
+        blood_pressure_correlation(),
+        running_workout(),
+        activity_summary(),
+    ])
+
+
+def route_points(count: int = 5) -> str:
+    """Returns `count` GPX track points heading north from a fixed origin."""
+    return "\n".join(
+        GPX_POINT_TEMPLATE.format(
+            lon=-73.9857, lat=f"{40.7484 + index * 0.0001:.6f}", ele=10 + index,
+            time=f"2024-08-21T13:{index:02d}:00Z", speed=3.1, course=0.5, hAcc=2.0, vAcc=1.5)
+        for index in range(count)
+    )
+
+
+def write_health_export_zip(zip_path: str, body: str = None, routes: dict = None) -> str:
+    """Writes a synthetic Apple Health export ZIP to `zip_path`.
+
+    Args:
+        zip_path: Where to write the archive.
+        body: The XML between the export header and footer, defaults to `sample_export_body()`.
+        routes: Mapping of route file names to GPX contents placed under workout-routes/.
+
+    Returns:
+        The path of the written archive.
+    """
+    if body is None:
+        body = sample_export_body()
+    if routes is None:
+        routes = {"route_2024-08-21_9.00am.gpx": GPX_TEMPLATE.format(points=route_points())}
+
+    with ZipFile(zip_path, "w", ZIP_DEFLATED) as zip_file:
+        zip_file.writestr("apple_health_export/export.xml",
+                          EXPORT_HEADER + body + EXPORT_FOOTER)
+        for route_file_name, gpx in routes.items():
+            zip_file.writestr(
+                f"apple_health_export/workout-routes/{route_file_name}", gpx)
+    return zip_path
+
+
+@contextmanager
+def patched_export_directories(data_directory: str):
+    """Points every export directory in `config` at `data_directory` and creates them."""
+    directories = {}
+    for name in dir(config):
+        value = getattr(config, name)
+        if name.endswith("_DIRECTORY") and isinstance(value, str) and value.startswith(config.DATA_DIRECTORY):
+            directories[name] = data_directory + value[len(config.DATA_DIRECTORY):]
+    export_directories = [
+        data_directory + directory[len(config.DATA_DIRECTORY):]
+        for directory in config.HEALTH_EXPORT_DIRECTORIES
+    ]
+
+    with patch.multiple(config, HEALTH_EXPORT_DIRECTORIES=export_directories, **directories):
+        for directory in export_directories:
+            os.makedirs(directory, exist_ok=True)
+        yield
+
+
+def read_export_output(file_path: str) -> pd.DataFrame:
+    """Reads an output file written in the configured storage format, `file_path` may name it with any extension."""
+    return storage_utils.read_dataframe(storage_utils.storage_file_path(file_path))
+
+
+def read_export_outputs(data_directory: str) -> dict:
+    """Reads every output file below `data_directory` as text keyed by its relative path."""
+    outputs = {}
+    for directory, _, file_names in os.walk(data_directory):
+        for file_name in file_names:
+            file_path = os.path.join(directory, file_name)
+            if file_name.endswith(".npy"):
+                output = repr(np.load(file_path).tolist())
+            elif file_name.endswith(".json"):
+                with open(file_path) as json_file:
+                    output = json_file.read()
+            else:
+                output = storage_utils.read_dataframe(file_path).to_csv(index=False)
+            outputs[os.path.relpath(file_path, data_directory)] = output
+    return outputs
@@ -0,0 +1,184 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import config
+from handlers import health_record_handler as health_record_handler
+from utils import series_utils as series_utils
+from utils import schema_utils as schema_utils
+from utils import storage_utils as storage_utils
+from parsers.apple_health_export_parser import AppleHealthExportParser
+from export_test_utils import write_health_export_zip, patched_export_directories, heart_rate_record
+
+
+class TestHealthRecordHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.directories = patched_export_directories(
+            os.path.join(self.temp_directory.name, "export_data"))
+        self.directories.__enter__()
+        AppleHealthExportParser(write_health_export_zip(
+            os.path.join(self.temp_directory.name, "export.zip"))).parse_health_elements()
+
+    def tearDown(self):
+        self.directories.__exit__(None, None, None)
+        self.temp_directory.cleanup()
+
+    def test_loaded_dates_are_utc_datetimes(self):
+        df = health_record_handler.load_health_record_into_dataframe("HeartRate")
+
+        self.assertEqual(str(df["startDate"].dtype), "datetime64[ns, UTC]")
+        self.assertEqual(df["startDateTzOffset"].unique().tolist(), [-4 * 3600])
+
+    def test_chart_keeps_original_offsets(self):
+        chart = health_record_handler.load_health_record_into_chart_format(
+            "HeartRate", "2024-08-21 15:05:00 +0200", "2024-08-21 09:15:00 -0400")
+
+        self.assertEqual(chart["time"], ["2024-08-21 09:05:00 -0400", "2024-08-21 09:10:00 -0400",
+                                         "2024-08-21 09:15:00 -0400"])
+        self.assertEqual(len(chart["value"]), 3)
+
+    def test_chart_times_as_epoch_milliseconds(self):
+        chart = health_record_handler.load_health_record_into_chart_format(
+            "HeartRate", "2024-08-21 09:05:00 -0400", "2024-08-21 09:15:00 -0400",
+            health_record_handler.EPOCH_MS_TIME_FORMAT)
+
+        self.assertEqual(chart["time"], [1724245500000, 1724245800000, 1724246100000])
+        self.assertTrue(all(isinstance(time, int) for time in chart["time"]))
+
+    def test_chart_is_downsampled_to_max_points(self):
+        start_time, end_time = "2024-08-21 09:00:00 -0400", "2024-08-21 10:00:00 -0400"
+        chart = health_record_handler.load_health_record_into_chart_format("HeartRate", start_time, end_time)
+        downsampled = health_record_handler.load_health_record_into_chart_format(
+            "HeartRate", start_time, end_time, max_points=3)
+
+        self.assertEqual(len(downsampled["time"]), 3)
+        self.assertEqual(downsampled["time"][0], chart["time"][0])
+        self.assertEqual(downsampled["time"][-1], chart["time"][-1])
+        self.assertEqual(health_record_handler.load_health_record_into_chart_format(
+            "HeartRate", start_time, end_time, max_points=10), chart)
+
+    def test_chart_is_the_same_for_every_storage_format(self):
+        charts = []
+        for storage_format in ("csv", "feather"):
+            with patch.object(config, "STORAGE_FORMAT", storage_format):
+                AppleHealthExportParser(os.path.join(
+                    self.temp_directory.name, "export.zip"))._parse_export_elements()
+                charts.append(health_record_handler.load_health_record_into_chart_format(
+                    "HeartRate", "2024-08-21 09:00:00 -0400", "2024-08-21 10:00:00 -0400"))
+
+        self.assertEqual(charts[0], charts[1])
+        self.assertEqual(len(charts[0]["time"]), 6)
+
+    def test_out_of_order_records_are_stored_sorted_and_sliced(self):
+        body = "".join(heart_rate_record(minute, 100 + minute) for minute in (30, 10, 20, 40, 0, 50))
+        write_health_export_zip(os.path.join(self.temp_directory.name, "export.zip"), body=body)
+        AppleHealthExportParser(os.path.join(
+            self.temp_directory.name, "export.zip"))._parse_export_elements()
+
+        df = health_record_handler.load_health_record_into_dataframe("HeartRate")
+        self.assertTrue(df["startDate"].is_monotonic_increasing)
+
+        window = health_record_handler.slice_between_timestamps(
+            df, "2024-08-21 09:10:00 -0400", "2024-08-21 09:40:00 -0400")
+        self.assertEqual(window["value"].tolist(), [110, 120, 130, 140])
+        self.assertTrue(health_record_handler.slice_between_timestamps(
+            df, "2024-08-22 09:00:00 -0400", "2024-08-22 10:00:00 -0400").empty)
+
+    def test_series_arrays_are_memory_mapped_and_match_the_record_file(self):
+        record_path = health_record_handler.get_health_record_path("HeartRate")
+        arrays = series_utils.load_series_arrays(record_path)
+        self.assertIsInstance(arrays["value"], np.memmap)
+
+        start_time, end_time = "2024-08-21 09:05:00 -0400", "2024-08-21 09:20:00 -0400"
+        from_arrays = series_utils.series_window(arrays, start_time, end_time)
+        from_file = health_record_handler.load_record_between_timestamps(
+            "HeartRate", start_time, end_time, health_record_handler.CHART_COLUMNS)
+        pd.testing.assert_frame_equal(
+            from_arrays, from_file[series_utils.SERIES_COLUMNS].reset_index(drop=True))
+
+    def test_series_arrays_are_filled_chunk_by_chunk(self):
+        record_path = health_record_handler.get_health_record_path("HeartRate")
+        dtypes = schema_utils.get_record_dtypes("HeartRate")
+        df = storage_utils.read_dataframe(record_path, dtype=dtypes)
+        chunked_record_path = os.path.join(self.temp_directory.name, "ChunkedHeartRate.parquet")
+        series_utils.write_series_arrays(
+            chunked_record_path, storage_utils.iter_dataframe_chunks(record_path, 2, dtypes), len(df), dtypes)
+
+        start_time, end_time = "2024-08-21 09:00:00 -0400", "2024-08-21 10:00:00 -0400"
+        pd.testing.assert_frame_equal(
+            series_utils.series_window(series_utils.load_series_arrays(chunked_record_path), start_time, end_time),
+            series_utils.series_window(series_utils.load_series_arrays(record_path), start_time, end_time))
+        self.assertFalse([file_name for file_name in os.listdir(self.temp_directory.name)
+                          if file_name.endswith(".partial")])
+
+    def test_series_arrays_keep_missing_start_dates_last(self):
+        record_path = health_record_handler.get_health_record_path("HeartRate")
+        dtypes = schema_utils.get_record_dtypes("HeartRate")
+        df = storage_utils.read_dataframe(record_path, columns=series_utils.SERIES_COLUMNS, dtype=dtypes)
+        missing_start = df.iloc[[0]].copy()
+        missing_start.loc[:, ["startDate", "value"]] = [pd.NaT, 1.0]
+        df = pd.concat([df, missing_start], ignore_index=True)
+        missing_record_path = os.path.join(self.temp_directory.name, "MissingStartHeartRate.parquet")
+        series_utils.write_series_arrays(missing_record_path, [df], len(df), dtypes)
+
+        arrays = series_utils.load_series_arrays(missing_record_path)
+        self.assertTrue((np.diff(arrays["startDate"]) >= 0).all())
+        window = series_utils.series_window(arrays, "2024-08-21 09:05:00 -0400", "2024-08-21 09:15:00 -0400")
+        self.assertEqual(window["startDate"].dt.strftime("%H:%M").tolist(), ["13:05", "13:10", "13:15"])
+        self.assertNotIn(1.0, window["value"].tolist())
+
+    def test_chart_falls_back_to_record_file_without_series_arrays(self):
+        start_time, end_time = "2024-08-21 09:00:00 -0400", "2024-08-21 10:00:00 -0400"
+        from_arrays = health_record_handler.load_health_record_into_chart_format(
+            "HeartRate", start_time, end_time)
+        os.remove(series_utils.series_array_path(
+            health_record_handler.get_health_record_path("HeartRate"), "value"))
+
+        self.assertEqual(health_record_handler.load_health_record_into_chart_format(
+            "HeartRate", start_time, end_time), from_arrays)
+
+    def test_windows_load_each_record_type_once(self):
+        windows = [
+            ("HeartRate", "2024-08-21 09:00:00 -0400", "2024-08-21 09:10:00 -0400"),
+            ("StepCount", "2024-08-21 09:00:00 -0400", "2024-08-21 10:00:00 -0400"),
+            ("HeartRate", "2024-08-21 09:15:00 -0400", "2024-08-21 10:00:00 -0400"),
+            ("RunningPower", "2024-08-21 09:00:00 -0400", "2024-08-21 10:00:00 -0400"),
+        ]
+
+        with patch.object(health_record_handler, "_load_series_slicer",
+                          wraps=health_record_handler._load_series_slicer) as load_series_slicer:
+            charts = health_record_handler.load_health_record_windows_into_chart_format(windows)
+
+        self.assertEqual(sorted(call.args[0] for call in load_series_slicer.call_args_list),
+                         ["HeartRate", "RunningPower", "StepCount"])
+        self.assertEqual(charts, [health_record_handler.load_health_record_into_chart_format(*window)
+                                  for window in windows])
+        self.assertEqual(len(charts[0]["time"]) + len(charts[2]["time"]), 6)
+        self.assertEqual(charts[3], {})
+
+    def test_workout_windows_read_the_rows_joined_at_ingest(self):
+        sample_ranges = health_record_handler.load_workout_sample_ranges("HeartRate")
+        self.assertEqual(list(sample_ranges), [0])
+
+        window = ("HeartRate", "2024-08-21 09:00:00 -0400", "2024-08-21 09:30:00 -0400")
+        with patch.object(series_utils, "series_window", wraps=series_utils.series_window) as series_window:
+            charts = health_record_handler.load_health_record_windows_into_chart_format([window], [0])
+
+        self.assertEqual(series_window.call_args.args[3], sample_ranges[0])
+        self.assertEqual(charts, [health_record_handler.load_health_record_into_chart_format(*window)])
+        self.assertEqual(len(charts[0]["time"]), 6)
+
+    def test_workout_windows_are_searched_without_joined_rows(self):
+        window = ("HeartRate", "2024-08-21 09:00:00 -0400", "2024-08-21 09:30:00 -0400")
+        with patch.object(health_record_handler, "load_workout_sample_ranges", return_value={}):
+            charts = health_record_handler.load_health_record_windows_into_chart_format([window], [0])
+
+        self.assertEqual(charts, [health_record_handler.load_health_record_into_chart_format(*window)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -120,5 +120,44 @@ class TestHealthRecordParser(unittest.TestCase):
             parser.DEFAULT_HEALTH_RECORD_COLUMNS))
 
 
+class TestHealthRecordRow(unittest.TestCase):
+
+    def setUp(self):
+        self.device = ("&lt;&lt;HKDevice: 0x2825cf520&gt;, name:Apple Watch, manufacturer:Apple Inc., "
+                       "model:Watch, hardware:Watch6,14, software:10.2&gt;")
+        self.records = [
+            '<Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" sourceVersion="10.2" '
+            f'device="{self.device}" unit="count/min" creationDate="1" startDate="2" endDate="3" value="61">'
+            '<MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="1"/>'
+            '<MetadataEntry key="HKMetadataKeyHeartRateMotionContext" value="2"/></Record>',
+            '<Record type="HKQuantityTypeIdentifierHeartRate" sourceName="Watch" unit="count/min" '
+            'creationDate="1" startDate="2" endDate="3" value="61"/>',
+            '<Record type="HKQuantityTypeIdentifierVO2Max" sourceName="Watch" unit="mL/min·kg" '
+            'creationDate="1" startDate="2" endDate="3" value="45.1">'
+            '<MetadataEntry key="HKVO2MaxTestType" value="2"/></Record>',
+            '<Record type="HKCategoryTypeIdentifierSleepAnalysis" sourceName="Watch" '
+            'creationDate="1" startDate="2" endDate="3" value="HKCategoryValueSleepAnalysisAsleepCore"/>',
+            '<Record type="HKDataTypeSleepDurationGoal" sourceName="Watch" unit="hr" '
+            'creationDate="1" startDate="2" endDate="3" value="8"/>',
+            '<Record type="HKQuantityTypeIdentifierNewWatchMetric" sourceName="Watch" unit="W" '
+            f'device="{self.device}" creationDate="1" startDate="2" endDate="3" value="250"/>',
+        ]
+
+    def test_health_record_row_matches_health_record_parser(self):
+        for record in self.records:
+            element = ET.fromstring(record)
+            with self.subTest(record=element.get("type")):
+                expected = health_record_parser.HealthRecordParser(element).csv_row_structure()
+                result = health_record_parser.health_record_row(
+                    element.attrib, health_record_parser.element_metadata(element))
+                self.assertEqual(result, expected)
+
+    def test_unknown_record_type_is_normalized_without_growing_type_table(self):
+        row = health_record_parser.health_record_row(
+            {"type": "HKQuantityTypeIdentifierAnotherNewMetric"}, {})
+        self.assertEqual(row[0], "AnotherNewMetric")
+        self.assertNotIn("HKQuantityTypeIdentifierAnotherNewMetric",
+                         health_record_parser.RECORD_TYPE_NAMES)
+
 if __name__ == '__main__':
     unittest.main()
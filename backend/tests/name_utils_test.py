@@ -100,6 +100,24 @@ class TestNameUtils(unittest.TestCase):
         expected = "SleepDurationGoal"
         self.assertEqual(result, expected)
 
+    def test_normalization_caches_report_hits_and_misses(self):
+        name_utils.clear_normalization_caches()
+        device_name = "&lt;&lt;HKDevice: 0x2825cf520&gt;, name:Apple Watch, manufacturer:Apple Inc.&gt;"
+        for _ in range(3):
+            name_utils.extract_device_name(device_name)
+            name_utils.remove_record_type_prefix("HKQuantityTypeIdentifierHeartRate")
+        name_utils.remove_record_type_prefix("HKQuantityTypeIdentifierStepCount")
+
+        stats = name_utils.get_normalization_cache_stats()
+        self.assertEqual(stats["extract_device_name"]["hits"], 2)
+        self.assertEqual(stats["extract_device_name"]["misses"], 1)
+        self.assertEqual(stats["remove_record_type_prefix"]["hits"], 2)
+        self.assertEqual(stats["remove_record_type_prefix"]["misses"], 2)
+        self.assertEqual(stats["remove_record_type_prefix"]["currsize"], 2)
+
+        name_utils.clear_normalization_caches()
+        self.assertEqual(name_utils.get_normalization_cache_stats()["extract_device_name"]["currsize"], 0)
+
 
 if __name__ == '__main__':
     unittest.main()
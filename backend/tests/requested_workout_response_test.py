@@ -0,0 +1,92 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+import config
+from utils.response_utils import RequestedWorkoutResponse, RequestValidationError
+from parsers.apple_health_export_parser import AppleHealthExportParser
+from export_test_utils import write_health_export_zip, patched_export_directories
+
+
+class TestRequestedWorkoutResponse(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.directories = patched_export_directories(
+            os.path.join(self.temp_directory.name, "export_data"))
+        self.directories.__enter__()
+        AppleHealthExportParser(write_health_export_zip(
+            os.path.join(self.temp_directory.name, "export.zip"))).parse_health_elements()
+
+    def tearDown(self):
+        self.directories.__exit__(None, None, None)
+        self.temp_directory.cleanup()
+
+    def _generate_response(self, max_workers, **kwargs):
+        with patch.object(config, "WORKOUT_RESPONSE_MAX_WORKERS", max_workers):
+            response_builder = RequestedWorkoutResponse()
+            response_builder.generate_response("2024-08-21", **kwargs)
+        return response_builder
+
+    def test_concurrent_response_matches_serial_response(self):
+        serial_response = self._generate_response(1)
+        concurrent_response = self._generate_response(4)
+
+        self.assertEqual(concurrent_response.response, serial_response.response)
+        workout = concurrent_response.response["workoutContext"]["workouts"][0]
+        self.assertEqual(len(workout["workoutVitals"]["heartRate"]["chart"]["value"]), 6)
+        self.assertTrue(workout["workoutRoute"])
+
+    def test_every_task_is_timed(self):
+        response_builder = self._generate_response(4)
+
+        expected_tasks = {f"chart:{record_name}" for record_name in RequestedWorkoutResponse.WORKOUT_CHART_RECORDS}
+        expected_tasks.add("route:0")
+        self.assertEqual(set(response_builder.task_timings), expected_tasks)
+        self.assertTrue(all(seconds >= 0 for seconds in response_builder.task_timings.values()))
+
+    def test_task_timings_are_included_when_requested(self):
+        response_builder = self._generate_response(4, include_timings=True)
+
+        task_timings = response_builder.response["workoutContext"]["taskTimings"]
+        self.assertEqual({timing["task"] for timing in task_timings}, set(response_builder.task_timings))
+        milliseconds = [timing["milliseconds"] for timing in task_timings]
+        self.assertEqual(milliseconds, sorted(milliseconds, reverse=True))
+        self.assertNotIn("taskTimings", self._generate_response(4).response["workoutContext"])
+
+    def test_invalid_include_timings_is_rejected(self):
+        with self.assertRaises(RequestValidationError):
+            RequestedWorkoutResponse().generate_response("2024-08-21", include_timings="yes")
+
+    def test_chart_times_in_requested_format(self):
+        response_builder = self._generate_response(4, time_format="epochMs")
+
+        chart = response_builder.response["workoutContext"]["workouts"][0]["workoutVitals"]["heartRate"]["chart"]
+        self.assertEqual(chart["time"][0], 1724245200000)
+
+    def test_invalid_time_format_is_rejected(self):
+        with self.assertRaises(RequestValidationError):
+            RequestedWorkoutResponse().generate_response("2024-08-21", "iso")
+
+    def test_charts_are_downsampled_to_max_points(self):
+        response_builder = self._generate_response(4, max_points=3)
+
+        chart = response_builder.response["workoutContext"]["workouts"][0]["workoutVitals"]["heartRate"]["chart"]
+        self.assertEqual(len(chart["value"]), 3)
+
+    def test_invalid_max_points_are_rejected(self):
+        for max_points in (2, "100", 10.5):
+            with self.subTest(max_points=max_points), self.assertRaises(RequestValidationError):
+                RequestedWorkoutResponse().generate_response("2024-08-21", max_points=max_points)
+
+    def test_invalid_route_detail_is_rejected(self):
+        with self.assertRaises(RequestValidationError):
+            RequestedWorkoutResponse().generate_response("2024-08-21", route_detail="tiny")
+
+    def test_invalid_route_encoding_is_rejected(self):
+        with self.assertRaises(RequestValidationError):
+            RequestedWorkoutResponse().generate_response("2024-08-21", route_encoding="protobuf")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import unittest
+from unittest.mock import patch
+import numpy as np
+import pandas as pd
+import config
+from utils import route_metrics_utils as route_metrics_utils
+
+# Degrees of latitude per meter along a meridian
+LATITUDE_DEGREES_PER_METER = 1 / (np.pi * 6_371_008.8 / 180)
+
+
+def straight_route(distances: list, seconds: list, elevations: list) -> pd.DataFrame:
+    """Returns a route heading north with points at `distances` meters from the start."""
+    return pd.DataFrame({
+        "lon": 0.0,
+        "lat": np.array(distances, dtype=np.float64) * LATITUDE_DEGREES_PER_METER,
+        "elevation": np.array(elevations, dtype=np.float64),
+        "time": pd.Timestamp("2024-08-21 13:00:00", tz="UTC") + pd.to_timedelta(seconds, unit="s"),
+    })
+
+
+class TestRouteMetricsUtils(unittest.TestCase):
+
+    def test_haversine_distances_between_consecutive_points(self):
+        distances = route_metrics_utils.haversine_distances(
+            np.array([0.0, 0.0, 1.0, np.nan]), np.array([0.0, 1.0, 1.0, 1.0]))
+
+        np.testing.assert_allclose(distances, [111_195.08, 111_195.08, 0.0], rtol=1e-6)
+
+    def test_metrics_measure_distance_pace_and_grade(self):
+        df = straight_route(range(0, 50, 5), range(0, 20, 2), range(0, 10))
+        with patch.object(config, "ROUTE_METRICS_SMOOTHING_POINTS", 2):
+            metrics = route_metrics_utils.add_route_metrics(df)
+
+        np.testing.assert_allclose(metrics["distance"], range(0, 50, 5), atol=1e-6)
+        np.testing.assert_allclose(metrics["pace"], 400.0)
+        np.testing.assert_allclose(metrics["grade"], 20.0)
+
+    def test_stationary_points_have_no_pace_or_grade(self):
+        df = straight_route([0, 0, 0, 10], [0, 10, 20, 30], [0, 1, 2, 3])
+        with patch.object(config, "ROUTE_METRICS_SMOOTHING_POINTS", 1):
+            metrics = route_metrics_utils.add_route_metrics(df)
+
+        self.assertEqual(metrics["pace"].isna().tolist(), [True, True, False, False])
+        self.assertEqual(metrics["grade"].isna().tolist(), [True, True, False, False])
+
+    def test_splits_interpolate_split_boundaries(self):
+        df = route_metrics_utils.add_route_metrics(
+            straight_route([0, 1000, 2500], [0, 300, 1200], [100, 110, 90]))
+        splits = route_metrics_utils.route_splits(df)
+        km_splits = splits[splits["unit"] == "km"]
+        mile_splits = splits[splits["unit"] == "mi"]
+
+        self.assertEqual(km_splits["split"].tolist(), [1, 2, 3])
+        np.testing.assert_allclose(km_splits["distance"], [1000, 1000, 500], atol=1e-6)
+        np.testing.assert_allclose(km_splits["duration"], [300, 600, 300], atol=1e-3)
+        np.testing.assert_allclose(km_splits["pace"], [300, 600, 600], atol=1e-3)
+        np.testing.assert_allclose(km_splits["elevationGain"], [10, 0, 0], atol=1e-6)
+        np.testing.assert_allclose(km_splits["elevationLoss"], [0, 40 / 3, 20 / 3], atol=1e-6)
+        np.testing.assert_allclose(mile_splits["distance"], [1609.344, 2500 - 1609.344], atol=1e-6)
+        np.testing.assert_allclose(mile_splits["duration"].sum(), 1200, atol=1e-3)
+
+    def test_route_without_distance_has_no_splits(self):
+        df = route_metrics_utils.add_route_metrics(straight_route([0], [0], [0]))
+
+        self.assertTrue(route_metrics_utils.route_splits(df).empty)
+
+
+if __name__ == '__main__':
+    unittest.main()
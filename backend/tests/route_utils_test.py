@@ -0,0 +1,56 @@
+import unittest
+import numpy as np
+from utils import route_utils as route_utils
+
+
+def reference_rdp(x, y, tolerance, start=0, end=None):
+    """Returns the indexes kept by a plain recursive Ramer-Douglas-Peucker."""
+    end = len(x) - 1 if end is None else end
+    if end - start < 2:
+        return [start, end]
+    distances = route_utils._segment_distances(x, y, start, end)
+    split = int(np.argmax(distances))
+    if distances[split] <= tolerance:
+        return [start, end]
+    split += start + 1
+    return reference_rdp(x, y, tolerance, start, split)[:-1] + reference_rdp(x, y, tolerance, split, end)
+
+
+class TestRouteUtils(unittest.TestCase):
+
+    def test_significance_matches_recursive_simplification(self):
+        random = np.random.default_rng(7)
+        x = np.cumsum(random.normal(size=500)) * 5
+        y = np.cumsum(random.normal(size=500)) * 5
+        significance = route_utils.rdp_significance(x, y)
+
+        for tolerance in (0.5, 2.0, 10.0, 50.0):
+            with self.subTest(tolerance=tolerance):
+                self.assertEqual(np.flatnonzero(significance > tolerance).tolist(),
+                                 reference_rdp(x, y, tolerance))
+
+    def test_min_tolerance_keeps_simplifications_above_it(self):
+        random = np.random.default_rng(11)
+        x = np.cumsum(random.normal(size=300)) * 5
+        y = np.cumsum(random.normal(size=300)) * 5
+        exact = route_utils.rdp_significance(x, y)
+        bounded = route_utils.rdp_significance(x, y, min_tolerance=3.0)
+
+        for tolerance in (3.0, 10.0):
+            self.assertEqual(np.flatnonzero(bounded > tolerance).tolist(),
+                             np.flatnonzero(exact > tolerance).tolist())
+
+    def test_closed_loop_keeps_its_turns(self):
+        x = np.array([0.0, 100.0, 100.0, 0.0, 0.0])
+        y = np.array([0.0, 0.0, 100.0, 100.0, 0.0])
+
+        significance = route_utils.rdp_significance(x, y)
+        self.assertTrue(np.all(significance > 10.0))
+
+    def test_detail_path_is_named_after_the_route_file(self):
+        self.assertEqual(route_utils.route_detail_path("routes/route_2024-08-21_9.00am.parquet", "low"),
+                         "routes/route_2024-08-21_9.00am.low.parquet")
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+import pandas as pd
+import config
+from utils import schema_utils as schema_utils
+from utils import storage_utils as storage_utils
+from utils.writer_utils import ChunkedRecordWriter
+from parsers.health_record_parser import HealthRecordParser
+
+
+class TestSchemaUtils(unittest.TestCase):
+
+    def test_value_dtype_follows_record_type(self):
+        self.assertEqual(schema_utils.get_record_value_dtype("StepCount"), "float32")
+        self.assertEqual(schema_utils.get_record_value_dtype("HeartRate"), "float64")
+        self.assertEqual(schema_utils.get_record_value_dtype("RunningPower"), "float64")
+        self.assertEqual(schema_utils.get_record_value_dtype("SleepAnalysis"), "category")
+        self.assertEqual(schema_utils.get_record_value_dtype("Headache"), "category")
+        self.assertEqual(schema_utils.get_record_value_dtype("UnknownRecord"), "string")
+
+    def test_record_dtypes_cover_every_column_in_order(self):
+        for record_type in ("HeartRate", "VO2Max", "StepCount"):
+            with self.subTest(record_type=record_type):
+                dtypes = schema_utils.get_record_dtypes(record_type)
+                self.assertListEqual([column for column in dtypes if not column.endswith("TzOffset")],
+                                     HealthRecordParser.get_column_type(record_type))
+                self.assertEqual(dtypes["device"], "category")
+                self.assertEqual(dtypes["startDate"], "datetime64[ns, UTC]")
+                self.assertEqual(dtypes["startDateTzOffset"], "int32")
+
+    def test_records_are_stored_and_loaded_with_their_dtypes(self):
+        columns = HealthRecordParser.get_column_type("HeartRate")
+        dtypes = schema_utils.get_record_dtypes("HeartRate")
+        rows = [("HeartRate", "count/min", f"{60 + index}.1234", "Watch", None, "Apple Watch",
+                 "2024-08-21 09:00:00 -0400", "2024-08-21 09:00:00 -0400",
+                 "2024-08-21 09:00:00 -0400", "ACTIVE") for index in range(5)]
+
+        with tempfile.TemporaryDirectory() as temp_directory:
+            for storage_format in storage_utils.STORAGE_FORMAT_EXTENSIONS:
+                with self.subTest(storage_format=storage_format), \
+                        patch.object(config, "STORAGE_FORMAT", storage_format):
+                    path = storage_utils.storage_file_path(os.path.join(temp_directory, "HeartRate"))
+                    writer = ChunkedRecordWriter(path, columns, max_buffered_rows=2, dtypes=dtypes)
+                    for row in rows:
+                        writer.append(row)
+                    writer.close()
+
+                    df = storage_utils.read_dataframe(path, dtype=dtypes)
+                    self.assertEqual(df["value"].dtype, "float64")
+                    self.assertEqual(df["sourceName"].dtype, "category")
+                    self.assertEqual(df["value"].tolist(), [60.1234, 61.1234, 62.1234, 63.1234, 64.1234])
+                    self.assertTrue(df["sourceVersion"].isna().all())
+                    self.assertEqual(df["startDate"].iloc[0], pd.Timestamp("2024-08-21 13:00:00", tz="UTC"))
+                    self.assertEqual(df["startDateTzOffset"].tolist(), [-4 * 3600] * 5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,113 @@
+import unittest
+import os
+import tempfile
+from unittest.mock import patch
+import config
+from utils import storage_utils as storage_utils
+from parsers import sharded_record_parser as sharded_record_parser
+from parsers.apple_health_export_parser import AppleHealthExportParser
+from export_test_utils import (EXPORT_HEADER, EXPORT_FOOTER, heart_rate_record, quantity_record,
+                               blood_pressure_correlation, running_workout, activity_summary,
+                               write_health_export_zip, patched_export_directories, read_export_outputs)
+
+
+def interleaved_export_body() -> str:
+    return "".join([
+        *(heart_rate_record(minute, 100 + minute) for minute in range(20)),
+        blood_pressure_correlation(),
+        running_workout(),
+        *(quantity_record("StepCount", minute, minute) for minute in range(20)),
+        *(heart_rate_record(minute, 60 + minute, motion_context=1) for minute in range(20, 40)),
+        running_workout("route_2024-08-21_10.00am.gpx"),
+        activity_summary("2024-08-21"),
+        activity_summary("2024-08-22"),
+    ])
+
+
+class TestShardedRecordParser(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.xml_path = os.path.join(self.temp_directory.name, "export.xml")
+        with open(self.xml_path, "w") as xml_file:
+            xml_file.write(EXPORT_HEADER + interleaved_export_body() + EXPORT_FOOTER)
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def test_byte_range_reader_wraps_range_in_root_element(self):
+        with open(self.xml_path, "rb") as xml_file:
+            content = xml_file.read()
+
+        with sharded_record_parser.ByteRangeReader(self.xml_path, 10, 50) as reader:
+            chunks = []
+            while chunk := reader.read(7):
+                chunks.append(chunk)
+
+        self.assertEqual(b"".join(chunks), b"<HealthData>" + content[10:50] + b"</HealthData>")
+
+    def test_shard_boundaries_start_on_top_level_records(self):
+        with open(self.xml_path, "rb") as xml_file:
+            content = xml_file.read()
+
+        shards = sharded_record_parser.find_record_shard_boundaries(self.xml_path, 4)
+
+        self.assertEqual(len(shards), 4)
+        self.assertEqual(shards[-1][1], content.rindex(b"</HealthData>"))
+        for (_, previous_end), (start, _) in zip(shards, shards[1:]):
+            self.assertEqual(previous_end, start)
+            self.assertTrue(content[start - 1:].startswith(b"\n <Record "))
+
+    def test_parse_record_shard_returns_records_and_other_elements(self):
+        shards = sharded_record_parser.find_record_shard_boundaries(self.xml_path, 1)
+        shard_directory = os.path.join(self.temp_directory.name, "shard")
+        os.makedirs(shard_directory)
+
+        record_runs, other_elements = sharded_record_parser.parse_record_shard(
+            self.xml_path, *shards[0], shard_directory, {"Workout"})
+
+        self.assertEqual(sorted(record_runs), ["BloodPressureDiastolic", "BloodPressureSystolic",
+                                               "HeartRate", "StepCount"])
+        heart_rate_path, heart_rate_count = record_runs["HeartRate"]
+        heart_rate = storage_utils.read_dataframe(heart_rate_path)
+        self.assertEqual(len(heart_rate), heart_rate_count)
+        self.assertTrue(heart_rate["startDate"].is_monotonic_increasing)
+        self.assertEqual(len(other_elements), 2)
+        self.assertTrue(other_elements[0].startswith(b"<Workout "))
+
+
+class TestShardedExportParsing(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.export_path = write_health_export_zip(
+            os.path.join(self.temp_directory.name, "export.zip"), body=interleaved_export_body())
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def _parse_outputs(self, data_directory, max_workers):
+        with patched_export_directories(data_directory), \
+                patch.object(config, "RECORD_PARSER_MAX_WORKERS", max_workers), \
+                patch.object(config, "RECORD_PARSER_MIN_SHARD_BYTES", 1):
+            parser = AppleHealthExportParser(self.export_path)
+            self.assertEqual(parser._get_record_shard_count(), max_workers)
+            parser._parse_export_elements()
+
+        return read_export_outputs(data_directory)
+
+    def test_sharded_parsing_matches_single_pass(self):
+        single_pass = self._parse_outputs(
+            os.path.join(self.temp_directory.name, "single"), 1)
+        sharded = self._parse_outputs(
+            os.path.join(self.temp_directory.name, "sharded"), 3)
+
+        self.assertIn(storage_utils.storage_file_path(
+            os.path.join("health_records", "vitals", "HeartRate")), sharded)
+        self.assertIn(storage_utils.storage_file_path(
+            os.path.join("workout_records", "Workouts")), sharded)
+        self.assertEqual(sharded, single_pass)
+
+
+if __name__ == '__main__':
+    unittest.main()
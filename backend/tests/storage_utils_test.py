@@ -0,0 +1,74 @@
+import unittest
+import os
+import tempfile
+import pandas as pd
+from utils import storage_utils as storage_utils
+from utils.writer_utils import ChunkedRecordWriter
+
+
+class TestStorageUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.df = pd.DataFrame({
+            "type": ["Running", "Cycling", "Walking"],
+            "duration": ["30.5", "60", "15"],
+            "averageHeartRate": [150.0, "", 110.0],
+            "FileReference": ["/workout-routes/route.gpx", "", ""],
+        })
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def test_storage_file_path_uses_format_extension(self):
+        self.assertEqual(storage_utils.storage_file_path("/data/route_2024-08-21_9.00am.gpx", "parquet"),
+                         "/data/route_2024-08-21_9.00am.parquet")
+        self.assertEqual(storage_utils.storage_file_path("/data/HeartRate", "feather"),
+                         "/data/HeartRate.feather")
+        with self.assertRaises(ValueError):
+            storage_utils.storage_file_path("/data/Workouts.csv", "xlsx")
+
+    def test_formats_read_back_what_csv_reads_back(self):
+        outputs = {}
+        for storage_format in storage_utils.STORAGE_FORMAT_EXTENSIONS:
+            path = storage_utils.storage_file_path(
+                os.path.join(self.temp_directory.name, "Workouts.csv"), storage_format)
+            storage_utils.write_dataframe(self.df, path)
+            outputs[storage_format] = storage_utils.read_dataframe(path)
+
+        self.assertEqual(outputs["csv"]["duration"].tolist(), [30.5, 60, 15])
+        for storage_format, df in outputs.items():
+            with self.subTest(storage_format=storage_format):
+                self.assertEqual(df.to_csv(index=False), outputs["csv"].to_csv(index=False))
+
+    def test_read_dataframe_loads_only_requested_columns(self):
+        for storage_format in ("parquet", "feather"):
+            path = storage_utils.storage_file_path(
+                os.path.join(self.temp_directory.name, "Workouts.csv"), storage_format)
+            storage_utils.write_dataframe(self.df, path)
+
+            df = storage_utils.read_dataframe(path, columns=["type", "duration"])
+            self.assertListEqual(list(df.columns), ["type", "duration"])
+
+    def test_chunked_writes_are_read_back_as_written(self):
+        columns = ["type", "value", "sourceVersion"]
+        rows = [("HeartRate", str(60 + index), None if index < 10 else "17.0")
+                for index in range(25)]
+
+        for storage_format in ("parquet", "feather"):
+            path = storage_utils.storage_file_path(
+                os.path.join(self.temp_directory.name, "HeartRate"), storage_format)
+            writer = ChunkedRecordWriter(path, columns, max_buffered_rows=10)
+            for row in rows:
+                writer.append(row)
+            writer.close()
+
+            chunks = list(storage_utils.iter_dataframe_chunks(path, 10))
+            self.assertEqual([len(chunk) for chunk in chunks], [10, 10, 5])
+            self.assertEqual(pd.concat(chunks)["value"].tolist(), [row[1] for row in rows])
+            self.assertEqual(storage_utils.read_dataframe(path)["value"].tolist(),
+                             list(range(60, 85)))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,39 @@
+import unittest
+import pandas as pd
+from utils import storage_utils as storage_utils
+from utils import schema_utils as schema_utils
+from utils import workout_index_utils as workout_index_utils
+
+
+class TestWorkoutIndexUtils(unittest.TestCase):
+
+    def setUp(self):
+        self.workouts = storage_utils.apply_dtypes(pd.DataFrame({"startDate": [
+            "2024-08-22 07:00:00 -0400",
+            "2024-08-21 23:30:00 -0400",
+            "2024-08-22 05:30:00 +0200",
+            "2024-08-21 18:00:00 -0400",
+        ]}), schema_utils.WORKOUT_DATE_DTYPES)
+
+    def test_date_index_uses_local_start_dates(self):
+        date_index = workout_index_utils.build_workout_date_index(self.workouts)
+
+        self.assertEqual(date_index["date"].tolist(), ["2024-08-21", "2024-08-21", "2024-08-22", "2024-08-22"])
+        self.assertEqual(date_index["workoutId"].tolist(), [1, 3, 0, 2])
+
+    def test_workout_ids_on_date(self):
+        date_index = workout_index_utils.build_workout_date_index(self.workouts)
+
+        self.assertEqual(workout_index_utils.get_workout_ids_on_date(date_index, "2024-08-21"), [1, 3])
+        self.assertEqual(workout_index_utils.get_workout_ids_on_date(date_index, "2024-08-22"), [0, 2])
+        self.assertEqual(workout_index_utils.get_workout_ids_on_date(date_index, "2024-08-23"), [])
+
+    def test_details_list_sorted_unique_dates(self):
+        date_index = workout_index_utils.build_workout_date_index(self.workouts)
+
+        self.assertEqual(workout_index_utils.build_workout_details(self.workouts, date_index),
+                         {"totalWorkouts": 4, "workoutDates": ["2024-08-21", "2024-08-22"]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,132 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+import config
+from handlers import workout_record_handler as workout_record_handler
+from utils import storage_utils as storage_utils
+from utils import encoding_utils as encoding_utils
+from parsers.apple_health_export_parser import AppleHealthExportParser
+from export_test_utils import write_health_export_zip, patched_export_directories
+
+
+class TestWorkoutRecordHandler(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.directories = patched_export_directories(
+            os.path.join(self.temp_directory.name, "export_data"))
+        self.directories.__enter__()
+        AppleHealthExportParser(write_health_export_zip(
+            os.path.join(self.temp_directory.name, "export.zip"))).parse_health_elements()
+
+    def tearDown(self):
+        self.directories.__exit__(None, None, None)
+        self.temp_directory.cleanup()
+
+    def test_unique_workout_dates_use_local_start_dates(self):
+        df = workout_record_handler.load_workout_records_into_dataframe()
+
+        self.assertEqual(workout_record_handler.load_unique_workout_dates(df), ["2024-08-21"])
+
+    def test_workouts_from_date_keep_original_date_strings(self):
+        df = workout_record_handler.load_workout_records_into_dataframe()
+        workouts = workout_record_handler.load_workout_records_from_date(df, "2024-08-21")
+
+        self.assertEqual(len(workouts), 1)
+        self.assertEqual(workouts[0]["startDate"], "2024-08-21 09:00:00 -0400")
+        self.assertEqual(workouts[0]["creationDate"], "2024-08-21 09:31:00 -0400")
+        self.assertEqual(workouts[0]["workoutId"], 0)
+        self.assertNotIn("startDateTzOffset", workouts[0])
+        self.assertIsNone(workout_record_handler.load_workout_records_from_date(df, "2024-08-22"))
+
+    def test_workouts_from_date_are_looked_up_in_the_date_index(self):
+        df = workout_record_handler.load_workout_records_into_dataframe()
+        with patch.object(workout_record_handler, "_local_workout_start_times") as local_workout_start_times:
+            workouts = workout_record_handler.load_workout_records_from_date(df, "2024-08-21")
+
+        local_workout_start_times.assert_not_called()
+        self.assertEqual([workout["workoutId"] for workout in workouts], [0])
+
+    def test_workouts_from_date_are_scanned_without_a_date_index(self):
+        df = workout_record_handler.load_workout_records_into_dataframe()
+        indexed_workouts = workout_record_handler.load_workout_records_from_date(df, "2024-08-21")
+        os.remove(storage_utils.storage_file_path(os.path.join(
+            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUT_DATE_INDEX_FILE_NAME)))
+
+        self.assertEqual(workout_record_handler.load_workout_records_from_date(df, "2024-08-21"), indexed_workouts)
+
+    def test_workout_details_are_written_at_ingest(self):
+        self.assertEqual(workout_record_handler.load_workout_details(),
+                         {"totalWorkouts": 1, "workoutDates": ["2024-08-21"]})
+
+    def test_route_levels_of_detail_are_simplified(self):
+        full_route = workout_record_handler.load_workout_record_gpx_data(
+            "/workout-routes/route_2024-08-21_9.00am.gpx")
+        low_route = workout_record_handler.load_workout_record_gpx_data(
+            "/workout-routes/route_2024-08-21_9.00am.gpx", "low")
+
+        self.assertEqual(len(full_route["latitude"]), 5)
+        self.assertEqual(low_route["latitude"], [full_route["latitude"][0], full_route["latitude"][-1]])
+        self.assertEqual(low_route["time"], [full_route["time"][0], full_route["time"][-1]])
+
+    def test_compact_route_decodes_to_the_route_lists(self):
+        route = workout_record_handler.load_workout_record_gpx_data(
+            "/workout-routes/route_2024-08-21_9.00am.gpx")
+        compact_route = workout_record_handler.load_workout_record_gpx_data(
+            "/workout-routes/route_2024-08-21_9.00am.gpx", route_encoding="compact")
+
+        self.assertEqual(compact_route["pointCount"], 5)
+        latitudes, longitudes = encoding_utils.decode_polyline(compact_route["path"])
+        np.testing.assert_allclose(latitudes, route["latitude"])
+        np.testing.assert_allclose(longitudes, route["longitude"])
+        self.assertEqual(encoding_utils.decode_varint_deltas(compact_route["time"]).tolist(),
+                         [1724245200000 + minute * 60000 for minute in range(5)])
+        self.assertEqual(compact_route["speed"]["encoding"], "deltaVarint")
+        self.assertEqual((encoding_utils.decode_varint_deltas(compact_route["speed"]["data"]) /
+                          compact_route["speed"]["scale"]).tolist(), route["speed"])
+
+    def test_compact_route_drops_points_without_coordinates_or_time(self):
+        df = workout_record_handler.load_workout_route_into_dataframe("/workout-routes/route_2024-08-21_9.00am.gpx")
+        df.loc[1, "lat"] = np.nan
+        df.loc[3, "time"] = pd.NaT
+        compact_route = workout_record_handler.format_route_into_compact_encoding(df)
+
+        kept = df.drop(index=[1, 3])
+        self.assertEqual(compact_route["pointCount"], 3)
+        latitudes, longitudes = encoding_utils.decode_polyline(compact_route["path"])
+        np.testing.assert_allclose(latitudes, kept["lat"])
+        np.testing.assert_allclose(longitudes, kept["lon"])
+        self.assertEqual(encoding_utils.decode_varint_deltas(compact_route["time"]).tolist(),
+                         [1724245200000 + minute * 60000 for minute in (0, 2, 4)])
+        self.assertEqual(len(encoding_utils.decode_varint_deltas(compact_route["speed"]["data"])), 3)
+
+    def test_route_metrics_and_splits_are_served_with_the_route(self):
+        route = workout_record_handler.load_workout_record_gpx_data(
+            "/workout-routes/route_2024-08-21_9.00am.gpx")
+        compact_route = workout_record_handler.load_workout_record_gpx_data(
+            "/workout-routes/route_2024-08-21_9.00am.gpx", route_encoding="compact")
+
+        np.testing.assert_allclose(np.diff(route["distance"]), 11.12, atol=0.01)
+        np.testing.assert_allclose(route["pace"], 60 / 11.12 * 1000, rtol=1e-3)
+        np.testing.assert_allclose(route["grade"], 100 / 11.12, rtol=1e-3)
+        self.assertEqual([split["split"] for split in route["splits"]["km"]], [1])
+        self.assertAlmostEqual(route["splits"]["km"][0]["distance"], route["distance"][-1])
+        self.assertAlmostEqual(route["splits"]["mi"][0]["duration"], 240.0)
+        self.assertEqual(compact_route["splits"], route["splits"])
+        np.testing.assert_allclose(encoding_utils.decode_varint_deltas(compact_route["distance"]["data"]) /
+                                   compact_route["distance"]["scale"], route["distance"], atol=0.01)
+
+    def test_missing_route_is_encoded_empty(self):
+        compact_route = workout_record_handler.load_workout_record_gpx_data(
+            "/workout-routes/missing.gpx", route_encoding="compact")
+
+        self.assertEqual(compact_route["pointCount"], 0)
+        self.assertEqual(compact_route["path"], "")
+        self.assertEqual(compact_route["splits"], {"km": [], "mi": []})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,11 @@
 import unittest
 from unittest.mock import MagicMock
 import xml.etree.ElementTree as ET
-from parsers.workout_record_parser import WorkoutRouteParser, WorkoutRecordParser
+import io
+import numpy as np
+import pandas as pd
+from parsers.workout_record_parser import WorkoutRouteParser, WorkoutRecordParser, StreamingWorkoutRouteParser
+from export_test_utils import GPX_TEMPLATE, route_points
 import config
 
 
@@ -71,6 +75,33 @@ class TestWorkoutRouteParser(unittest.TestCase):
         result = self.parser._to_csv_row_structure(self.track_point_mock)
         self.assertEqual(len(result), len(self.parser.WORKOUT_ROUTE_COLUMNS))
 
+class TestStreamingWorkoutRouteParser(unittest.TestCase):
+
+    def _parse(self, points: str, initial_capacity: int = None) -> pd.DataFrame:
+        gpx = GPX_TEMPLATE.format(points=points).encode()
+        return StreamingWorkoutRouteParser(io.BytesIO(gpx), initial_capacity).to_dataframe()
+
+    def test_track_points_are_parsed_into_typed_columns(self):
+        df = self._parse(route_points(5), initial_capacity=2)
+
+        self.assertEqual(df.columns.tolist(), WorkoutRouteParser.WORKOUT_ROUTE_COLUMNS)
+        self.assertEqual(str(df["time"].dtype), "datetime64[ns, UTC]")
+        self.assertTrue(all(str(df[column].dtype) == "float64"
+                            for column in StreamingWorkoutRouteParser.NUMERIC_COLUMNS))
+        np.testing.assert_allclose(df["lat"], [40.7484 + index * 0.0001 for index in range(5)])
+        self.assertEqual(df["elevation"].tolist(), [10.0, 11.0, 12.0, 13.0, 14.0])
+        self.assertEqual(df["time"].iloc[-1], pd.Timestamp("2024-08-21T13:04:00Z"))
+        self.assertEqual(df[["speed", "course", "hAcc", "vAcc"]].iloc[0].tolist(), [3.1, 0.5, 2.0, 1.5])
+
+    def test_missing_values_become_nan(self):
+        df = self._parse('   <trkpt lon="-73.9857" lat="40.7484"><ele>10</ele></trkpt>')
+
+        self.assertEqual(len(df), 1)
+        self.assertEqual(df["elevation"].tolist(), [10.0])
+        self.assertTrue(df[["speed", "course", "hAcc", "vAcc"]].isna().all(axis=None))
+        self.assertTrue(df["time"].isna().all())
+
+
 class TestWorkoutRecordParser(unittest.TestCase):
 
     def setUp(self):
@@ -144,5 +175,57 @@ class TestWorkoutRecordParser(unittest.TestCase):
         self.assertEqual(len(result), len(WorkoutRecordParser.MASTER_WORKOUT_COLUMNS))
 
 
+class TestWorkoutRecordParserRegistries(unittest.TestCase):
+
+    def setUp(self):
+        self.workout = ET.fromstring("""<Workout workoutActivityType="HKWorkoutActivityTypeCycling" duration="60" durationUnit="min" sourceName="Apple Watch" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 10:00:00 -0400">
+  <MetadataEntry key="HKIndoorWorkout" value="1"/>
+  <MetadataEntry key="HKTimeZone" value="America/New_York"/>
+  <MetadataEntry key="HKSwimmingLocationType" value="2"/>
+  <MetadataEntry key="HKUnknownMetadataKey" value="ignored"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierHeartRate" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 10:00:00 -0400" average="140" minimum="90" maximum="170" unit="count/min"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierDistanceCycling" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 10:00:00 -0400" sum="30.5" unit="km"/>
+  <WorkoutStatistics type="HKQuantityTypeIdentifierCyclingPower" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 10:00:00 -0400" average="210" minimum="0" maximum="650" unit="W"/>
+ </Workout>""")
+        self.parser = WorkoutRecordParser(self.workout)
+
+    def test_registered_statistics_fill_their_columns(self):
+        statistics = dict(zip(WorkoutRecordParser.WORKOUT_STATISTICS_COLUMNS,
+                              self.parser._get_workout_statistics(self.parser.workout_statistics)))
+        self.assertEqual(statistics["averageHeartRate"], 140.0)
+        self.assertEqual(statistics["minimumHeartRate"], 90.0)
+        self.assertEqual(statistics["maximumHeartRate"], 170.0)
+        self.assertEqual(statistics["heartRateUnit"], "count/min")
+        self.assertEqual(statistics["distanceCycling"], 30.5)
+        self.assertEqual(statistics["stepCount"], "")
+
+    def test_statistics_without_unit_keep_a_missing_unit(self):
+        workout = ET.fromstring("""<Workout workoutActivityType="HKWorkoutActivityTypeRunning" duration="30" durationUnit="min" sourceName="Apple Watch" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 09:30:00 -0400">
+  <WorkoutStatistics type="HKQuantityTypeIdentifierStepCount" startDate="2024-08-21 09:00:00 -0400" endDate="2024-08-21 09:30:00 -0400" sum="4200"/>
+ </Workout>""")
+        parser = WorkoutRecordParser(workout)
+        statistics = dict(zip(WorkoutRecordParser.WORKOUT_STATISTICS_COLUMNS,
+                              parser._get_workout_statistics(parser.workout_statistics)))
+
+        self.assertEqual(statistics["stepCount"], 4200.0)
+        self.assertIsNone(statistics["stepCountUnit"])
+
+    def test_registered_metadata_fill_their_columns(self):
+        metadata = dict(zip(WorkoutRecordParser.WORKOUT_METADATA_COLUMNS,
+                            self.parser._get_workout_metadata(self.parser.metadata_entries)))
+        self.assertEqual(metadata["indoorWorkout"], "Indoor")
+        self.assertEqual(metadata["timeZone"], "America/New_York")
+        self.assertEqual(metadata["swimmingLocationType"], "OPEN WATER")
+        self.assertEqual(metadata["temperature"], "")
+
+    def test_statistics_rows_keep_unregistered_statistics(self):
+        rows = self.parser.statistics_rows()
+        self.assertEqual([row[0] for row in rows], ["HeartRate", "DistanceCycling", "CyclingPower"])
+        self.assertEqual(rows[2], ("CyclingPower", "2024-08-21 09:00:00 -0400", "2024-08-21 10:00:00 -0400",
+                                   "210", "0", "650", None, "W"))
+        for row in rows:
+            self.assertEqual(len(row), len(WorkoutRecordParser.WORKOUT_STATISTICS_LONG_COLUMNS))
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,31 @@
+import unittest
+import numpy as np
+import pandas as pd
+from utils import workout_sample_utils as workout_sample_utils
+
+
+class TestWorkoutSampleUtils(unittest.TestCase):
+
+    def test_join_finds_the_rows_starting_within_every_workout(self):
+        sample_start_times = np.array([0, 10, 20, 30, 40, 50])
+        start_offsets, stop_offsets = workout_sample_utils.join_workout_samples(
+            np.array([10, 25, 60]), np.array([30, 29, 70]), sample_start_times)
+
+        self.assertEqual(start_offsets.tolist(), [1, 3, 6])
+        self.assertEqual(stop_offsets.tolist(), [4, 3, 6])
+
+    def test_sample_ranges_are_keyed_by_workout_id(self):
+        offsets = pd.DataFrame({
+            "workoutId": [0, 1, 0],
+            "type": ["HeartRate", "HeartRate", "RunningPower"],
+            "startOffset": [0, 4, 2],
+            "stopOffset": [4, 9, 3],
+        })
+
+        self.assertEqual(workout_sample_utils.get_workout_sample_ranges(offsets, "HeartRate"),
+                         {0: slice(0, 4), 1: slice(4, 9)})
+        self.assertEqual(workout_sample_utils.get_workout_sample_ranges(offsets, "RunningSpeed"), {})
+
+
+if __name__ == '__main__':
+    unittest.main()
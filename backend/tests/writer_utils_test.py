@@ -0,0 +1,146 @@
+import unittest
+import os
+import tempfile
+import numpy as np
+import pandas as pd
+from unittest.mock import patch
+import config
+from utils import storage_utils as storage_utils
+from utils import writer_utils as writer_utils
+from utils.writer_utils import ChunkedRecordWriter
+
+
+class TestChunkedRecordWriter(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.output_path = os.path.join(self.temp_directory.name, "HeartRate.csv")
+        self.columns = ["type", "value", "startDate"]
+        self.rows = [("HeartRate", str(60 + index), f"2024-08-21 09:{index:02d}:00 -0400")
+                     for index in range(25)]
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def test_flushes_once_row_threshold_is_reached(self):
+        writer = ChunkedRecordWriter(self.output_path, self.columns, max_buffered_rows=10)
+        for row in self.rows:
+            writer.append(row)
+            self.assertLess(len(writer.buffered_rows), 10)
+        self.assertEqual(writer.chunks_written, 2)
+
+        writer.close()
+        self.assertEqual(writer.chunks_written, 3)
+        self.assertEqual(writer.rows_written, len(self.rows))
+
+    def test_flushes_once_byte_threshold_is_reached(self):
+        writer = ChunkedRecordWriter(self.output_path, self.columns,
+                                     max_buffered_rows=1000, max_buffered_bytes=100)
+        for row in self.rows:
+            writer.append(row)
+            self.assertLess(writer.buffered_bytes, 100)
+        writer.close()
+
+        self.assertGreater(writer.chunks_written, 1)
+
+    def test_written_file_matches_rows_in_order(self):
+        writer = ChunkedRecordWriter(self.output_path, self.columns, max_buffered_rows=7)
+        for row in self.rows:
+            writer.append(row)
+        writer.close()
+
+        df = pd.read_csv(self.output_path, dtype=str)
+        self.assertListEqual(list(df.columns), self.columns)
+        self.assertListEqual(list(df.itertuples(index=False, name=None)), self.rows)
+
+    def test_output_file_is_only_replaced_on_close(self):
+        pd.DataFrame([("HeartRate", "1", "old")], columns=self.columns).to_csv(
+            self.output_path, index=False)
+
+        writer = ChunkedRecordWriter(self.output_path, self.columns, max_buffered_rows=5)
+        for row in self.rows:
+            writer.append(row)
+        self.assertEqual(len(pd.read_csv(self.output_path)), 1)
+
+        writer.close()
+        self.assertEqual(len(pd.read_csv(self.output_path)), len(self.rows))
+        self.assertFalse(os.path.exists(writer.partial_output_path))
+
+    def test_out_of_order_rows_are_sorted_on_close(self):
+        dtypes = {"type": "string", "value": "float32",
+                  "startDate": "datetime64[ns, UTC]", "startDateTzOffset": "int32"}
+        rows = self.rows[10:] + self.rows[:10]
+        writer = ChunkedRecordWriter(self.output_path, self.columns, max_buffered_rows=7,
+                                     dtypes=dtypes, sort_column="startDate")
+        for row in rows:
+            writer.append(row)
+        self.assertFalse(writer.is_sorted)
+        writer.close()
+
+        df = storage_utils.read_dataframe(self.output_path, dtype=dtypes)
+        self.assertTrue(df["startDate"].is_monotonic_increasing)
+        self.assertEqual(df["value"].tolist(), [60 + index for index in range(25)])
+
+    def test_sorted_runs_are_merged_like_a_stable_sort(self):
+        dtypes = {"type": "string", "value": "float32",
+                  "startDate": "datetime64[ns, UTC]", "startDateTzOffset": "int32"}
+        random = np.random.default_rng(3)
+        minutes = random.integers(0, 200, size=1000)
+        rows = [("HeartRate", str(index), f"2024-08-21 {9 + minute // 60:02d}:{minute % 60:02d}:00 -0400")
+                for index, minute in enumerate(minutes)]
+        expected = [float(index) for index in np.argsort(minutes, kind="stable")]
+
+        for storage_format in storage_utils.STORAGE_FORMAT_EXTENSIONS:
+            with self.subTest(storage_format=storage_format), \
+                    patch.object(config, "RECORD_WRITER_MERGE_FAN_IN", 3):
+                output_path = storage_utils.storage_file_path(self.output_path, storage_format)
+                writer = ChunkedRecordWriter(output_path, self.columns, max_buffered_rows=40,
+                                             dtypes=dtypes, sort_column="startDate")
+                for row in rows:
+                    writer.append(row)
+                # More runs than the fan-in are merged in several passes
+                self.assertGreater(len(writer.run_paths), config.RECORD_WRITER_MERGE_FAN_IN ** 2)
+                writer.close()
+
+                self.assertEqual(storage_utils.read_dataframe(output_path, dtype=dtypes)["value"].tolist(), expected)
+                self.assertFalse([file_name for file_name in os.listdir(self.temp_directory.name)
+                                  if ".partial" in file_name])
+
+    def test_appended_sorted_runs_are_merged_in_append_order(self):
+        dtypes = {"type": "string", "value": "float32",
+                  "startDate": "datetime64[ns, UTC]", "startDateTzOffset": "int32"}
+        run_path = os.path.join(self.temp_directory.name, "HeartRate.run.feather")
+        run_writer = ChunkedRecordWriter(run_path, self.columns, max_buffered_rows=7, dtypes=dtypes,
+                                         sort_column="startDate", max_batch_rows=writer_utils.run_batch_rows(7))
+        for row in reversed(self.rows[5:15]):
+            run_writer.append(row)
+        run_writer.close()
+
+        writer = ChunkedRecordWriter(self.output_path, self.columns, max_buffered_rows=7,
+                                     dtypes=dtypes, sort_column="startDate")
+        for row in self.rows[10:20]:
+            writer.append(row)
+        writer.append_sorted_run(run_path, run_writer.rows_written)
+        for row in self.rows[:10]:
+            writer.append(row)
+        writer.close()
+
+        self.assertFalse(os.path.exists(run_path))
+        self.assertEqual(writer.rows_written, 30)
+        # Equal rows keep the order they were appended or moved in
+        self.assertEqual(storage_utils.read_dataframe(self.output_path, dtype=dtypes)["value"].tolist(),
+                         [60 + index for index in [0, 1, 2, 3, 4, 5, 5, 6, 6, 7, 7, 8, 8, 9, 9, 10, 10, 11, 11,
+                                                   12, 12, 13, 13, 14, 14, 15, 16, 17, 18, 19]])
+
+    def test_rows_in_order_are_not_rewritten(self):
+        writer = ChunkedRecordWriter(self.output_path, self.columns, max_buffered_rows=7,
+                                     sort_column="startDate")
+        for row in self.rows:
+            writer.append(row)
+        writer.close()
+
+        self.assertTrue(writer.is_sorted)
+
+
+if __name__ == '__main__':
+    unittest.main()
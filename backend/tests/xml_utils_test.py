@@ -0,0 +1,126 @@
+import unittest
+import io
+import os
+import tempfile
+from unittest.mock import patch
+import config
+from utils import xml_utils as xml_utils
+from parsers.apple_health_export_parser import AppleHealthExportParser
+from parsers.export_element_handlers import ExportElementHandler
+from export_test_utils import (EXPORT_HEADER, EXPORT_FOOTER, heart_rate_record, blood_pressure_correlation,
+                               quantity_record, running_workout, write_health_export_zip,
+                               patched_export_directories, read_export_outputs)
+
+
+class RecordingAttributeHandler(ExportElementHandler):
+    TAG = "Record"
+    ATTRIBUTES_ONLY = True
+
+    def __init__(self):
+        self.handled = []
+
+    def handle(self, element):
+        self.handled.append((dict(element.attrib), {
+            entry.get("key"): entry.get("value") for entry in element.findall("MetadataEntry")}))
+
+    def handle_attributes(self, attributes, metadata):
+        self.handled.append((dict(attributes), dict(metadata)))
+
+
+class RecordingElementHandler(ExportElementHandler):
+
+    def __init__(self, tag):
+        self.TAG = tag
+        self.handled = []
+
+    def handle(self, element):
+        self.handled.append((element.tag, dict(element.attrib),
+                             [(child.tag, dict(child.attrib)) for child in element.iter()]))
+
+
+class TestIterparseElements(unittest.TestCase):
+
+    def setUp(self):
+        self.document = (EXPORT_HEADER + heart_rate_record(0, 60) +
+                         blood_pressure_correlation() + heart_rate_record(1, 61) + EXPORT_FOOTER).encode()
+
+    def _parse(self, prune_processed_elements):
+        parsed = []
+        for elem in xml_utils.iterparse_elements(io.BytesIO(self.document), {"Record"},
+                                                 prune_processed_elements):
+            parsed.append((elem.get("type"), elem.get("value"),
+                           [entry.get("key") for entry in elem.findall("MetadataEntry")]))
+        return parsed
+
+    def test_yields_matching_elements_in_document_order(self):
+        expected = [
+            ("HKQuantityTypeIdentifierHeartRate", "60", ["HKMetadataKeyHeartRateMotionContext"]),
+            ("HKQuantityTypeIdentifierBloodPressureSystolic", "120", []),
+            ("HKQuantityTypeIdentifierBloodPressureDiastolic", "80", []),
+            ("HKQuantityTypeIdentifierHeartRate", "61", ["HKMetadataKeyHeartRateMotionContext"]),
+        ]
+        self.assertEqual(self._parse(True), expected)
+        self.assertEqual(self._parse(False), expected)
+
+
+class TestXmlBackends(unittest.TestCase):
+
+    def setUp(self):
+        self.document = (EXPORT_HEADER + heart_rate_record(0, 60) + blood_pressure_correlation() +
+                         running_workout() + quantity_record("StepCount", 1, 10) + EXPORT_FOOTER).encode()
+
+    def _dispatch(self, backend_name):
+        element_handlers = {
+            "Record": RecordingAttributeHandler(),
+            "Workout": RecordingElementHandler("Workout"),
+            "Correlation": RecordingElementHandler("Correlation"),
+        }
+        xml_utils.get_xml_backend(backend_name).parse(
+            io.BytesIO(self.document), element_handlers)
+        return {tag: handler.handled for tag, handler in element_handlers.items()}
+
+    def test_expat_backend_dispatches_the_same_content_as_elementtree(self):
+        reference = self._dispatch("elementtree")
+        expat = self._dispatch("expat")
+
+        self.assertEqual(len(expat["Record"]), 4)
+        self.assertEqual(expat["Record"][0][1], {"HKMetadataKeyHeartRateMotionContext": "2"})
+        self.assertEqual(expat["Record"], reference["Record"])
+        self.assertEqual(expat["Workout"], reference["Workout"])
+        self.assertEqual(expat["Correlation"][0][:2], reference["Correlation"][0][:2])
+
+    def test_unknown_backend_is_rejected(self):
+        with self.assertRaises(ValueError):
+            xml_utils.get_xml_backend("lxml")
+
+
+class TestXmlBackendParity(unittest.TestCase):
+    """Checks every backend writes exactly the files the reference ElementTree backend writes."""
+
+    def setUp(self):
+        self.temp_directory = tempfile.TemporaryDirectory()
+        self.export_path = write_health_export_zip(
+            os.path.join(self.temp_directory.name, "export.zip"))
+
+    def tearDown(self):
+        self.temp_directory.cleanup()
+
+    def _parse_outputs(self, backend_name):
+        data_directory = os.path.join(self.temp_directory.name, backend_name)
+        with patched_export_directories(data_directory), \
+                patch.object(config, "XML_PARSER_BACKEND", backend_name):
+            AppleHealthExportParser(self.export_path)._parse_export_elements()
+
+        return read_export_outputs(data_directory)
+
+    def test_backends_write_identical_outputs(self):
+        reference = self._parse_outputs(xml_utils.ElementTreeBackend.NAME)
+        self.assertEqual(len(reference), 11)
+
+        for backend_name in xml_utils.XML_BACKENDS:
+            with self.subTest(backend=backend_name):
+                self.assertEqual(self._parse_outputs(backend_name), reference)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,101 @@
+"""
+Caches DataFrames loaded from the ingested export data for the lifetime of the process.
+
+Every entry is keyed by the file path and the loaded columns and remembers the file's
+modification time and size when it was loaded, so a re-ingested file is loaded again
+instead of being served stale. Entries are evicted least recently used first once the
+total in-memory size of the cached DataFrames exceeds the memory budget.
+
+Cached DataFrames are shared between callers and must not be modified in place,
+callers that need to change a loaded DataFrame must work on a copy.
+
+Usage example:
+    df = DATAFRAME_CACHE.get_or_load(path, lambda: storage_utils.read_dataframe(path), columns)
+"""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Callable
+import pandas as pd
+import config
+
+
+class DataFrameCache:
+
+    def __init__(self, max_bytes: int = None):
+        """Initializes an empty cache.
+
+        Args:
+            max_bytes: Memory budget of the cached DataFrames in bytes,
+                defaults to `config.DATAFRAME_CACHE_MAX_BYTES`.
+        """
+        self.max_bytes = config.DATAFRAME_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+        self.entries = OrderedDict()
+        self.cached_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+
+    def get_or_load(self, file_path: str, loader: Callable[[], pd.DataFrame], columns: list = None) -> pd.DataFrame:
+        """Returns the cached DataFrame of a file, loading it with `loader` when missing or stale.
+
+        Args:
+            file_path: The path of the file the DataFrame is loaded from.
+            loader: Loads the DataFrame from `file_path`.
+            columns: The columns `loader` loads, part of the cache key.
+        """
+        key = (file_path, tuple(columns) if columns is not None else None)
+        file_stat = os.stat(file_path)
+        signature = (file_stat.st_mtime_ns, file_stat.st_size)
+
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[0] == signature:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+
+        df = loader()
+        size = int(df.memory_usage(index=True, deep=True).sum())
+
+        with self.lock:
+            self._remove(key)
+            if size <= self.max_bytes:
+                self.entries[key] = (signature, df, size)
+                self.cached_bytes += size
+                while self.cached_bytes > self.max_bytes:
+                    self._remove(next(iter(self.entries)))
+                    self.evictions += 1
+        return df
+
+    def _remove(self, key: tuple) -> None:
+        entry = self.entries.pop(key, None)
+        if entry is not None:
+            self.cached_bytes -= entry[2]
+
+    def get_stats(self) -> dict:
+        """Returns the hit, miss and eviction counters and the current size of the cache."""
+        with self.lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "entries": len(self.entries),
+                "cachedBytes": self.cached_bytes,
+                "maxBytes": self.max_bytes,
+            }
+
+    def clear(self) -> None:
+        """Empties the cache and resets its counters."""
+        with self.lock:
+            self.entries.clear()
+            self.cached_bytes = 0
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+
+
+DATAFRAME_CACHE = DataFrameCache()
@@ -0,0 +1,100 @@
+"""
+Converts Apple Health export dates to and from UTC timestamps with a separate UTC offset.
+
+Export dates are written as `YYYY-MM-DD HH:MM:SS ±zzzz` strings. At ingest they are stored
+as UTC timestamps, epoch nanoseconds on disk, alongside the offset of the original string
+in seconds, so readers get datetime columns without parsing any strings and responses can
+still show every date in the offset it was recorded in.
+
+Usage example:
+    timestamps, offsets = parse_export_dates(df["startDate"])
+    df["startDate"] = format_export_dates(timestamps, offsets)
+"""
+
+from typing import Tuple
+import numpy as np
+import pandas as pd
+
+EXPORT_DATE_FORMAT = "%Y-%m-%d %H:%M:%S %z"
+UTC_DATETIME_DTYPE = "datetime64[ns, UTC]"
+TZ_OFFSET_DTYPE = "int32"
+TZ_OFFSET_SUFFIX = "TzOffset"
+
+# Epoch nanoseconds missing dates are stored and sorted as, so they come after every date
+MISSING_DATE_EPOCH_NS = np.iinfo(np.int64).max
+
+_LOCAL_DATETIME_LENGTH = len("YYYY-MM-DD HH:MM:SS")
+
+
+def tz_offset_column(date_column: str) -> str:
+    """Returns the name of the column holding the UTC offsets of a date column."""
+    return f"{date_column}{TZ_OFFSET_SUFFIX}"
+
+
+def parse_export_dates(dates: pd.Series) -> Tuple[pd.Series, pd.Series]:
+    """Parses export date strings into UTC timestamps and UTC offsets in seconds.
+
+    The local time and the offset are sliced out of the fixed-width strings and parsed
+    column-wise, instead of parsing every string with its own offset.
+
+    Args:
+        dates: Export date strings, missing values are returned as NaT with an offset of 0.
+
+    Returns:
+        A tuple of the UTC timestamps and the offsets of the original strings in seconds.
+    """
+    dates = dates.astype("string")
+    local_datetimes = pd.to_datetime(
+        dates.str.slice(0, _LOCAL_DATETIME_LENGTH), format="%Y-%m-%d %H:%M:%S")
+
+    offsets = dates.str.slice(_LOCAL_DATETIME_LENGTH + 1)
+    sign = np.where(offsets.str.startswith("-").fillna(False).astype(bool), -1, 1)
+    offset_seconds = (sign * (
+        pd.to_numeric(offsets.str.slice(1, 3), errors="coerce") * 3600 +
+        pd.to_numeric(offsets.str.slice(3, 5), errors="coerce") * 60
+    )).fillna(0).astype(TZ_OFFSET_DTYPE)
+
+    timestamps = (local_datetimes - pd.to_timedelta(offset_seconds, unit="s")).dt.tz_localize("UTC")
+    return timestamps.astype(UTC_DATETIME_DTYPE), offset_seconds
+
+
+def epoch_nanoseconds(timestamps: pd.Series) -> np.ndarray:
+    """Returns datetimes as epoch nanoseconds, missing dates as `MISSING_DATE_EPOCH_NS`."""
+    return np.where(timestamps.isna().to_numpy(), MISSING_DATE_EPOCH_NS,
+                    timestamps.dt.as_unit("ns").array.asi8)
+
+
+def local_datetimes(timestamps: pd.Series, offsets: pd.Series) -> pd.Series:
+    """Returns the naive local date times of UTC timestamps shifted by their offsets in seconds."""
+    return timestamps.dt.tz_localize(None) + pd.to_timedelta(offsets, unit="s")
+
+
+def _format_offset(offset: int) -> str:
+    hours, minutes = divmod(abs(offset) // 60, 60)
+    return f"{'-' if offset < 0 else '+'}{hours:02d}{minutes:02d}"
+
+
+def format_export_dates(timestamps: pd.Series, offsets: pd.Series) -> pd.Series:
+    """Formats UTC timestamps back into export date strings in their original offsets.
+
+    The local times are formatted as whole NumPy arrays and every distinct offset is
+    formatted once, so no date is formatted on its own.
+
+    Args:
+        timestamps: The UTC timestamps.
+        offsets: The offsets of the original strings in seconds.
+
+    Returns:
+        The strings formatted as `EXPORT_DATE_FORMAT`, missing timestamps become NaN.
+    """
+    if timestamps.empty:
+        return pd.Series([], index=timestamps.index, dtype=object)
+
+    offsets = offsets.to_numpy(dtype="int64")
+    local_times = timestamps.dt.tz_localize(None).to_numpy(dtype="datetime64[s]") + offsets.astype("timedelta64[s]")
+
+    distinct_offsets, offset_indexes = np.unique(offsets, return_inverse=True)
+    offset_strings = np.array([f" {_format_offset(offset)}" for offset in distinct_offsets.tolist()], dtype=str)
+    formatted = np.char.add(np.char.replace(np.datetime_as_string(local_times), "T", " "),
+                            offset_strings[offset_indexes])
+    return pd.Series(formatted, index=timestamps.index).where(timestamps.notna())
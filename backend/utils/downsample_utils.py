@@ -0,0 +1,66 @@
+"""
+Downsamples chart series to the number of points a chart can draw.
+
+Series are reduced with Largest-Triangle-Three-Buckets: the first and last points are
+kept and every bucket in between keeps the point forming the largest triangle with the
+point kept from the previous bucket and the average of the next bucket, so peaks and
+troughs survive the reduction. The bucket averages are computed for all buckets at once
+and the areas of every bucket's points as one array operation.
+
+Usage example:
+    indexes = lttb_indexes(times, values, max_points=1000)
+    df = df.iloc[indexes]
+"""
+
+import numpy as np
+
+MIN_POINTS = 3
+
+
+def lttb_indexes(x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Selects the points of a series kept by Largest-Triangle-Three-Buckets.
+
+    Args:
+        x: The sorted x coordinates of the series, such as epoch timestamps.
+        y: The values of the series.
+        max_points: The number of points to keep, at least `MIN_POINTS`.
+
+    Returns:
+        The sorted indexes of the kept points, every index when the series is not longer than `max_points`.
+
+    Raises:
+        ValueError: If `max_points` is less than `MIN_POINTS`.
+    """
+    if max_points < MIN_POINTS:
+        raise ValueError(f"max_points must be at least {MIN_POINTS}, got {max_points}.")
+
+    point_count = len(x)
+    if point_count <= max_points:
+        return np.arange(point_count)
+
+    x = np.asarray(x, dtype=np.float64) - float(x[0])
+    y = np.asarray(y, dtype=np.float64)
+
+    # Every point but the first and last falls into one of max_points - 2 buckets
+    bucket_edges = np.linspace(1, point_count - 1, max_points - 1).astype(np.int64)
+    bucket_sizes = np.diff(bucket_edges)
+    x_sums = np.concatenate(([0.0], np.cumsum(x)))
+    y_sums = np.concatenate(([0.0], np.cumsum(y)))
+    bucket_x_averages = (x_sums[bucket_edges[1:]] - x_sums[bucket_edges[:-1]]) / bucket_sizes
+    bucket_y_averages = (y_sums[bucket_edges[1:]] - y_sums[bucket_edges[:-1]]) / bucket_sizes
+    next_x_averages = np.append(bucket_x_averages[1:], x[-1])
+    next_y_averages = np.append(bucket_y_averages[1:], y[-1])
+
+    indexes = np.empty(max_points, dtype=np.int64)
+    indexes[0] = 0
+    indexes[-1] = point_count - 1
+    selected = 0
+    for bucket in range(max_points - 2):
+        start, stop = bucket_edges[bucket], bucket_edges[bucket + 1]
+        areas = np.abs(
+            (x[selected] - next_x_averages[bucket]) * (y[start:stop] - y[selected]) -
+            (x[selected] - x[start:stop]) * (next_y_averages[bucket] - y[selected])
+        )
+        selected = start + int(np.argmax(areas))
+        indexes[bucket + 1] = selected
+    return indexes
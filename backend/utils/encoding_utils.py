@@ -0,0 +1,142 @@
+"""
+Encodes numeric arrays into compact strings for JSON responses.
+
+Coordinates are encoded as a Google encoded polyline and integer series such as timestamps
+as base64 zigzag varints of the differences between consecutive values. Other values are
+rounded to a number of decimals and encoded the same way as integers, or as base64
+little-endian float32 arrays when they have missing values. Every encoder works on whole
+arrays: values are split into their 5 or 7 bit groups as one 2D array, so no value is
+encoded on its own.
+
+Usage example:
+    path = encode_polyline(latitudes, longitudes)
+    times = encode_varint_deltas(epoch_milliseconds)
+    speeds = encode_quantized(speeds, decimals=2)
+"""
+
+import base64
+from typing import Tuple
+import numpy as np
+
+
+def _split_into_groups(values: np.ndarray, bits: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Splits unsigned integers into their `bits` wide groups, least significant first.
+
+    Returns:
+        The groups of every value as rows of a 2D array and a mask of the groups every value needs.
+    """
+    values = values.astype(np.uint64)
+    group_count = max(1, -(-int(values.max(initial=0)).bit_length() // bits))
+    shifts = np.arange(group_count, dtype=np.uint64) * np.uint64(bits)
+    groups = (values[:, None] >> shifts) & np.uint64((1 << bits) - 1)
+
+    needed_groups = np.ones(len(values), dtype=np.int64)
+    remaining = values >> np.uint64(bits)
+    while remaining.any():
+        needed_groups += remaining > 0
+        remaining >>= np.uint64(bits)
+    return groups, np.arange(group_count) < needed_groups[:, None]
+
+
+def _zigzag(values: np.ndarray) -> np.ndarray:
+    values = values.astype(np.int64)
+    return ((values << 1) ^ (values >> 63)).view(np.uint64)
+
+
+def encode_polyline(latitudes: np.ndarray, longitudes: np.ndarray, precision: int = 5) -> str:
+    """Encodes coordinates in degrees as a Google encoded polyline.
+
+    Args:
+        latitudes: The latitudes of the points.
+        longitudes: The longitudes of the points.
+        precision: The number of decimals the coordinates are rounded to.
+
+    Raises:
+        ValueError: If a coordinate is missing or not finite, as a polyline has no way to encode it.
+    """
+    coordinates = np.column_stack((latitudes, longitudes)).astype(np.float64)
+    if not np.isfinite(coordinates).all():
+        raise ValueError("Polyline coordinates must be finite, drop the points without coordinates first")
+    coordinates = np.round(coordinates * 10 ** precision).astype(np.int64)
+    deltas = np.diff(coordinates, axis=0, prepend=np.zeros((1, 2), dtype=np.int64)).ravel()
+    if len(deltas) == 0:
+        return ""
+
+    shifted = deltas << 1
+    groups, mask = _split_into_groups(np.where(deltas < 0, ~shifted, shifted), 5)
+    continued = np.roll(mask, -1, axis=1)
+    continued[:, -1] = False
+    characters = (groups | (continued * np.uint64(0x20))) + np.uint64(63)
+    return characters[mask].astype(np.uint8).tobytes().decode("ascii")
+
+
+def decode_polyline(polyline: str, precision: int = 5) -> Tuple[np.ndarray, np.ndarray]:
+    """Decodes a Google encoded polyline into latitudes and longitudes in degrees."""
+    values = []
+    value = shift = 0
+    for character in polyline.encode("ascii"):
+        group = character - 63
+        value |= (group & 0x1F) << shift
+        shift += 5
+        if group < 0x20:
+            values.append(~(value >> 1) if value & 1 else value >> 1)
+            value = shift = 0
+
+    coordinates = np.cumsum(np.array(values, dtype=np.int64).reshape(-1, 2), axis=0) / 10 ** precision
+    return coordinates[:, 0], coordinates[:, 1]
+
+
+def encode_varint_deltas(values: np.ndarray) -> str:
+    """Encodes integers as base64 zigzag varints of the differences between consecutive values."""
+    deltas = np.diff(np.asarray(values, dtype=np.int64), prepend=np.int64(0))
+    if len(deltas) == 0:
+        return ""
+
+    groups, mask = _split_into_groups(_zigzag(deltas), 7)
+    continued = np.roll(mask, -1, axis=1)
+    continued[:, -1] = False
+    encoded = (groups | (continued * np.uint64(0x80)))[mask].astype(np.uint8)
+    return base64.b64encode(encoded.tobytes()).decode("ascii")
+
+
+def decode_varint_deltas(encoded: str) -> np.ndarray:
+    """Decodes integers encoded with `encode_varint_deltas`."""
+    deltas = []
+    value = shift = 0
+    for byte in base64.b64decode(encoded):
+        value |= (byte & 0x7F) << shift
+        shift += 7
+        if byte < 0x80:
+            deltas.append((value >> 1) ^ -(value & 1))
+            value = shift = 0
+    return np.cumsum(np.array(deltas, dtype=np.int64))
+
+
+def encode_float32(values: np.ndarray) -> str:
+    """Encodes numbers as a base64 little-endian float32 array, missing values become NaN."""
+    return base64.b64encode(np.asarray(values, dtype="<f4").tobytes()).decode("ascii")
+
+
+def decode_float32(encoded: str) -> np.ndarray:
+    return np.frombuffer(base64.b64decode(encoded), dtype="<f4")
+
+
+def encode_quantized(values: np.ndarray, decimals: int) -> dict:
+    """Encodes numbers rounded to `decimals` as varint deltas of their scaled integers.
+
+    Arrays with missing values are encoded with `encode_float32` instead.
+
+    Returns:
+        A dict of the 'encoding' used, either 'deltaVarint' or 'float32', and the encoded
+        'data'. 'deltaVarint' values are decoded by dividing them by 'scale'.
+    """
+    values = np.asarray(values, dtype=np.float64)
+    if np.isnan(values).any():
+        return {"encoding": "float32", "data": encode_float32(values)}
+
+    scale = 10 ** decimals
+    return {
+        "encoding": "deltaVarint",
+        "scale": scale,
+        "data": encode_varint_deltas(np.round(values * scale).astype(np.int64)),
+    }
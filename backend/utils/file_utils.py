@@ -1,5 +1,6 @@
 import os 
 import config
+from utils import storage_utils as storage_utils
 
 def file_exists(file_path) -> bool:
     """Checks whether a file exists at the specified path.
@@ -41,6 +42,8 @@ def match_record_type_to_directory(record_name: str) -> str:
     print(f"{record_name} does not belong to a group!")
     return config.HEALTH_ELEMENTS_DIRECTORY
 
+def format_record_type_into_path(record_name: str) -> str:
+    return storage_utils.storage_file_path(os.path.join(match_record_type_to_directory(record_name), record_name))
+
 def format_workout_reference_into_path(gpx_path: str) -> str:
-    gpx_path = gpx_path.replace("gpx", "csv")
-    return config.WORKOUT_ELEMENTS_DIRECTORY + gpx_path
\ No newline at end of file
+    return storage_utils.storage_file_path(config.WORKOUT_ELEMENTS_DIRECTORY + gpx_path)
\ No newline at end of file
@@ -1,12 +1,21 @@
 import re
+from functools import lru_cache
+import config
 from config import AppleHealthPrefix
 
+DEVICE_NAME_PATTERN = re.compile(r"name:([^,]+)")
+RECORD_TYPE_PREFIX_PATTERN = re.compile(
+    r"^(" + f"{AppleHealthPrefix.QUANTITY_TYPE_IDENTIFIER.value}|{AppleHealthPrefix.CATEGORY_TYPE_IDENTIFIER.value}|{AppleHealthPrefix.HEALTH_KIT_DATA_TYPE.value}" + r")?")
 
+
+@lru_cache(maxsize=config.NAME_NORMALIZATION_CACHE_SIZE)
 def extract_device_name(raw_device_name: str) -> str:
-    """Extracts device name using regex from a given string."""
+    """Extracts device name using regex from a given string.
+
+    Results are memoized since exports only hold a few dozen distinct device strings.
+    """
     if raw_device_name:
-        pattern = r"name:([^,]+)"
-        return match[1] if (match := re.search(pattern, raw_device_name)) else 'Unknown Device Name'
+        return match[1] if (match := DEVICE_NAME_PATTERN.search(raw_device_name)) else 'Unknown Device Name'
     return 'Unknown Device Name'
 
 
@@ -40,11 +49,13 @@ def remove_category_type_prefix(input: str) -> str:
     return input.removeprefix(AppleHealthPrefix.CATEGORY_TYPE_IDENTIFIER.value)
 
 
+@lru_cache(maxsize=config.NAME_NORMALIZATION_CACHE_SIZE)
 def remove_record_type_prefix(input: str) -> str:
-    """Removes either the quantity type identifier prefix or the category type identifier prefix from the input."""
-    regex_string = f"{AppleHealthPrefix.QUANTITY_TYPE_IDENTIFIER.value}|{AppleHealthPrefix.CATEGORY_TYPE_IDENTIFIER.value}|{AppleHealthPrefix.HEALTH_KIT_DATA_TYPE.value}"
-    pattern = r"^(" + regex_string + r")?"
-    return re.sub(pattern, "", input)
+    """Removes either the quantity type identifier prefix or the category type identifier prefix from the input.
+
+    Results are memoized since exports only hold a few hundred distinct type identifiers.
+    """
+    return RECORD_TYPE_PREFIX_PATTERN.sub("", input)
 
 
 def remove_workout_activity_type_prefix(input: str) -> str:
@@ -67,3 +78,23 @@ def remove_metadata_prefix(input: str) -> str:
     if AppleHealthPrefix.METADATA_KEY.value in input:
         return input.removeprefix(AppleHealthPrefix.METADATA_KEY.value)
     return input.removeprefix(AppleHealthPrefix.HEALTH_KIT.value)
+
+
+NORMALIZATION_CACHES = [
+    extract_device_name,
+    remove_record_type_prefix,
+]
+
+
+def get_normalization_cache_stats() -> dict:
+    """Returns the hit, miss and size counters of every memoized normalizer keyed by its name."""
+    return {
+        normalizer.__name__: normalizer.cache_info()._asdict()
+        for normalizer in NORMALIZATION_CACHES
+    }
+
+
+def clear_normalization_caches() -> None:
+    """Empties every memoized normalizer and resets its counters."""
+    for normalizer in NORMALIZATION_CACHES:
+        normalizer.cache_clear()
@@ -3,8 +3,17 @@ from flask import Response
 from handlers import health_record_handler as health_record_handler
 from handlers import workout_record_handler as workout_record_handler
 import os 
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict
 import config
 from utils import name_utils as name_utils
+from utils import storage_utils as storage_utils
+from utils import downsample_utils as downsample_utils
+
+
+class RequestValidationError(ValueError):
+    """Raised when a request parameter is not supported, answered with a 400 rather than a 500."""
 
 
 class UploadResponse:
@@ -108,6 +117,11 @@ class WorkoutDetailsResponse:
         }
 
     def _build_response(self):
+        workout_details = workout_record_handler.load_workout_details()
+        if workout_details is not None:
+            self.response["workoutDetailsContext"].update(workout_details)
+            return
+
         df = workout_record_handler.load_workout_records_into_dataframe()
         self.response["workoutDetailsContext"]["totalWorkouts"] = len(df)
         self.response["workoutDetailsContext"]["workoutDates"] = workout_record_handler.load_unique_workout_dates(
@@ -145,9 +159,16 @@ class WorkoutDetailsResponse:
 
 
 class RequestedWorkoutResponse:
+    WORKOUT_CHART_RECORDS = config.WORKOUT_SAMPLE_RECORDS
+
     def __init__(self):
         self.workout_csv = None
         self.workout_data = None
+        self.time_format = health_record_handler.EXPORT_DATE_TIME_FORMAT
+        self.max_points = None
+        self.route_detail = config.FULL_ROUTE_DETAIL
+        self.route_encoding = workout_record_handler.LISTS_ROUTE_ENCODING
+        self.task_timings = {}
 
         self.response = {
             "workoutContext": {
@@ -158,12 +179,76 @@ class RequestedWorkoutResponse:
             },
         }
 
+    def _run_timed_task(self, task_name: str, task: Callable):
+        start_time = time.perf_counter()
+        try:
+            return task()
+        finally:
+            self.task_timings[task_name] = time.perf_counter() - start_time
+
+    def _run_tasks(self, tasks: Dict[str, Callable]) -> dict:
+        """Runs independent load tasks on a bounded thread pool, timing every task.
+
+        The time every task took in seconds is recorded in `task_timings` under its name.
+        With `config.WORKOUT_RESPONSE_MAX_WORKERS` set to 1 the tasks run serially.
+
+        Args:
+            tasks: Functions without arguments keyed by task name.
+
+        Returns:
+            The result of every task keyed by task name.
+        """
+        max_workers = min(config.WORKOUT_RESPONSE_MAX_WORKERS or 1, len(tasks))
+
+        if max_workers <= 1:
+            return {task_name: self._run_timed_task(task_name, task) for task_name, task in tasks.items()}
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            futures = {
+                task_name: executor.submit(self._run_timed_task, task_name, task)
+                for task_name, task in tasks.items()
+            }
+            return {task_name: future.result() for task_name, future in futures.items()}
+
+    def _load_record_charts(self, record_name: str) -> list:
+        windows = [(record_name, workout["startDate"], workout["endDate"]) for workout in self.workout_data]
+        return health_record_handler.load_health_record_windows_into_chart_format(
+            windows, [workout["workoutId"] for workout in self.workout_data], self.time_format, self.max_points)
+
+    def _load_workout_charts(self) -> list:
+        """Loads the charts and routes of every workout, each record type and route in its own task.
+
+        Every chart record type is loaded once for all workouts of the date. The record
+        types and the route files are independent of each other and are loaded concurrently.
+
+        Returns:
+            A dict of charts keyed by record type, plus the route under 'route', for every
+            workout, in workout order.
+        """
+        tasks = {
+            f"chart:{record_name}": lambda record_name=record_name: self._load_record_charts(record_name)
+            for record_name in self.WORKOUT_CHART_RECORDS
+        }
+        for index, workout in enumerate(self.workout_data):
+            tasks[f"route:{index}"] = lambda file_reference=workout["FileReference"]: \
+                workout_record_handler.load_workout_record_gpx_data(
+                    file_reference, self.route_detail, self.route_encoding)
+
+        results = self._run_tasks(tasks)
+        return [
+            {
+                **{record_name: results[f"chart:{record_name}"][index] for record_name in self.WORKOUT_CHART_RECORDS},
+                "route": results[f"route:{index}"],
+            }
+            for index in range(len(self.workout_data))
+        ]
+
     def _build_response(self):
-        for workout in self.workout_data:
-            workout_stats = self._build_workout_stats(workout)
+        for workout, workout_charts in zip(self.workout_data, self._load_workout_charts()):
+            workout_stats = self._build_workout_stats(workout, workout_charts)
             self.response["workoutContext"]["workouts"].append(workout_stats)
 
-    def _build_workout_stats(self, workout):
+    def _build_workout_stats(self, workout, workout_charts):
         return {
             "workoutName": name_utils.remove_workout_activity_type_prefix(workout["workoutActivityType"]),
             "workoutDeviceName": workout["sourceName"],
@@ -176,10 +261,10 @@ class RequestedWorkoutResponse:
             "workoutCreationDate": workout["creationDate"],
             "workoutStartDate": workout["startDate"],
             "workoutEndDate": workout["endDate"],
-            "workoutStatistics": self._get_workout_statistics(workout),
+            "workoutStatistics": self._get_workout_statistics(workout, workout_charts),
             "workoutMetadata": self._get_workout_metadata(workout),
-            "workoutRoute": workout_record_handler.load_workout_record_gpx_data(workout["FileReference"]),
-            "workoutVitals": self._get_workout_vitals(workout),
+            "workoutRoute": workout_charts["route"],
+            "workoutVitals": self._get_workout_vitals(workout, workout_charts),
         }
 
     def _get_workout_metadata(self, workout):
@@ -201,15 +286,15 @@ class RequestedWorkoutResponse:
             "waterSalinity": workout['waterSalinity']
         }
 
-    def _get_workout_vitals(self, workout):
+    def _get_workout_vitals(self, workout, workout_charts):
         return {
             "heartRate": {
-                "chart": health_record_handler.load_health_record_into_chart_format("HeartRate", workout["startDate"], workout["endDate"]),
+                "chart": workout_charts["HeartRate"],
                 "unit": workout['heartRateUnit']
             }
         }
 
-    def _get_workout_statistics(self, workout):
+    def _get_workout_statistics(self, workout, workout_charts):
         return {
             "heartRate": {
                 "average": workout["averageHeartRate"],
@@ -238,35 +323,35 @@ class RequestedWorkoutResponse:
                 "minimum": workout["minimumGroundContactTime"],
                 "maximum": workout["maximumGroundContactTime"],
                 "unit": workout["groundContactTimeUnit"],
-                "chart": health_record_handler.load_health_record_into_chart_format("RunningGroundContactTime", workout["startDate"], workout["endDate"])
+                "chart": workout_charts["RunningGroundContactTime"]
             },
             "runningPower": {
                 "average": workout['averageRunningPower'],
                 "minimum": workout['minimumRunningPower'],
                 "maximum": workout['maximumRunningPower'],
                 "unit": workout['runningPowerUnit'],
-                "chart": health_record_handler.load_health_record_into_chart_format("RunningPower", workout["startDate"], workout["endDate"])
+                "chart": workout_charts["RunningPower"]
             },
             "runningVerticalOscillation": {
                 "average": workout['averageRunningVerticalOscillation'],
                 "minimum": workout['minimumRunningVerticalOscillation'],
                 "maximum": workout['maximumRunningVerticalOscillation'],
                 "unit": workout['runningVerticalOscillationUnit'],
-                "chart": health_record_handler.load_health_record_into_chart_format("RunningVerticalOscillation", workout["startDate"], workout["endDate"])
+                "chart": workout_charts["RunningVerticalOscillation"]
             },
             "runningSpeed": {
                 "average": workout['averageRunningSpeed'],
                 "minimum": workout['minimumRunningSpeed'],
                 "maximum": workout['maximumRunningSpeed'],
                 "unit": workout['runningSpeedUnit'],
-                "chart": health_record_handler.load_health_record_into_chart_format("RunningSpeed", workout["startDate"], workout["endDate"])
+                "chart": workout_charts["RunningSpeed"]
             },
             "runningStrideLength": {
                 "average": workout['averageRunningStrideLength'],
                 "minimum": workout['minimumRunningStrideLength'],
                 "maximum": workout['maximumRunningStrideLength'],
                 "unit": workout['runningStrideLengthUnit'],
-                "chart": health_record_handler.load_health_record_into_chart_format("RunningStrideLength", workout["startDate"], workout["endDate"])
+                "chart": workout_charts["RunningStrideLength"]
             },
             "distanceSwimming": {
                 "sum": workout['distanceSwimming'],
@@ -297,14 +382,63 @@ class RequestedWorkoutResponse:
         }
         self.response["workoutContext"]["errors"].append(error)
 
-    def generate_response(self, workout_start_date: str):
+    def generate_response(self, workout_start_date: str,
+                          time_format: str = health_record_handler.EXPORT_DATE_TIME_FORMAT,
+                          max_points: int = None, route_detail: str = config.FULL_ROUTE_DETAIL,
+                          route_encoding: str = workout_record_handler.LISTS_ROUTE_ENCODING,
+                          include_timings: bool = False):
+        """Builds the response for the workouts of a date.
+
+        Args:
+            workout_start_date: The local date the workouts started on.
+            time_format: The format of the chart times, one of `health_record_handler.CHART_TIME_FORMATS`.
+            max_points: Downsamples every chart to at most this many points, charts are sent whole when omitted.
+            route_detail: The level of detail of the routes, `config.FULL_ROUTE_DETAIL` or
+                a level of `config.ROUTE_DETAIL_TOLERANCES`.
+            route_encoding: The encoding of the routes, one of `workout_record_handler.ROUTE_ENCODINGS`.
+            include_timings: Adds the milliseconds every chart and route load task took to the
+                response as a list under 'taskTimings', slowest first.
+
+        Raises:
+            RequestValidationError: If the time format, route detail or route encoding is not supported,
+                `max_points` is not an integer of at least `downsample_utils.MIN_POINTS` or
+                `include_timings` is not a boolean.
+        """
+        if time_format not in health_record_handler.CHART_TIME_FORMATS:
+            raise RequestValidationError(f"Invalid timeFormat '{time_format}', expected one of "
+                                         f"{', '.join(health_record_handler.CHART_TIME_FORMATS)}.")
+        if max_points is not None and (
+                not isinstance(max_points, int) or isinstance(max_points, bool) or
+                max_points < downsample_utils.MIN_POINTS):
+            raise RequestValidationError(f"Invalid maxPoints '{max_points}', expected an integer of at least "
+                                         f"{downsample_utils.MIN_POINTS}.")
+
+        route_details = [config.FULL_ROUTE_DETAIL, *config.ROUTE_DETAIL_TOLERANCES]
+        if route_detail not in route_details:
+            raise RequestValidationError(f"Invalid routeDetail '{route_detail}', expected one of "
+                                         f"{', '.join(route_details)}.")
+        if route_encoding not in workout_record_handler.ROUTE_ENCODINGS:
+            raise RequestValidationError(f"Invalid routeEncoding '{route_encoding}', expected one of "
+                                         f"{', '.join(workout_record_handler.ROUTE_ENCODINGS)}.")
+        if not isinstance(include_timings, bool):
+            raise RequestValidationError(f"Invalid includeTimings '{include_timings}', expected true or false.")
+
         self.response['workoutContext']['requestedDate'] = workout_start_date
+        self.time_format = time_format
+        self.max_points = max_points
+        self.route_detail = route_detail
+        self.route_encoding = route_encoding
 
         self.workout_csv = workout_record_handler.load_workout_records_into_dataframe()
         self.workout_data = workout_record_handler.load_workout_records_from_date(
             self.workout_csv, workout_start_date)
 
         self._build_response()
+        if include_timings:
+            self.response['workoutContext']['taskTimings'] = [
+                {"task": task_name, "milliseconds": round(seconds * 1000, 3)}
+                for task_name, seconds in sorted(self.task_timings.items(), key=lambda timing: -timing[1])
+            ]
 
     def get_response(self) -> Response:
         """Generates the Flask response object.
@@ -328,8 +462,8 @@ class ExportStatusResponse:
 
 
     def _build_response(self):
-        workout_file_path = os.path.join(
-            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUTS_SUMMARY_FILE_NAME)
+        workout_file_path = storage_utils.storage_file_path(os.path.join(
+            config.WORKOUT_ELEMENTS_DIRECTORY, config.WORKOUTS_SUMMARY_FILE_NAME))
         self.response["exportStatusContext"]["exportPresent"] = os.path.isfile(workout_file_path)
     
     def set_status_code(self, code: int):
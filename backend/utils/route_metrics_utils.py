@@ -0,0 +1,125 @@
+"""
+Derives distance, pace, grade and split metrics from the track points of a workout route.
+
+Metrics are computed once per route at ingest, as whole-array operations over the route:
+the distance between consecutive points with the haversine formula, the pace and grade
+over a centered window of `config.ROUTE_METRICS_SMOOTHING_POINTS` points on either side,
+and split tables for every split length of `config.ROUTE_SPLIT_LENGTHS`. The point metrics
+are stored as columns of the route file and the splits in a file beside it, so serving a
+workout does not pay for any of the math.
+
+Usage example:
+    df = add_route_metrics(df)
+    write_route_splits(route_path, df)
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import config
+
+from utils import schema_utils as schema_utils
+from utils import route_utils as route_utils
+from utils import storage_utils as storage_utils
+
+# Pace is left missing over windows shorter than this many meters, where GPS noise dominates
+MIN_PACE_DISTANCE_METERS = 1.0
+
+
+def route_splits_path(route_path: str) -> str:
+    """Returns the path of the file holding the split tables of a route file."""
+    route_path_without_extension, extension = os.path.splitext(route_path)
+    return f"{route_path_without_extension}.splits{extension}"
+
+
+def haversine_distances(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """Returns the distance in meters from every point to the next, with missing coordinates counting as 0."""
+    latitudes = np.radians(latitudes)
+    longitudes = np.radians(longitudes)
+    a = (np.sin(np.diff(latitudes) / 2) ** 2 +
+         np.cos(latitudes[:-1]) * np.cos(latitudes[1:]) * np.sin(np.diff(longitudes) / 2) ** 2)
+    return np.nan_to_num(2 * route_utils.EARTH_RADIUS_METERS * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0))))
+
+
+def _epoch_seconds(times: pd.Series) -> np.ndarray:
+    seconds = times.dt.as_unit("ns").array.asi8 / 1e9
+    return np.where(times.isna().to_numpy(), np.nan, seconds)
+
+
+def _centered_differences(values: np.ndarray, half_window: int) -> np.ndarray:
+    """Returns the difference between the values `half_window` points after and before every point."""
+    point_count = len(values)
+    indexes = np.arange(point_count)
+    return (values[np.minimum(indexes + half_window, point_count - 1)] -
+            values[np.maximum(indexes - half_window, 0)])
+
+
+def add_route_metrics(df: pd.DataFrame) -> pd.DataFrame:
+    """Adds the cumulative distance, smoothed pace and grade of every track point to a route.
+
+    Returns:
+        The route with a 'distance' column in meters from the start, a 'pace' column in
+        seconds per kilometer and a 'grade' column in percent. Pace and grade are missing
+        where the window covers less than `MIN_PACE_DISTANCE_METERS`.
+    """
+    df = df.copy()
+    distances = np.concatenate(([0.0], np.cumsum(haversine_distances(
+        df["lat"].to_numpy(dtype=np.float64), df["lon"].to_numpy(dtype=np.float64)))))[:len(df)]
+
+    half_window = config.ROUTE_METRICS_SMOOTHING_POINTS
+    window_distances = _centered_differences(distances, half_window)
+    moving = window_distances >= MIN_PACE_DISTANCE_METERS
+    with np.errstate(divide="ignore", invalid="ignore"):
+        pace = _centered_differences(_epoch_seconds(df["time"]), half_window) / window_distances * 1000
+        grade = _centered_differences(df["elevation"].to_numpy(dtype=np.float64), half_window) / window_distances * 100
+
+    df["distance"] = distances
+    df["pace"] = np.where(moving, pace, np.nan)
+    df["grade"] = np.where(moving, grade, np.nan)
+    return df
+
+
+def route_splits(df: pd.DataFrame) -> pd.DataFrame:
+    """Splits a route with metrics into consecutive stretches of every length of `config.ROUTE_SPLIT_LENGTHS`.
+
+    The time and elevation at every split boundary are interpolated along the distance,
+    the last split of every length is the remainder of the route.
+
+    Args:
+        df: The route with the columns added by `add_route_metrics`.
+
+    Returns:
+        One row per split with its 'unit', 1-based 'split' number, 'distance' in meters,
+        'duration' in seconds, 'pace' in seconds per unit and 'elevationGain' and
+        'elevationLoss' in meters.
+    """
+    distances = df["distance"].to_numpy(dtype=np.float64)
+    total_distance = distances[-1] if len(distances) else 0.0
+    if total_distance <= 0:
+        return pd.DataFrame(columns=list(schema_utils.ROUTE_SPLIT_DTYPES)).astype(schema_utils.ROUTE_SPLIT_DTYPES)
+
+    elevation_changes = np.diff(df["elevation"].to_numpy(dtype=np.float64), prepend=np.nan)
+    elevation_gains = np.cumsum(np.nan_to_num(np.clip(elevation_changes, 0.0, None)))
+    elevation_losses = np.cumsum(np.nan_to_num(np.clip(-elevation_changes, 0.0, None)))
+    times = _epoch_seconds(df["time"])
+
+    splits = []
+    for unit, split_length in config.ROUTE_SPLIT_LENGTHS.items():
+        boundaries = np.append(np.arange(0.0, total_distance, split_length), total_distance)
+        split_distances = np.diff(boundaries)
+        durations = np.diff(np.interp(boundaries, distances, times))
+        splits.append(pd.DataFrame({
+            "unit": unit,
+            "split": np.arange(1, len(split_distances) + 1),
+            "distance": split_distances,
+            "duration": durations,
+            "pace": durations / split_distances * split_length,
+            "elevationGain": np.diff(np.interp(boundaries, distances, elevation_gains)),
+            "elevationLoss": np.diff(np.interp(boundaries, distances, elevation_losses)),
+        }))
+    return pd.concat(splits, ignore_index=True).astype(schema_utils.ROUTE_SPLIT_DTYPES)
+
+
+def write_route_splits(route_path: str, df: pd.DataFrame) -> None:
+    """Writes the split tables of a route with metrics next to its file, see `route_splits`."""
+    storage_utils.write_dataframe(route_splits(df), route_splits_path(route_path))
@@ -0,0 +1,108 @@
+"""
+Simplifies workout routes into levels of detail with Ramer-Douglas-Peucker.
+
+Every track point of a route is given a significance, the largest RDP tolerance in meters
+at which it is still kept, so simplifying the route at any tolerance is a single
+comparison against the significances. At ingest the route is written once per level of
+`config.ROUTE_DETAIL_TOLERANCES` next to the full route file, letting the map load a few
+hundred points and the full resolution only when it is asked for.
+
+Usage example:
+    write_route_details(route_path, df)
+    detail_path = route_detail_path(route_path, "low")
+"""
+
+import os
+import numpy as np
+import pandas as pd
+import config
+
+from utils import storage_utils as storage_utils
+
+EARTH_RADIUS_METERS = 6_371_008.8
+
+
+def route_detail_path(route_path: str, route_detail: str) -> str:
+    """Returns the path of the file holding a level of detail of a route file."""
+    route_path_without_extension, extension = os.path.splitext(route_path)
+    return f"{route_path_without_extension}.{route_detail}{extension}"
+
+
+def project_route(latitudes: np.ndarray, longitudes: np.ndarray) -> tuple:
+    """Projects coordinates in degrees onto a plane in meters around the route's mean latitude."""
+    latitudes = np.radians(latitudes)
+    longitudes = np.radians(longitudes)
+    x = EARTH_RADIUS_METERS * longitudes * np.cos(np.nanmean(latitudes))
+    y = EARTH_RADIUS_METERS * latitudes
+    return x, y
+
+
+def _segment_distances(x: np.ndarray, y: np.ndarray, start: int, end: int) -> np.ndarray:
+    """Returns the distances of the points between `start` and `end` to the segment joining them."""
+    dx, dy = x[end] - x[start], y[end] - y[start]
+    px, py = x[start + 1:end] - x[start], y[start + 1:end] - y[start]
+    segment_length = dx * dx + dy * dy
+    if segment_length == 0:
+        return np.hypot(px, py)
+
+    projection = np.clip((px * dx + py * dy) / segment_length, 0.0, 1.0)
+    return np.hypot(px - projection * dx, py - projection * dy)
+
+
+def rdp_significance(x: np.ndarray, y: np.ndarray, min_tolerance: float = 0.0) -> np.ndarray:
+    """Returns the largest Ramer-Douglas-Peucker tolerance at which every point is kept.
+
+    Simplifying with a tolerance keeps exactly the points whose significance exceeds it.
+    A point's significance is its distance to the segment it split, capped by the
+    significance of the point that split its parent segment, and is infinite for the
+    first and last points. Segments whose points all lie within `min_tolerance` are not
+    split any further, their points get the largest of their distances instead.
+
+    Args:
+        x: The projected x coordinates of the route in meters.
+        y: The projected y coordinates of the route in meters.
+        min_tolerance: The smallest tolerance the significances are exact for.
+    """
+    point_count = len(x)
+    significance = np.zeros(point_count)
+    if point_count == 0:
+        return significance
+
+    significance[[0, -1]] = np.inf
+    segments = [(0, point_count - 1, np.inf)]
+    while segments:
+        start, end, parent_significance = segments.pop()
+        if end - start < 2:
+            continue
+
+        distances = _segment_distances(x, y, start, end)
+        split = int(np.argmax(distances))
+        split_significance = min(float(distances[split]), parent_significance)
+        if split_significance <= min_tolerance:
+            significance[start + 1:end] = split_significance
+            continue
+
+        split += start + 1
+        significance[split] = split_significance
+        segments.append((start, split, split_significance))
+        segments.append((split, end, split_significance))
+    return significance
+
+
+def route_significance(df: pd.DataFrame) -> np.ndarray:
+    """Returns the RDP significance of every track point of a route, see `rdp_significance`."""
+    x, y = project_route(df["lat"].to_numpy(dtype=np.float64), df["lon"].to_numpy(dtype=np.float64))
+    return rdp_significance(x, y, min(config.ROUTE_DETAIL_TOLERANCES.values(), default=0.0))
+
+
+def write_route_details(route_path: str, df: pd.DataFrame) -> None:
+    """Writes every level of detail of `config.ROUTE_DETAIL_TOLERANCES` of a route next to its file.
+
+    Args:
+        route_path: The path of the full route file.
+        df: The track points of the route.
+    """
+    significance = route_significance(df)
+    for route_detail, tolerance in config.ROUTE_DETAIL_TOLERANCES.items():
+        storage_utils.write_dataframe(
+            df[significance > tolerance].reset_index(drop=True), route_detail_path(route_path, route_detail))
@@ -0,0 +1,122 @@
+"""
+Describes the column types every health record type is stored and loaded with.
+
+Repeated strings such as the record type, unit, source and device are stored as
+categoricals, quantity values as float32 or float64 depending on the record type and
+dates as UTC timestamps with a separate offset column, so loaded record series take a
+fraction of the memory of inferred object columns.
+
+Usage example:
+    dtypes = schema_utils.get_record_dtypes("HeartRate")
+    df = storage_utils.read_dataframe(path, dtype=dtypes)
+"""
+
+from functools import lru_cache
+import config
+from utils import date_utils as date_utils
+from parsers.health_record_parser import HealthRecordParser
+
+CATEGORY_DTYPE = "category"
+STRING_DTYPE = "string"
+
+RECORD_COLUMN_DTYPES = {
+    "type": CATEGORY_DTYPE,
+    "unit": CATEGORY_DTYPE,
+    "sourceName": CATEGORY_DTYPE,
+    "sourceVersion": CATEGORY_DTYPE,
+    "device": CATEGORY_DTYPE,
+    "creationDate": date_utils.UTC_DATETIME_DTYPE,
+    "startDate": date_utils.UTC_DATETIME_DTYPE,
+    "endDate": date_utils.UTC_DATETIME_DTYPE,
+    "heartRateMotionContext": CATEGORY_DTYPE,
+    "testType": CATEGORY_DTYPE,
+}
+
+
+def get_record_value_dtype(record_type: str) -> str:
+    """Returns the type of the 'value' column of a record type.
+
+    Record types that are not listed in `config` keep their values as strings,
+    since they may hold either quantities or category names.
+    """
+    if record_type in config.CATEGORY_VALUE_RECORDS:
+        return CATEGORY_DTYPE
+    if record_type in config.FLOAT32_VALUE_RECORDS:
+        return "float32"
+    if record_type in config.ALL_RECORDS:
+        return "float64"
+    return STRING_DTYPE
+
+
+def get_date_dtypes(date_columns: list) -> dict:
+    """Returns the column types of export date columns, each followed by its offset column."""
+    dtypes = {}
+    for column in date_columns:
+        dtypes[column] = date_utils.UTC_DATETIME_DTYPE
+        dtypes[date_utils.tz_offset_column(column)] = date_utils.TZ_OFFSET_DTYPE
+    return dtypes
+
+
+WORKOUT_DATE_COLUMNS = ["creationDate", "startDate", "endDate"]
+WORKOUT_DATE_DTYPES = get_date_dtypes(WORKOUT_DATE_COLUMNS)
+WORKOUT_STATISTICS_DATE_DTYPES = get_date_dtypes(["startDate", "endDate"])
+
+ROUTE_DTYPES = {
+    "lon": "float64",
+    "lat": "float64",
+    "elevation": "float64",
+    "time": date_utils.UTC_DATETIME_DTYPE,
+    "speed": "float64",
+    "course": "float64",
+    "hAcc": "float64",
+    "vAcc": "float64",
+    "distance": "float64",
+    "pace": "float64",
+    "grade": "float64",
+}
+
+ROUTE_SPLIT_DTYPES = {
+    "unit": CATEGORY_DTYPE,
+    "split": "int64",
+    "distance": "float64",
+    "duration": "float64",
+    "pace": "float64",
+    "elevationGain": "float64",
+    "elevationLoss": "float64",
+}
+
+WORKOUT_DATE_INDEX_DTYPES = {
+    "date": STRING_DTYPE,
+    "workoutId": "int64",
+}
+
+WORKOUT_SAMPLE_OFFSET_DTYPES = {
+    "workoutId": "int64",
+    "type": CATEGORY_DTYPE,
+    "startOffset": "int64",
+    "stopOffset": "int64",
+}
+
+
+@lru_cache(maxsize=None)
+def _record_dtypes(record_type: str) -> tuple:
+    dtypes = []
+    for column in HealthRecordParser.get_column_type(record_type):
+        if column == "value":
+            dtypes.append((column, get_record_value_dtype(record_type)))
+        elif RECORD_COLUMN_DTYPES[column] == date_utils.UTC_DATETIME_DTYPE:
+            dtypes.extend(get_date_dtypes([column]).items())
+        else:
+            dtypes.append((column, RECORD_COLUMN_DTYPES[column]))
+    return tuple(dtypes)
+
+
+def get_record_dtypes(record_type: str) -> dict:
+    """Returns the column types of a record type's file, keyed by column in file order.
+
+    Every date column is followed by the column holding its UTC offsets in seconds.
+
+    Args:
+        record_type: The record type without its HealthKit prefix, e.g. 'HeartRate'.
+    """
+    return dict(_record_dtypes(record_type))
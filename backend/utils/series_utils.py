@@ -0,0 +1,108 @@
+"""
+Stores time series of health records as memory-mapped NumPy arrays.
+
+Record types that are only ever read as (timestamp, value) pairs are also written at
+ingest as one `.npy` file per column next to their record file. Loading them with
+`np.load(mmap_mode='r')` reads nothing up front: a window slice only touches the pages
+it covers, and every process reading the same series shares the OS page cache.
+
+Usage example:
+    write_series_arrays(record_path, chunks, row_count, dtypes)
+    arrays = load_series_arrays(record_path)
+    window = series_window(arrays, start_time, end_time)
+"""
+
+import os
+from typing import Dict, Iterable, Optional
+import numpy as np
+import pandas as pd
+from utils import date_utils as date_utils
+
+SERIES_COLUMNS = ["startDate", "startDateTzOffset", "endDate", "value"]
+DATETIME_COLUMNS = {"startDate", "endDate"}
+
+
+def series_array_path(record_path: str, column: str) -> str:
+    """Returns the path of the `.npy` file holding one column of a record file's series."""
+    record_path_without_extension, _ = os.path.splitext(record_path)
+    return f"{record_path_without_extension}.{column}.npy"
+
+
+def write_series_arrays(record_path: str, chunks: Iterable[pd.DataFrame], row_count: int, dtypes: dict) -> None:
+    """Writes the series columns of a record file sorted by 'startDate' as `.npy` files.
+
+    Every array is preallocated with `np.lib.format.open_memmap` and filled one chunk at
+    a time, so the records are never loaded at once. Dates are stored as UTC epoch
+    nanoseconds, missing dates as `date_utils.MISSING_DATE_EPOCH_NS` so they stay sorted
+    last like in the record file and fall outside every window. Every array is written to a
+    temporary file first, so readers never map a partially written array.
+
+    Args:
+        record_path: The path of the record file the arrays belong to.
+        chunks: The records of the file in order, with the dtypes they are stored with.
+        row_count: The number of records of the file.
+        dtypes: The column types of the record file.
+    """
+    array_paths = {column: series_array_path(record_path, column) for column in SERIES_COLUMNS}
+    arrays = {
+        column: np.lib.format.open_memmap(
+            f"{array_path}.partial", mode="w+", shape=(row_count,),
+            dtype=np.int64 if column in DATETIME_COLUMNS else np.dtype(dtypes[column]))
+        for column, array_path in array_paths.items()
+    }
+
+    start = 0
+    for chunk in chunks:
+        stop = start + len(chunk)
+        for column, array in arrays.items():
+            values = chunk[column]
+            array[start:stop] = (
+                date_utils.epoch_nanoseconds(values) if column in DATETIME_COLUMNS else values.to_numpy())
+        start = stop
+    if start != row_count:
+        raise ValueError(f"Expected {row_count} records in {record_path}, read {start}.")
+
+    for array in arrays.values():
+        array.flush()
+    arrays.clear()
+    for array_path in array_paths.values():
+        os.replace(f"{array_path}.partial", array_path)
+
+
+def load_series_arrays(record_path: str) -> Optional[Dict[str, np.ndarray]]:
+    """Memory-maps the series arrays of a record file.
+
+    Returns:
+        The read-only arrays keyed by column, or None when the arrays were not written.
+    """
+    array_paths = {column: series_array_path(record_path, column) for column in SERIES_COLUMNS}
+    if not all(os.path.exists(array_path) for array_path in array_paths.values()):
+        return None
+    return {column: np.load(array_path, mmap_mode="r") for column, array_path in array_paths.items()}
+
+
+def series_window(arrays: Dict[str, np.ndarray], start_time: str, end_time: str,
+                  rows: slice = None) -> pd.DataFrame:
+    """Copies the records of a series that lie within a time window into a DataFrame.
+
+    The window bounds are found with a binary search on the 'startDate' array, so only
+    the pages holding the window are read.
+
+    Args:
+        arrays: The series arrays returned by `load_series_arrays`.
+        start_time: The earliest start of a returned record.
+        end_time: The latest end of a returned record.
+        rows: The rows starting within the window when already known, skips the binary search.
+    """
+    end_ns = pd.Timestamp(end_time).value
+    if rows is None:
+        start_dates = arrays["startDate"]
+        rows = slice(start_dates.searchsorted(pd.Timestamp(start_time).value, side="left"),
+                     start_dates.searchsorted(end_ns, side="right"))
+    in_window = np.asarray(arrays["endDate"][rows]) <= end_ns
+
+    return pd.DataFrame({
+        column: pd.to_datetime(np.asarray(arrays[column][rows])[in_window], unit="ns", utc=True)
+        if column in DATETIME_COLUMNS else np.asarray(arrays[column][rows])[in_window]
+        for column in SERIES_COLUMNS
+    })
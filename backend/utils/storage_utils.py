@@ -0,0 +1,320 @@
+"""
+Reads and writes the ingested export data in the configured storage format.
+
+Every file under `config.DATA_DIRECTORY` is stored as CSV, Parquet or Arrow IPC
+(Feather) depending on `config.STORAGE_FORMAT`. The columnar formats need `pyarrow`
+and let readers load only the columns they use.
+
+Usage example:
+    path = storage_utils.storage_file_path(os.path.join(directory, "Workouts.csv"))
+    storage_utils.write_dataframe(df, path)
+    df = storage_utils.read_dataframe(path, columns=["startDate", "endDate"])
+"""
+
+import os
+from typing import Iterator, List
+import pandas as pd
+import config
+from utils import date_utils as date_utils
+
+STORAGE_FORMAT_EXTENSIONS = {
+    "csv": ".csv",
+    "parquet": ".parquet",
+    "feather": ".feather",
+}
+
+
+def get_storage_format(storage_format: str = None) -> str:
+    """Returns the storage format to use, defaulting to `config.STORAGE_FORMAT`.
+
+    Raises:
+        ValueError: If the storage format is not supported.
+    """
+    storage_format = storage_format or config.STORAGE_FORMAT
+    if storage_format not in STORAGE_FORMAT_EXTENSIONS:
+        raise ValueError(
+            f"Unknown storage format '{storage_format}', expected one of {sorted(STORAGE_FORMAT_EXTENSIONS)}.")
+    return storage_format
+
+
+def storage_file_path(file_path: str, storage_format: str = None) -> str:
+    """Replaces the extension of a data file path with the one of the storage format.
+
+    Args:
+        file_path: The path of the data file. Anything after the last dot of the file
+            name, such as '.csv' or '.gpx', is treated as its extension.
+        storage_format: The storage format, defaults to `config.STORAGE_FORMAT`.
+    """
+    file_path_without_extension, _ = os.path.splitext(file_path)
+    return file_path_without_extension + STORAGE_FORMAT_EXTENSIONS[get_storage_format(storage_format)]
+
+
+def get_storage_format_of(file_path: str) -> str:
+    """Returns the storage format matching a data file's extension, or the configured one."""
+    _, extension = os.path.splitext(file_path)
+    for storage_format, storage_extension in STORAGE_FORMAT_EXTENSIONS.items():
+        if extension == storage_extension:
+            return storage_format
+    return get_storage_format()
+
+
+def infer_column_types(df: pd.DataFrame) -> pd.DataFrame:
+    """Converts text columns holding only numbers into numeric columns.
+
+    Mirrors the type inference `pd.read_csv` applies, so the columnar formats store
+    and return the same types CSV readers see. Empty strings are treated as missing.
+    """
+    df = df.copy()
+    for column in df.columns:
+        if not (pd.api.types.is_object_dtype(df[column]) or pd.api.types.is_string_dtype(df[column])):
+            continue
+        values = df[column].replace("", None)
+        try:
+            df[column] = pd.to_numeric(values)
+        except (ValueError, TypeError):
+            df[column] = values.astype("string")
+    return df
+
+
+def _is_datetime_dtype(dtype) -> bool:
+    return pd.api.types.is_datetime64_any_dtype(pd.api.types.pandas_dtype(dtype))
+
+
+def _is_numeric_dtype(dtype) -> bool:
+    return pd.api.types.is_numeric_dtype(pd.api.types.pandas_dtype(dtype))
+
+
+def _to_utc_datetimes(df: pd.DataFrame, column: str, dtypes: dict) -> pd.Series:
+    values = df[column]
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values.dt.tz_convert("UTC") if values.dt.tz is not None else values.dt.tz_localize("UTC")
+    if pd.api.types.is_numeric_dtype(values):
+        return pd.to_datetime(values, unit="ns", utc=True)
+
+    timestamps, offsets = date_utils.parse_export_dates(values)
+    offset_column = date_utils.tz_offset_column(column)
+    if offset_column in dtypes:
+        df[offset_column] = offsets
+    return timestamps
+
+
+def apply_dtypes(df: pd.DataFrame, dtypes: dict) -> pd.DataFrame:
+    """Converts the columns of a DataFrame to the given types.
+
+    Values of numeric columns that are not numbers become missing values instead
+    of failing the conversion. Datetime columns are converted to UTC from datetimes,
+    epoch nanoseconds or export date strings. When a date string column is converted and
+    `dtypes` lists its `date_utils.tz_offset_column`, the offsets of the strings are
+    stored in that column. Columns are returned in the order of `dtypes`.
+
+    Args:
+        df: The DataFrame to convert.
+        dtypes: The types to convert to keyed by column, columns missing from `df` are ignored.
+    """
+    df = df.copy()
+    for column, dtype in dtypes.items():
+        if column not in df.columns or df[column].dtype == dtype:
+            continue
+        if _is_datetime_dtype(dtype):
+            df[column] = _to_utc_datetimes(df, column, dtypes).astype(dtype)
+        elif _is_numeric_dtype(dtype):
+            df[column] = pd.to_numeric(df[column], errors="coerce").astype(dtype)
+        else:
+            df[column] = df[column].astype(dtype)
+
+    return df[[column for column in dtypes if column in df.columns] +
+              [column for column in df.columns if column not in dtypes]]
+
+
+def _with_epoch_datetimes(df: pd.DataFrame) -> pd.DataFrame:
+    """Replaces datetime columns with epoch nanoseconds, the way they are stored in CSV files."""
+    datetime_columns = [column for column in df.columns
+                        if pd.api.types.is_datetime64_any_dtype(df[column])]
+    if not datetime_columns:
+        return df
+
+    df = df.copy()
+    for column in datetime_columns:
+        df[column] = pd.arrays.IntegerArray(
+            df[column].dt.as_unit("ns").array.asi8.copy(), df[column].isna().to_numpy())
+    return df
+
+
+def arrow_schema(dtypes: dict):
+    """Returns the Arrow schema a file with columns of the given types is stored with.
+
+    Categorical and string columns are stored as plain strings, Parquet dictionary
+    encodes them on disk and readers convert them back to categoricals. Datetime columns
+    are stored as UTC timestamps, epoch nanoseconds under the hood.
+    """
+    import pyarrow as pa
+
+    def arrow_type(dtype):
+        if _is_datetime_dtype(dtype):
+            return pa.timestamp("ns", tz="UTC")
+        if _is_numeric_dtype(dtype):
+            return pa.from_numpy_dtype(pd.api.types.pandas_dtype(dtype))
+        return pa.string()
+
+    return pa.schema([(column, arrow_type(dtype)) for column, dtype in dtypes.items()])
+
+
+def write_dataframe(df: pd.DataFrame, file_path: str) -> None:
+    """Writes a DataFrame in the storage format matching the file path's extension.
+
+    Args:
+        df: The DataFrame to write.
+        file_path: The destination, built with `storage_file_path`.
+    """
+    match get_storage_format_of(file_path):
+        case "csv":
+            _with_epoch_datetimes(df).to_csv(file_path, index=False, header=True)
+        case "parquet":
+            infer_column_types(df).to_parquet(file_path, index=False)
+        case "feather":
+            infer_column_types(df).reset_index(drop=True).to_feather(file_path)
+
+
+def read_dataframe(file_path: str, columns: List[str] = None, dtype: dict = None,
+                   storage_format: str = None) -> pd.DataFrame:
+    """Reads a DataFrame stored in the format matching the file path's extension.
+
+    Args:
+        file_path: The path of the stored data file.
+        columns: Only load these columns, all columns are loaded when omitted.
+        dtype: Types to convert columns to, inferred like `pd.read_csv` when omitted.
+            Datetime columns of columnar files are loaded without any conversion.
+        storage_format: The storage format, defaults to the one matching the file's extension.
+    """
+    match storage_format or get_storage_format_of(file_path):
+        case "csv":
+            df = pd.read_csv(file_path, usecols=columns, dtype={
+                column: column_type for column, column_type in (dtype or {}).items()
+                if not _is_datetime_dtype(column_type)})
+            return df if dtype is None else apply_dtypes(df, dtype)
+        case "parquet":
+            categorical_columns = [column for column, column_type in (dtype or {}).items()
+                                   if column_type == "category" and (columns is None or column in columns)]
+            df = pd.read_parquet(file_path, columns=columns,
+                                 read_dictionary=categorical_columns or None)
+        case "feather":
+            df = pd.read_feather(file_path, columns=columns)
+
+    if dtype is None:
+        return infer_column_types(df)
+    return apply_dtypes(df, dtype)
+
+
+def iter_dataframe_chunks(file_path: str, chunk_rows: int, dtype: dict = None,
+                          storage_format: str = None) -> Iterator[pd.DataFrame]:
+    """Reads a stored data file as DataFrames of at most `chunk_rows` rows.
+
+    Without `dtype` the values of CSV files are returned exactly as written, so the
+    chunks can be appended to another file without changing them.
+
+    Args:
+        file_path: The path of the stored data file.
+        chunk_rows: The maximum number of rows per chunk.
+        dtype: Types to convert the columns of CSV files to, see `read_dataframe`.
+        storage_format: The storage format, defaults to the one matching the file's extension.
+    """
+    match storage_format or get_storage_format_of(file_path):
+        case "csv" if dtype is None:
+            yield from pd.read_csv(file_path, dtype=str, keep_default_na=False, chunksize=chunk_rows)
+        case "csv":
+            for chunk in pd.read_csv(file_path, chunksize=chunk_rows, dtype={
+                    column: column_type for column, column_type in dtype.items()
+                    if not _is_datetime_dtype(column_type)}):
+                yield apply_dtypes(chunk, dtype)
+        case "parquet":
+            import pyarrow.parquet as pq
+            for batch in pq.ParquetFile(file_path).iter_batches(batch_size=chunk_rows):
+                yield batch.to_pandas()
+        case "feather":
+            import pyarrow as pa
+            with pa.OSFile(file_path) as source:
+                reader = pa.ipc.open_file(source)
+                for batch_index in range(reader.num_record_batches):
+                    batch = reader.get_batch(batch_index)
+                    for start in range(0, batch.num_rows, chunk_rows):
+                        yield batch.slice(start, chunk_rows).to_pandas()
+
+
+class CsvChunkWriter:
+    """Appends DataFrame chunks to a CSV file, writing the header with the first chunk."""
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.header_written = False
+
+    def write(self, df: pd.DataFrame) -> None:
+        _with_epoch_datetimes(df).to_csv(self.file_path, mode="a" if self.header_written else "w",
+                  index=False, header=not self.header_written)
+        self.header_written = True
+
+    def close(self) -> None:
+        pass
+
+
+class ArrowChunkWriter:
+    """Appends DataFrame chunks to a Parquet or Arrow IPC file as row groups or record batches.
+
+    Without an explicit schema the file's schema is taken from the first chunk, with
+    columns that hold no values stored as text, and every later chunk is converted to it.
+    Chunks longer than `max_batch_rows` are split into several row groups or record batches.
+    """
+
+    def __init__(self, file_path: str, storage_format: str, schema=None, max_batch_rows: int = None):
+        self.file_path = file_path
+        self.storage_format = storage_format
+        self.schema = schema
+        self.max_batch_rows = max_batch_rows
+        self.writer = None
+
+    def _open(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if self.schema is None:
+            self.schema = pa.schema([
+                field.with_type(pa.string())
+                if pa.types.is_null(field.type) or pa.types.is_large_string(field.type) else field
+                for field in pa.Schema.from_pandas(df, preserve_index=False)
+            ])
+        if self.storage_format == "parquet":
+            self.writer = pq.ParquetWriter(self.file_path, self.schema)
+        else:
+            self.writer = pa.ipc.new_file(self.file_path, self.schema)
+
+    def write(self, df: pd.DataFrame) -> None:
+        import pyarrow as pa
+
+        if self.writer is None:
+            self._open(df)
+        table = pa.Table.from_pandas(df, preserve_index=False).select(self.schema.names).cast(self.schema)
+        if self.storage_format == "parquet":
+            self.writer.write_table(table, row_group_size=self.max_batch_rows)
+        else:
+            self.writer.write_table(table, max_chunksize=self.max_batch_rows)
+
+    def close(self) -> None:
+        if self.writer is not None:
+            self.writer.close()
+
+
+def open_chunk_writer(file_path: str, storage_format: str = None, dtypes: dict = None,
+                      max_batch_rows: int = None):
+    """Returns a writer that appends DataFrame chunks to `file_path`.
+
+    Args:
+        file_path: The path of the file to write.
+        storage_format: The storage format, defaults to the one matching the file's extension.
+        dtypes: The column types the chunks are converted to, stored with the schema
+            of `arrow_schema` by the columnar formats.
+        max_batch_rows: The most rows the columnar formats store per row group or record
+            batch, the unit they are read back in. Every chunk is stored whole when omitted.
+    """
+    storage_format = storage_format or get_storage_format_of(file_path)
+    if storage_format == "csv":
+        return CsvChunkWriter(file_path)
+    return ArrowChunkWriter(file_path, storage_format, arrow_schema(dtypes) if dtypes else None, max_batch_rows)
@@ -0,0 +1,79 @@
+"""
+Indexes the workouts of an export by the local date they started on.
+
+At ingest the workouts summary is reduced to a date index, one row per workout sorted by
+local start date holding the workout's row in the summary, and to a details file holding
+the total number of workouts and their sorted unique dates. Finding the workouts of a date
+is then a binary search on the index and listing the dates a read of the details file,
+instead of deriving both from every workout on every request.
+
+Usage example:
+    write_workout_indexes(workouts, date_index_path, details_path)
+    workout_ids = get_workout_ids_on_date(date_index, "2024-08-21")
+"""
+
+import json
+import os
+from typing import List
+import numpy as np
+import pandas as pd
+
+from utils import storage_utils as storage_utils
+from utils import schema_utils as schema_utils
+from utils import date_utils as date_utils
+
+DATE_FORMAT = "%Y-%m-%d"
+
+
+def build_workout_date_index(workouts: pd.DataFrame) -> pd.DataFrame:
+    """Returns the local start date and row of every workout, sorted by date and row.
+
+    Args:
+        workouts: The workouts summary with a UTC 'startDate' column and its offset column.
+    """
+    dates = date_utils.local_datetimes(
+        workouts["startDate"], workouts[date_utils.tz_offset_column("startDate")]).dt.strftime(DATE_FORMAT)
+    date_index = pd.DataFrame({"date": dates.to_numpy(), "workoutId": np.arange(len(workouts))})
+    date_index = date_index.dropna(subset=["date"]).sort_values(["date", "workoutId"], kind="stable")
+    return storage_utils.apply_dtypes(date_index.reset_index(drop=True), schema_utils.WORKOUT_DATE_INDEX_DTYPES)
+
+
+def build_workout_details(workouts: pd.DataFrame, date_index: pd.DataFrame) -> dict:
+    """Returns the total number of workouts and their sorted unique local start dates."""
+    return {
+        "totalWorkouts": len(workouts),
+        "workoutDates": date_index["date"].unique().tolist(),
+    }
+
+
+def write_workout_indexes(workouts: pd.DataFrame, date_index_path: str, details_path: str) -> None:
+    """Writes the date index and the details of the workouts summary.
+
+    The details file is written to a temporary file first, so readers never load a
+    partially written file.
+    """
+    date_index = build_workout_date_index(workouts)
+    storage_utils.write_dataframe(date_index, date_index_path)
+
+    partial_details_path = f"{details_path}.partial"
+    with open(partial_details_path, "w") as details_file:
+        json.dump(build_workout_details(workouts, date_index), details_file)
+    os.replace(partial_details_path, details_path)
+
+
+def load_workout_details(details_path: str) -> dict:
+    with open(details_path) as details_file:
+        return json.load(details_file)
+
+
+def get_workout_ids_on_date(date_index: pd.DataFrame, workout_date: str) -> List[int]:
+    """Returns the rows of the workouts that started on a local date, found with a binary search.
+
+    Args:
+        date_index: The date index returned by `build_workout_date_index`.
+        workout_date: The local date, in any format `pd.Timestamp` parses.
+    """
+    workout_date = pd.Timestamp(workout_date).strftime(DATE_FORMAT)
+    dates = date_index["date"]
+    return date_index["workoutId"].iloc[
+        dates.searchsorted(workout_date, side="left"):dates.searchsorted(workout_date, side="right")].tolist()
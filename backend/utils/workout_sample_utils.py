@@ -0,0 +1,101 @@
+"""
+Joins workouts to the record samples recorded during them.
+
+Once the record and workout files of an export have been written, the time window of
+every workout is matched against the record files of `config.WORKOUT_SAMPLE_RECORDS`.
+Record files are sorted by 'startDate', so the join is one vectorized binary search per
+window bound across all workouts at once. The resulting row ranges are stored keyed by
+the workout's row in the workouts summary, letting a workout's samples be read without
+searching the whole series, however many years of records it holds.
+
+Usage example:
+    write_workout_sample_offsets(workouts, record_paths, offsets_path)
+    sample_ranges = get_workout_sample_ranges(offsets, "HeartRate")
+"""
+
+import os
+from typing import Dict, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+from utils import storage_utils as storage_utils
+from utils import schema_utils as schema_utils
+from utils import date_utils as date_utils
+from utils import series_utils as series_utils
+
+
+def _epoch_nanoseconds(dates: pd.Series) -> np.ndarray:
+    return dates.astype(date_utils.UTC_DATETIME_DTYPE).array.asi8
+
+
+def join_workout_samples(workout_start_times: np.ndarray, workout_end_times: np.ndarray,
+                         sample_start_times: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Finds the rows of a sorted series that start within the window of every workout.
+
+    The rows bounded this way are the rows a binary search of each workout's window
+    would find, samples ending after their workout still have to be filtered out.
+
+    Args:
+        workout_start_times: The start of every workout as epoch nanoseconds.
+        workout_end_times: The end of every workout as epoch nanoseconds.
+        sample_start_times: The sorted start of every sample as epoch nanoseconds.
+
+    Returns:
+        A tuple of the first row and the row after the last row of every workout's samples.
+    """
+    return (sample_start_times.searchsorted(workout_start_times, side="left"),
+            sample_start_times.searchsorted(workout_end_times, side="right"))
+
+
+def _load_sample_start_times(record_path: str) -> Optional[np.ndarray]:
+    arrays = series_utils.load_series_arrays(record_path)
+    if arrays is not None:
+        return arrays["startDate"]
+    if not os.path.exists(record_path):
+        return None
+
+    df = storage_utils.read_dataframe(record_path, columns=["startDate"],
+                                      dtype={"startDate": date_utils.UTC_DATETIME_DTYPE})
+    return _epoch_nanoseconds(df["startDate"])
+
+
+def write_workout_sample_offsets(workouts: pd.DataFrame, record_paths: Dict[str, str], output_path: str) -> None:
+    """Writes the row range of every workout's samples in every record file.
+
+    Args:
+        workouts: The workouts summary with UTC 'startDate' and 'endDate' columns.
+        record_paths: The paths of the sorted record files keyed by record type,
+            record types without a file are skipped.
+        output_path: The path of the written offsets file.
+    """
+    workout_start_times = _epoch_nanoseconds(workouts["startDate"])
+    workout_end_times = _epoch_nanoseconds(workouts["endDate"])
+
+    offsets = []
+    for record_type, record_path in record_paths.items():
+        sample_start_times = _load_sample_start_times(record_path)
+        if sample_start_times is None:
+            continue
+
+        start_offsets, stop_offsets = join_workout_samples(
+            workout_start_times, workout_end_times, sample_start_times)
+        offsets.append(pd.DataFrame({
+            "workoutId": np.arange(len(workouts)),
+            "type": record_type,
+            "startOffset": start_offsets,
+            "stopOffset": stop_offsets,
+        }))
+
+    df = pd.concat(offsets, ignore_index=True) if offsets else pd.DataFrame(
+        columns=list(schema_utils.WORKOUT_SAMPLE_OFFSET_DTYPES))
+    storage_utils.write_dataframe(storage_utils.apply_dtypes(df, schema_utils.WORKOUT_SAMPLE_OFFSET_DTYPES), output_path)
+
+
+def get_workout_sample_ranges(offsets: pd.DataFrame, record_type: str) -> Dict[int, slice]:
+    """Returns the rows of a record type's samples recorded during every workout, keyed by workout id."""
+    offsets = offsets[offsets["type"] == record_type]
+    return {
+        workout_id: slice(start_offset, stop_offset)
+        for workout_id, start_offset, stop_offset in zip(
+            offsets["workoutId"].tolist(), offsets["startOffset"].tolist(), offsets["stopOffset"].tolist())
+    }
@@ -0,0 +1,306 @@
+"""
+Writes parsed rows to disk in bounded-size chunks.
+
+This module provides the `ChunkedRecordWriter` class, which buffers row structures
+and appends them to their output file, in the storage format matching its extension,
+whenever the buffer reaches a row or byte threshold. Peak memory therefore depends
+on the chunk size rather than on the number of rows written.
+
+Writers given a sort column write every chunk sorted, as a run continuing the previous
+chunk when it starts after it and as a new run otherwise. On close the runs are merged
+in batches of at most `config.RECORD_WRITER_MERGE_FAN_IN` runs, reading every run in
+bounded batches, so sorting a file does not load it either. Every run after the first is
+written as an Arrow IPC file whatever the output format, in record batches no longer than
+the batches it is merged in, so reading a run only holds one small record batch. Files
+sorted elsewhere, such as the record files of parsed shards, are moved in as runs of their
+own with `append_sorted_run` and merged with the others instead of being appended again.
+
+Usage example:
+    writer = ChunkedRecordWriter(path, columns)
+    writer.append(row)
+    writer.close()
+"""
+
+import os
+import shutil
+from typing import List
+import numpy as np
+import pandas as pd
+import config
+from utils import storage_utils as storage_utils
+from utils import date_utils as date_utils
+
+# Storage format of the sorted runs merged on close, read back one record batch at a time
+RUN_STORAGE_FORMAT = "feather"
+
+
+def run_batch_rows(max_buffered_rows: int = None) -> int:
+    """Returns the most rows per record batch of the runs a writer buffering `max_buffered_rows` merges.
+
+    Every run merged on close is read in batches of about this many rows, so runs written in
+    record batches no longer than it are never read more than a batch at a time.
+    """
+    return max(1, (max_buffered_rows or config.RECORD_WRITER_MAX_BUFFERED_ROWS) // config.RECORD_WRITER_MERGE_FAN_IN)
+
+
+class ChunkedRecordWriter:
+
+    def __init__(self, output_path: str, columns: list,
+                 max_buffered_rows: int = None, max_buffered_bytes: int = None,
+                 dtypes: dict = None, sort_column: str = None, max_batch_rows: int = None):
+        """Initializes the ChunkedRecordWriter for a single output file.
+
+        Rows are written to a temporary file alongside `output_path` which replaces
+        the output file once the writer is closed, so a partially written file is
+        never left in place of a previous export.
+
+        Args:
+            output_path: The path of the file the rows are written to.
+            columns: The column names of the rows being written.
+            max_buffered_rows: Number of buffered rows that triggers a flush,
+                defaults to `config.RECORD_WRITER_MAX_BUFFERED_ROWS`.
+            max_buffered_bytes: Approximate size in bytes of the buffered values that
+                triggers a flush, defaults to `config.RECORD_WRITER_MAX_BUFFERED_BYTES`.
+            dtypes: The column types every chunk is converted to before it is written,
+                chunks are written as they are when omitted.
+            sort_column: A column the written file is sorted by, keeping the order of equal
+                rows. Rows appended in order are written as they are, the sorted runs of
+                out of order rows are merged into the file on close.
+            max_batch_rows: The most rows stored per row group or record batch of the output
+                file, such as `run_batch_rows` for a file another writer merges as a run.
+                Every chunk is stored whole when omitted.
+        """
+        self.output_path = output_path
+        self.partial_output_path = f"{output_path}.partial"
+        self.columns = columns
+        self.max_buffered_rows = max_buffered_rows or config.RECORD_WRITER_MAX_BUFFERED_ROWS
+        self.max_buffered_bytes = max_buffered_bytes or config.RECORD_WRITER_MAX_BUFFERED_BYTES
+        self.dtypes = dtypes
+        self.sort_column = sort_column
+        self.max_batch_rows = max_batch_rows
+
+        self.buffered_rows = []
+        self.buffered_bytes = 0
+        self.rows_written = 0
+        self.chunks_written = 0
+        self.chunk_writer = None
+        self.run_paths = [self.partial_output_path]
+        self.appended_run_storage_formats = {}
+        self.is_sorted = True
+        self.last_sort_key = None
+
+    def append(self, row: tuple) -> None:
+        """Buffers a row, flushing the buffer to disk once a threshold is reached.
+
+        Args:
+            row: A CSV-compatible row structure matching the writer's columns.
+        """
+        self.buffered_rows.append(row)
+        self.buffered_bytes += sum(len(value)
+                                   for value in row if isinstance(value, str))
+
+        if (len(self.buffered_rows) >= self.max_buffered_rows or
+                self.buffered_bytes >= self.max_buffered_bytes):
+            self.flush()
+
+    def append_dataframe(self, df: pd.DataFrame) -> None:
+        """Writes a DataFrame with the writer's columns as its own chunk after any buffered rows.
+
+        Args:
+            df: The rows to write, already bounded in size by the caller.
+        """
+        self.flush()
+        self._write_chunk(df)
+        self.rows_written += len(df)
+        self.chunks_written += 1
+
+    def append_sorted_run(self, file_path: str, row_count: int) -> None:
+        """Moves a file sorted by the sort column in as a run after the rows appended so far.
+
+        The file is merged with the other runs on close instead of being appended chunk by
+        chunk. It is read back in the storage format of its extension, best written in record
+        batches of at most `run_batch_rows` rows so merging it holds no more than the other runs.
+
+        Args:
+            file_path: The path of the sorted file, moved next to the partial output file.
+            row_count: The number of rows of the file.
+        """
+        self.flush()
+        if self.chunk_writer is not None:
+            self.chunk_writer.close()
+            self.chunk_writer = None
+        run_path = f"{self.partial_output_path}.{len(self.run_paths)}"
+        shutil.move(file_path, run_path)
+        self.run_paths.append(run_path)
+        self.appended_run_storage_formats[run_path] = storage_utils.get_storage_format_of(file_path)
+        self.rows_written += row_count
+        self.last_sort_key = None
+        self.is_sorted = False
+
+    def flush(self) -> None:
+        """Writes the buffered rows to the partial output file and empties the buffer."""
+        if not self.buffered_rows and self.chunks_written:
+            return
+
+        df = pd.DataFrame(self.buffered_rows, columns=self.columns)
+        self._write_chunk(df)
+
+        self.rows_written += len(self.buffered_rows)
+        self.chunks_written += 1
+        self.buffered_rows = []
+        self.buffered_bytes = 0
+
+    def _write_chunk(self, df: pd.DataFrame) -> None:
+        """Appends a chunk to the current run in the storage format of the output path.
+
+        Args:
+            df: The DataFrame holding the rows of the chunk.
+        """
+        if self.dtypes:
+            df = storage_utils.apply_dtypes(df, self.dtypes)
+        if self.sort_column is not None and len(df):
+            df = self._sort_chunk(df)
+        if self.chunk_writer is None:
+            if self.run_paths[-1] in self.appended_run_storage_formats:
+                self.run_paths.append(f"{self.partial_output_path}.{len(self.run_paths)}")
+            run_path = self.run_paths[-1]
+            self.chunk_writer = self._open_run_writer(
+                run_path, self._run_storage_format(run_path), run_path != self.partial_output_path)
+        self.chunk_writer.write(df)
+
+    def _sort_chunk(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Sorts a chunk by the sort column and starts a new run when it begins before the current run ends."""
+        keys = _sort_keys(df[self.sort_column])
+        if (keys[1:] < keys[:-1]).any():
+            order = np.argsort(keys, kind="stable")
+            df, keys = df.iloc[order].reset_index(drop=True), keys[order]
+        if self.last_sort_key is not None and keys[0] < self.last_sort_key:
+            self.chunk_writer.close()
+            self.chunk_writer = None
+            self.run_paths.append(f"{self.partial_output_path}.{len(self.run_paths)}")
+            self.is_sorted = False
+        self.last_sort_key = keys[-1]
+        return df
+
+    def _run_storage_format(self, run_path: str) -> str:
+        """Returns the storage format of a run, the first run is written in the output format."""
+        if run_path == self.partial_output_path:
+            return storage_utils.get_storage_format_of(self.output_path)
+        return self.appended_run_storage_formats.get(run_path, RUN_STORAGE_FORMAT)
+
+    def _open_run_writer(self, run_path: str, storage_format: str, is_merged: bool):
+        """Opens a writer for a run, in record batches no longer than the merge reads it in when `is_merged`."""
+        max_batch_rows = run_batch_rows(self.max_buffered_rows) if is_merged else self.max_batch_rows
+        return storage_utils.open_chunk_writer(run_path, storage_format, self.dtypes, max_batch_rows)
+
+    def _merge_runs(self, run_paths: List[str], merged_path: str, is_merged: bool) -> None:
+        """Merges sorted runs into one sorted file, keeping rows of earlier runs first among equal rows.
+
+        The file is an intermediate run merged again later when `is_merged`, otherwise it is
+        written in the storage format of the output path.
+
+        Every run is read in batches sharing `max_buffered_rows` rows and the merged rows are
+        written in chunks of about as many rows. Each round merges the rows up to the smallest
+        last key among the runs' batches, rows equal to it only from the runs up to the first
+        run whose batch ends with it, as later batches of that run may hold more of them.
+        """
+        batch_rows = max(1, self.max_buffered_rows // len(run_paths))
+        run_batches = [
+            storage_utils.iter_dataframe_chunks(run_path, batch_rows, self.dtypes, self._run_storage_format(run_path))
+            for run_path in run_paths
+        ]
+        batches = [None] * len(run_paths)
+        batch_keys = [None] * len(run_paths)
+        batch_positions = [0] * len(run_paths)
+
+        merged_storage_format = RUN_STORAGE_FORMAT if is_merged else storage_utils.get_storage_format_of(self.output_path)
+        merged_writer = self._open_run_writer(merged_path, merged_storage_format, is_merged)
+        merged_batches, merged_keys = [], []
+
+        def write_merged_batches():
+            # Rounds are merged in order, so a stable sort of their rows keeps them merged
+            order = np.argsort(np.concatenate(merged_keys), kind="stable")
+            merged_writer.write(pd.concat(merged_batches, ignore_index=True).iloc[order])
+            merged_batches.clear()
+            merged_keys.clear()
+
+        while True:
+            for run in range(len(run_paths)):
+                while run_batches[run] is not None and (
+                        batches[run] is None or batch_positions[run] == len(batches[run])):
+                    batch = next(run_batches[run], None)
+                    if batch is None:
+                        run_batches[run] = None
+                    else:
+                        batches[run], batch_keys[run], batch_positions[run] = (
+                            batch, _sort_keys(batch[self.sort_column]), 0)
+            pending_runs = [run for run, batch in enumerate(batches)
+                            if batch is not None and batch_positions[run] < len(batch)]
+            if not pending_runs:
+                break
+
+            bound = min(batch_keys[run][-1] for run in pending_runs)
+            bounding_run = next(run for run in pending_runs if batch_keys[run][-1] == bound)
+            for run in pending_runs:
+                start = batch_positions[run]
+                stop = start + np.searchsorted(batch_keys[run][start:], bound,
+                                               side="right" if run <= bounding_run else "left")
+                if stop > start:
+                    merged_batches.append(batches[run].iloc[start:stop])
+                    merged_keys.append(batch_keys[run][start:stop])
+                    batch_positions[run] = stop
+
+            if sum(len(keys) for keys in merged_keys) >= self.max_buffered_rows:
+                write_merged_batches()
+        if merged_batches:
+            write_merged_batches()
+        merged_writer.close()
+
+    def _merge_partial_output(self) -> None:
+        """Merges the sorted runs into the partial output file, `config.RECORD_WRITER_MERGE_FAN_IN` runs at a time.
+
+        Runs are merged into intermediate runs until at most the fan-in is left, which are
+        merged into the output format.
+        """
+        run_paths = self.run_paths
+        merge_count = 0
+        while len(run_paths) > config.RECORD_WRITER_MERGE_FAN_IN:
+            merged_paths = []
+            for start in range(0, len(run_paths), config.RECORD_WRITER_MERGE_FAN_IN):
+                merged_runs = run_paths[start:start + config.RECORD_WRITER_MERGE_FAN_IN]
+                if len(merged_runs) == 1:
+                    merged_paths.extend(merged_runs)
+                    continue
+
+                merge_count += 1
+                merged_path = f"{self.partial_output_path}.merged{merge_count}"
+                self._merge_runs(merged_runs, merged_path, True)
+                for run_path in merged_runs:
+                    os.remove(run_path)
+                merged_paths.append(merged_path)
+            run_paths = merged_paths
+
+        merged_path = f"{self.partial_output_path}.merged"
+        self._merge_runs(run_paths, merged_path, False)
+        for run_path in run_paths:
+            os.remove(run_path)
+        os.replace(merged_path, self.partial_output_path)
+        self.run_paths = [self.partial_output_path]
+        self.appended_run_storage_formats = {}
+        self.is_sorted = True
+
+    def close(self) -> None:
+        """Flushes any remaining rows, merges the sorted runs if needed and moves the file into place."""
+        self.flush()
+        if self.chunk_writer is not None:
+            self.chunk_writer.close()
+        if not self.is_sorted:
+            self._merge_partial_output()
+        os.replace(self.partial_output_path, self.output_path)
+
+
+def _sort_keys(values: pd.Series) -> np.ndarray:
+    """Returns the values of a sort column as an array comparing like the column sorts, missing dates last."""
+    if isinstance(values.dtype, pd.DatetimeTZDtype) or pd.api.types.is_datetime64_dtype(values.dtype):
+        return date_utils.epoch_nanoseconds(values)
+    return values.to_numpy()
@@ -0,0 +1,174 @@
+import xml.etree.cElementTree as ET
+from xml.parsers import expat
+from typing import IO, Iterator
+import config
+
+
+def iterparse_elements(xml_file: IO[bytes], tags: set,
+                       prune_processed_elements: bool = None) -> Iterator[ET.Element]:
+    """Streams every element whose tag is in `tags` from an XML file.
+
+    Matched elements are yielded once their end tag has been parsed and are cleared
+    as soon as the caller resumes iteration, so they must be fully processed before
+    the next element is requested.
+
+    Clearing an element leaves it attached to its parent and elements that do not match
+    are never cleared at all, so with pruning disabled the root element keeps growing over
+    the pass. With pruning enabled every top-level subtree is detached from the root once
+    its end tag has been parsed, keeping memory bounded by the largest top-level element.
+
+    Args:
+        xml_file: A binary file-like object containing the XML document.
+        tags: The element tags to yield.
+        prune_processed_elements: Whether to detach processed subtrees from the root,
+            defaults to `config.XML_PRUNE_PROCESSED_ELEMENTS`.
+
+    Yields:
+        ET.Element: Each element matching one of `tags`, in document order.
+    """
+    if prune_processed_elements is None:
+        prune_processed_elements = config.XML_PRUNE_PROCESSED_ELEMENTS
+
+    if not prune_processed_elements:
+        for _, elem in ET.iterparse(xml_file, events=("end",)):
+            if elem.tag in tags:
+                yield elem
+                elem.clear()
+        return
+
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(xml_file, events=("start", "end")):
+        if event == "start":
+            if root is None:
+                root = elem
+            depth += 1
+            continue
+
+        depth -= 1
+        if elem.tag in tags:
+            yield elem
+            elem.clear()
+        if depth == 1:
+            del root[:]
+
+
+class ElementTreeBackend:
+    """Reference XML backend built on `ET.iterparse`.
+
+    Builds an element tree for every matched element and hands it to the handler
+    registered for its tag.
+    """
+
+    NAME = "elementtree"
+
+    def parse(self, xml_file: IO[bytes], element_handlers: dict) -> None:
+        """Dispatches every element with a registered handler in document order.
+
+        Args:
+            xml_file: A binary file-like object containing the XML document.
+            element_handlers: The handlers to dispatch to, keyed by element tag.
+        """
+        for elem in iterparse_elements(xml_file, element_handlers.keys()):
+            element_handlers[elem.tag].handle(elem)
+
+
+class ExpatBackend:
+    """Callback-driven XML backend built on `xml.parsers.expat`.
+
+    Elements whose handler sets `ATTRIBUTES_ONLY` are reported straight from the parser
+    callbacks as an attribute dict plus their 'MetadataEntry' key/value pairs, without
+    building any element objects. Elements of other registered tags are built into an
+    element tree with `ET.TreeBuilder` and handed to their handler once complete.
+    """
+
+    NAME = "expat"
+    BUFFER_SIZE = 64 * 1024
+
+    def parse(self, xml_file: IO[bytes], element_handlers: dict) -> None:
+        """Dispatches every element with a registered handler in document order.
+
+        Args:
+            xml_file: A binary file-like object containing the XML document.
+            element_handlers: The handlers to dispatch to, keyed by element tag.
+        """
+        attribute_tags = {tag for tag, handler in element_handlers.items()
+                          if handler.ATTRIBUTES_ONLY}
+        element_tags = set(element_handlers.keys()) - attribute_tags
+
+        builder = None
+        builder_depth = 0
+        attribute_tag = None
+        attribute_depth = 0
+        attributes = None
+        metadata = None
+
+        def start_element(tag: str, element_attributes: dict) -> None:
+            nonlocal builder, builder_depth, attribute_tag, attribute_depth, attributes, metadata
+            if attribute_tag is not None:
+                attribute_depth += 1
+                if tag == "MetadataEntry":
+                    key = element_attributes.get("key")
+                    if key not in metadata:
+                        metadata[key] = element_attributes.get("value")
+            elif tag in attribute_tags:
+                attribute_tag = tag
+                attributes = element_attributes
+                metadata = {}
+            elif builder is None and tag in element_tags:
+                builder = ET.TreeBuilder()
+                parser.CharacterDataHandler = builder.data
+
+            if builder is not None:
+                builder.start(tag, element_attributes)
+                builder_depth += 1
+
+        def end_element(tag: str) -> None:
+            nonlocal builder, builder_depth, attribute_tag, attribute_depth
+            if builder is not None:
+                builder.end(tag)
+                builder_depth -= 1
+
+            if attribute_tag is not None:
+                if attribute_depth:
+                    attribute_depth -= 1
+                else:
+                    element_handlers[attribute_tag].handle_attributes(
+                        attributes, metadata)
+                    attribute_tag = None
+            elif builder is not None and builder_depth == 0:
+                elem = builder.close()
+                builder = None
+                parser.CharacterDataHandler = None
+                element_handlers[elem.tag].handle(elem)
+
+        # Character data is only needed while an element tree is being built, so the
+        # handler is swapped in and out instead of being called for every whitespace run
+        parser = expat.ParserCreate()
+        parser.buffer_text = True
+        parser.buffer_size = self.BUFFER_SIZE
+        parser.StartElementHandler = start_element
+        parser.EndElementHandler = end_element
+        parser.ParseFile(xml_file)
+
+
+XML_BACKENDS = {
+    ElementTreeBackend.NAME: ElementTreeBackend,
+    ExpatBackend.NAME: ExpatBackend,
+}
+
+
+def get_xml_backend(name: str = None):
+    """Returns an instance of the XML backend registered under `name`.
+
+    Args:
+        name: The backend name, defaults to `config.XML_PARSER_BACKEND`.
+
+    Raises:
+        ValueError: If no backend is registered under the name.
+    """
+    name = name or config.XML_PARSER_BACKEND
+    if name not in XML_BACKENDS:
+        raise ValueError(
+            f"Unknown XML parser backend '{name}', expected one of {sorted(XML_BACKENDS)}.")
+    return XML_BACKENDS[name]()